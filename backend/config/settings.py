@@ -156,6 +156,72 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # External keys
 GMS_KEY = env("GMS_KEY", default=None)
 
+# AI backend: "gms" (live GMS proxy) or "local" (deterministic hashing embeddings + templated chat, for load tests)
+AI_BACKEND = env("AI_BACKEND", default="gms")
+AI_LOCAL_CHAT_LATENCY = env.float("AI_LOCAL_CHAT_LATENCY", default=0.0)
+AI_LOCAL_EMBEDDING_LATENCY = env.float("AI_LOCAL_EMBEDDING_LATENCY", default=0.0)
+AI_LOCAL_EMBEDDING_DIM = env.int("AI_LOCAL_EMBEDDING_DIM", default=1536)
+
+# GMS proxy client (recommends.services.gms_client) - timeouts (seconds), retries, connection pool
+GMS_CONNECT_TIMEOUT = env.float("GMS_CONNECT_TIMEOUT", default=3.05)
+GMS_CHAT_TIMEOUT = env.float("GMS_CHAT_TIMEOUT", default=30)
+GMS_EMBEDDING_TIMEOUT = env.float("GMS_EMBEDDING_TIMEOUT", default=30)
+GMS_GEMINI_TIMEOUT = env.float("GMS_GEMINI_TIMEOUT", default=30)
+GMS_MAX_RETRIES = env.int("GMS_MAX_RETRIES", default=2)
+GMS_POOL_MAXSIZE = env.int("GMS_POOL_MAXSIZE", default=16)
+# Per-upstream circuit breaker: opens after N consecutive failed/slow (>= SLOW_CALL s) calls, retries after RESET_TIMEOUT s
+GMS_BREAKER_FAILURE_THRESHOLD = env.int("GMS_BREAKER_FAILURE_THRESHOLD", default=5)
+GMS_BREAKER_SLOW_CALL = env.float("GMS_BREAKER_SLOW_CALL", default=10.0)
+GMS_BREAKER_RESET_TIMEOUT = env.float("GMS_BREAKER_RESET_TIMEOUT", default=30.0)
+
+# Runtime data directory of the recommender (policy index, embeddings, caches, vector store, cache stamp).
+# Generated files only - point it outside the source tree in deployments
+RECOMMEND_DATA_DIR = Path(env("RECOMMEND_DATA_DIR", default=str(BASE_DIR / "recommends" / "data")))
+
+# Embedding disk cache (recommends.services.embedding_cache)
+EMBEDDING_CACHE_PATH = env("EMBEDDING_CACHE_PATH", default=str(RECOMMEND_DATA_DIR / "embedding_cache.sqlite3"))
+EMBEDDING_CACHE_MAX_ENTRIES = env.int("EMBEDDING_CACHE_MAX_ENTRIES", default=20000)
+# Embedding micro-batcher (recommends.services.embedding_batcher) - extra collect window (ms) while a batch is
+# already in flight (0 disables batching), max texts per call, and concurrent upstream calls
+EMBEDDING_BATCH_WAIT_MS = env.float("EMBEDDING_BATCH_WAIT_MS", default=5)
+EMBEDDING_BATCH_MAX_SIZE = env.int("EMBEDDING_BATCH_MAX_SIZE", default=64)
+EMBEDDING_BATCH_CONCURRENCY = env.int("EMBEDDING_BATCH_CONCURRENCY", default=4)
+
+# Recommendation reason generation (LLM) - worker pool size and overall time budget (seconds)
+RECOMMEND_REASON_WORKERS = env.int("RECOMMEND_REASON_WORKERS", default=8)
+RECOMMEND_REASON_TIMEOUT = env.float("RECOMMEND_REASON_TIMEOUT", default=8.0)
+# Streaming endpoint: one LLM call per policy (reasons arrive as each finishes) instead of the single batched call
+RECOMMEND_STREAM_REASONS_PER_POLICY = env.bool("RECOMMEND_STREAM_REASONS_PER_POLICY", default=False)
+# Overall time budget (seconds) per recommendation request, shared by normalize/embed/reason stages
+RECOMMEND_REQUEST_BUDGET = env.float("RECOMMEND_REQUEST_BUDGET", default=15.0)
+
+# Profile reason cache (recommends.reason.reason_cache) - max entries and TTL (seconds)
+REASON_CACHE_MAX_ENTRIES = env.int("REASON_CACHE_MAX_ENTRIES", default=5000)
+REASON_CACHE_TTL = env.int("REASON_CACHE_TTL", default=6 * 60 * 60)
+
+# LLM query normalization cache (recommends.services.query_normalize_ai)
+QUERY_CACHE_MAX_ENTRIES = env.int("QUERY_CACHE_MAX_ENTRIES", default=2000)
+QUERY_CACHE_TTL = env.int("QUERY_CACHE_TTL", default=24 * 60 * 60)
+# Pre-seed the cache with example queries (live LLM calls) when a web server process starts; opt-in
+QUERY_CACHE_PRESEED = env.bool("QUERY_CACHE_PRESEED", default=False)
+# Max wait (seconds) for LLM query normalization; past it, raw-token candidates are used
+# (0 = wait up to the remaining request budget)
+QUERY_NORMALIZE_TIMEOUT = env.float("QUERY_NORMALIZE_TIMEOUT", default=2.0)
+# Dedicated worker pool for query normalization (kept apart from the reason-generation pool)
+QUERY_NORMALIZE_WORKERS = env.int("QUERY_NORMALIZE_WORKERS", default=2)
+
+# Policy index (recommends.services.policy_index) - JSON path and how often (seconds) workers stat it for hot reload
+POLICY_INDEX_PATH = env("POLICY_INDEX_PATH", default=str(RECOMMEND_DATA_DIR / "policy_index.json"))
+POLICY_INDEX_CHECK_INTERVAL = env.float("POLICY_INDEX_CHECK_INTERVAL", default=2.0)
+# How long (seconds) a process reuses the policy table version stamp (policies.services.catalog) before re-querying
+POLICY_CATALOG_CHECK_INTERVAL = env.float("POLICY_CATALOG_CHECK_INTERVAL", default=2.0)
+# Local ANN vector store directory (recommends.services.vector_store, optional chromadb)
+VECTOR_STORE_PATH = env("VECTOR_STORE_PATH", default=str(RECOMMEND_DATA_DIR / "chroma"))
+
+# Recommendation result cache (recommends.services.result_cache)
+RESULT_CACHE_MAX_ENTRIES = env.int("RESULT_CACHE_MAX_ENTRIES", default=1000)
+RESULT_CACHE_TTL = env.int("RESULT_CACHE_TTL", default=10 * 60)
+
 # CORS (for local frontend at 5173)
 CORS_ALLOWED_ORIGINS = [
     'http://localhost:5173',
@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+from recommends.services.query_normalize_ai import start_query_cache_seed  # noqa: E402
+
+start_query_cache_seed()
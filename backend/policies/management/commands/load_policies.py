@@ -1,13 +1,19 @@
 # policies/management/commands/load_policies.py
 
 import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from django.core.management.base import BaseCommand
-from policies.models import Policy
 
+from policies.services.loader_bulk import DEFAULT_CHUNK_SIZE, chunked, upsert_chunk
+from policies.services.loader_parallel import parse_chunks
+from policies.services.loader_stream import iter_json_array, peak_memory_mb
 from policies.services.loader_youth import parse_youth_policy
 from policies.services.loader_welfare_central import parse_welfare_central_policy
 from policies.services.loader_welfare_local import parse_welfare_local_policy
+from recommends.services.result_cache import invalidate_all
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent.parent
@@ -35,10 +41,82 @@ LOADER_CONFIG = [
 class Command(BaseCommand):
     help = "Load youth / welfare policy JSON files into Policy table"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help="트랜잭션 하나로 반영할 정책 수 (기존 행 조회/bulk_create/bulk_update 단위)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="파싱 프로세스 수 (1: 현재 프로세스에서 파싱, 0: CPU 수). DB 반영은 항상 현재 프로세스 하나가 담당",
+        )
+        parser.add_argument(
+            "--changed-ids",
+            default=None,
+            help="생성·변경된 정책 id 목록을 JSON 배열로 기록할 파일 경로 (후속 단계가 변경분만 처리하도록)",
+        )
+
     def handle(self, *args, **options):
-        total_created = 0
-        total_updated = 0
+        chunk_size = max(1, options["chunk_size"])
+        workers = options["workers"] if options["workers"] > 0 else (os.cpu_count() or 1)
+        stats = {}
+        changed_ids = []
+        started = time.monotonic()
+
+        # 파싱/정규화는 출처·chunk 단위로 프로세스 풀에 분산하고, DB upsert는 이 프로세스에서 순서대로 (SQLite 단일 writer)
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            jobs = self._read_chunks(chunk_size, stats)
+            for name, payloads in parse_chunks(jobs, executor, window=workers * 2):
+                result = upsert_chunk(payloads)
+                changed_ids.extend(result.pop("changed_ids"))
+                for key, value in result.items():
+                    stats[name][key] += value
+                stats[name]["finished"] = time.monotonic()
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        total = {"created": 0, "updated": 0, "unchanged": 0}
+        total_items = 0
+        for name, stat in stats.items():
+            elapsed = stat["finished"] - stat["started"]
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"  - {name}: created={stat['created']}, updated={stat['updated']}, "
+                    f"unchanged={stat['unchanged']} | {stat['items']} items, "
+                    f"{stat['items'] / elapsed if elapsed else 0:.0f} items/s"
+                )
+            )
+            for key in total:
+                total[key] += stat[key]
+            total_items += stat["items"]
 
+        # 정책이 바뀌었을 때만 추천 결과 캐시 전체 무효화
+        if changed_ids:
+            invalidate_all()
+
+        if options["changed_ids"]:
+            with open(options["changed_ids"], "w", encoding="utf-8") as f:
+                json.dump(sorted(changed_ids), f)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"\n✅ DONE | total created={total['created']}, total updated={total['updated']}, "
+                f"total unchanged={total['unchanged']}, changed ids={len(changed_ids)} ({elapsed:.1f}s, "
+                f"{total_items / max(elapsed, 1e-9):.0f} items/s, workers={workers}, {self._peak_memory()})"
+            )
+        )
+
+    def _read_chunks(self, chunk_size, stats):
+        """
+        모든 출처 파일을 스트리밍하며 (출처 이름, 파서, 원본 묶음) 작업을 만든다 (파일 전체를 올리지 않음).
+        """
         for cfg in LOADER_CONFIG:
             name = cfg["name"]
             file_path = cfg["file"]
@@ -52,37 +130,14 @@ class Command(BaseCommand):
                 )
                 continue
 
+            now = time.monotonic()
+            stats[name] = {"created": 0, "updated": 0, "unchanged": 0, "items": 0, "started": now, "finished": now}
             with open(file_path, "r", encoding="utf-8") as f:
-                items = json.load(f)
-
-            created = 0
-            updated = 0
-
-            for item in items:
-                payload = parser(item)
-
-                _, is_created = Policy.objects.update_or_create(
-                    source=payload["source"],
-                    source_id=payload["source_id"],
-                    defaults=payload,
-                )
-
-                if is_created:
-                    created += 1
-                else:
-                    updated += 1
-
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f"  - {name}: created={created}, updated={updated}"
-                )
-            )
-
-            total_created += created
-            total_updated += updated
-
-        self.stdout.write(
-            self.style.SUCCESS(
-                f"\n✅ DONE | total created={total_created}, total updated={total_updated}"
-            )
-        )
+                for chunk in chunked(iter_json_array(f), chunk_size):
+                    stats[name]["items"] += len(chunk)
+                    yield name, parser, chunk
+
+    def _peak_memory(self) -> str:
+        # 단일 writer(현재 프로세스) 기준
+        peak = peak_memory_mb()
+        return "peak RSS n/a" if peak is None else f"peak RSS {peak:.1f}MB"
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 07:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('policies', '0007_alter_policy_applicable_regions_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='policy',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
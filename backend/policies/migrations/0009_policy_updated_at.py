@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 07:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('policies', '0008_policy_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='policy',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, null=True),
+        ),
+    ]
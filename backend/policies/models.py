@@ -86,6 +86,8 @@ class Policy(models.Model):
     # =========================
     status = models.CharField(max_length=20, default="ACTIVE")
     raw = models.JSONField()
+    content_hash = models.CharField(max_length=64, null=True, blank=True)  # 파싱 payload 해시 (재적재 시 변경 감지)
+    updated_at = models.DateTimeField(auto_now=True, null=True, db_index=True)  # 정책 테이블 버전(catalog_version) 기준
 
     class Meta:
         unique_together = ("source", "source_id")
@@ -0,0 +1,49 @@
+import hashlib
+import threading
+import time
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from policies.models import Policy
+
+# 정책 테이블 버전 스탬프. 정책 인덱스/검색 엔진 같은 파생 데이터가 DB와 같은 시점인지 확인하는 데 쓴다.
+
+_CACHED: Optional[Tuple[float, str]] = None
+_LOCK = threading.Lock()
+
+
+def _read_version() -> str:
+    stats = Policy.objects.aggregate(count=Count("id"), max_id=Max("id"), updated=Max("updated_at"))
+    updated = stats["updated"].isoformat() if stats["updated"] else ""
+    raw = f"{stats['count']}:{stats['max_id'] or 0}:{updated}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def catalog_version() -> str:
+    """
+    (행 수, 최대 id, 최근 updated_at)의 해시 - 정책이 추가/삭제되거나 save()/적재로 수정되면 바뀐다.
+    (QuerySet.update()는 updated_at을 갱신하지 않으므로 직접 updated_at도 함께 갱신해야 한다.)
+    POLICY_CATALOG_CHECK_INTERVAL초 동안은 프로세스 내 값을 재사용 (요청마다 집계 쿼리를 하지 않음).
+    """
+    global _CACHED
+    interval = getattr(settings, "POLICY_CATALOG_CHECK_INTERVAL", 2.0)
+    cached = _CACHED
+    now = time.monotonic()
+    if cached is not None and now - cached[0] < interval:
+        return cached[1]
+    with _LOCK:
+        cached = _CACHED
+        if cached is None or now - cached[0] >= interval:
+            cached = (time.monotonic(), _read_version())
+            _CACHED = cached
+        return cached[1]
+
+
+def reset_catalog_version():
+    """
+    같은 프로세스에서 정책을 바꾼 직후(적재 명령 등) 캐시된 버전을 버린다.
+    """
+    global _CACHED
+    _CACHED = None
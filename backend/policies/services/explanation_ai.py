@@ -2,15 +2,9 @@
 import re
 from typing import Dict, List, Optional
 
-import requests
-
 from policies.models import Policy
 from profiles.models import Profile
-
-GEMINI_GEN_URL = (
-    "https://gms.ssafy.io/gmsapi/generativelanguage.googleapis.com/"
-    "v1beta/models/gemini-2.5-flash-lite:generateContent"
-)
+from recommends.services.gms_client import ResponseParseError, post_json
 
 
 def _parse_json_candidates(text: str) -> List[Dict]:
@@ -29,6 +23,14 @@ def _parse_json_candidates(text: str) -> List[Dict]:
     return []
 
 
+def _parse_top3(data: Dict) -> List[Dict]:
+    # 후보가 하나도 없으면 해석 실패 (호출이 parse_failure로 기록됨)
+    candidates = _parse_json_candidates(data["candidates"][0]["content"]["parts"][0]["text"])
+    if not candidates:
+        raise ValueError("no candidates in model response")
+    return candidates
+
+
 def generate_top3_with_reasons(
     policies: List[Policy],
     profile: Optional[Profile],
@@ -41,9 +43,6 @@ def generate_top3_with_reasons(
     if not policies:
         return []
 
-    url = f"{GEMINI_GEN_URL}?key={api_key}"
-    headers = {"Content-Type": "application/json"}
-
     profile_desc = []
     if profile:
         if profile.region:
@@ -95,15 +94,11 @@ def generate_top3_with_reasons(
         ]
     }
 
-    resp = requests.post(url, headers=headers, json=payload, timeout=30)
-    resp.raise_for_status()
-    data = resp.json()
-
-    candidates: List[Dict] = []
     try:
-        text = data["candidates"][0]["content"]["parts"][0]["text"]
-        candidates = _parse_json_candidates(text)
-    except Exception:
+        candidates = post_json(
+            "gemini", payload, auth="query", api_key=api_key, site="policy_top3", parse=_parse_top3
+        )
+    except ResponseParseError:
         candidates = []
 
     valid_ids = {p.id for p in policies}
@@ -0,0 +1,88 @@
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Iterator, List
+
+from django.db import transaction
+from django.utils import timezone
+
+from policies.models import Policy
+from policies.services.loader_parallel import payload_hash
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def chunked(items: Iterable, size: int) -> Iterator[List]:
+    """
+    iterable을 size개씩 묶어 리스트로 반환 (마지막 묶음은 더 작을 수 있음).
+    """
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def upsert_chunk(payloads: List[Dict]) -> Dict[str, Any]:
+    """
+    파싱된 정책 payload 묶음을 한 트랜잭션으로 반영.
+    (source, source_id) 기존 행은 id/content_hash만 한 번에 조회하고 (raw 등 큰 컬럼은 읽지 않음),
+    새 행은 bulk_create, 해시가 다른 행만 bulk_update. 해시가 같으면 건너뛴다.
+    같은 묶음 안에서 키가 중복되면 마지막 payload 사용 (update_or_create 순차 실행과 같은 결과).
+    반환: created/updated/unchanged 수와 생성·변경된 정책 id 목록(changed_ids).
+    """
+    by_key: Dict[tuple, Dict] = {}
+    for payload in payloads:
+        if not payload.get("content_hash"):
+            payload["content_hash"] = payload_hash(payload)
+        by_key[(payload["source"], payload["source_id"])] = payload
+
+    source_ids = defaultdict(list)
+    for source, source_id in by_key:
+        source_ids[source].append(source_id)
+
+    counts = {"created": 0, "updated": 0, "unchanged": 0}
+    changed_ids: List[int] = []
+    with transaction.atomic():
+        existing = {}
+        for source, ids in source_ids.items():
+            rows = Policy.objects.filter(source=source, source_id__in=ids).values_list(
+                "id", "source_id", "content_hash"
+            )
+            for pk, source_id, content_hash in rows:
+                existing[(source, source_id)] = (pk, content_hash)
+
+        now = timezone.now()
+        to_create = []
+        # payload 키 구성별로 묶어 bulk_update (payload에 없는 필드는 건드리지 않음)
+        to_update = defaultdict(list)
+        for key, payload in by_key.items():
+            row = existing.get(key)
+            if row is None:
+                to_create.append(Policy(**payload))
+                continue
+            pk, content_hash = row
+            if content_hash == payload["content_hash"]:
+                counts["unchanged"] += 1
+                continue
+            # bulk_update는 auto_now를 적용하지 않으므로 updated_at을 직접 채운다
+            fields = tuple(sorted((set(payload) | {"updated_at"}) - {"source", "source_id"}))
+            to_update[fields].append(Policy(id=pk, updated_at=now, **payload))
+
+        if to_create:
+            created = Policy.objects.bulk_create(to_create)
+            if any(policy.pk is None for policy in created):
+                # bulk insert 후 pk를 돌려주지 않는 DB면 키로 다시 조회
+                keys = {(policy.source, policy.source_id) for policy in created}
+                for source, ids in source_ids.items():
+                    rows = Policy.objects.filter(source=source, source_id__in=ids).values_list("id", "source_id")
+                    changed_ids.extend(pk for pk, source_id in rows if (source, source_id) in keys)
+            else:
+                changed_ids.extend(policy.pk for policy in created)
+        for fields, policies in to_update.items():
+            Policy.objects.bulk_update(policies, list(fields))
+            changed_ids.extend(policy.pk for policy in policies)
+        counts["created"] = len(to_create)
+        counts["updated"] = sum(len(policies) for policies in to_update.values())
+    return {**counts, "changed_ids": changed_ids}
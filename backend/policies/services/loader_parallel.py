@@ -0,0 +1,55 @@
+import hashlib
+import json
+from collections import deque
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# 정책 원본 파싱을 프로세스 풀로 분산 (Django 비의존: 워커 프로세스는 파서만 실행하고 DB는 건드리지 않는다).
+
+Parser = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+def payload_hash(payload: Dict[str, Any]) -> str:
+    """
+    파싱된 payload의 안정적인 내용 해시 (키 정렬 JSON의 sha256, content_hash 필드 자신은 제외).
+    """
+    body = {key: value for key, value in payload.items() if key != "content_hash"}
+    raw = json.dumps(body, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def parse_chunk(parser: Parser, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    원본 항목 묶음 → content_hash가 채워진 Policy payload 묶음.
+    워커 프로세스에서 실행된다 (parser는 모듈 수준 함수여야 pickle 가능).
+    """
+    payloads = [parser(item) for item in items]
+    for payload in payloads:
+        payload["content_hash"] = payload_hash(payload)
+    return payloads
+
+
+def parse_chunks(
+    jobs: Iterable[Tuple[str, Parser, List[Dict[str, Any]]]],
+    executor: Optional[Executor] = None,
+    window: int = 2,
+) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+    """
+    (출처 이름, 파서, 원본 묶음) 작업을 파싱해 입력 순서대로 (출처 이름, payload 묶음) yield.
+    executor가 있으면 최대 window개 묶음을 미리 제출해 두고, 호출측(단일 writer)이 앞 묶음을 쓰는 동안
+    다음 묶음들이 병렬로 파싱된다. 미리 읽는 양이 window로 제한되므로 메모리는 일정하다.
+    """
+    if executor is None:
+        for name, parser, items in jobs:
+            yield name, parse_chunk(parser, items)
+        return
+
+    pending = deque()
+    for name, parser, items in jobs:
+        pending.append((name, executor.submit(parse_chunk, parser, items)))
+        if len(pending) >= window:
+            done_name, future = pending.popleft()
+            yield done_name, future.result()
+    while pending:
+        done_name, future = pending.popleft()
+        yield done_name, future.result()
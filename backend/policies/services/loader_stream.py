@@ -0,0 +1,105 @@
+import json
+import re
+import sys
+from typing import Any, Iterator, Optional, TextIO
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# 최상위 JSON 배열을 항목 단위로 읽는 스트리밍 리더 (Django 비의존).
+# 파일 전체를 json.load하지 않고 버퍼 크기 + 항목 하나만큼만 메모리에 둔다.
+
+DEFAULT_BUFFER_SIZE = 1 << 16
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_DELIMITERS = " \t\n\r,]"
+_DECODER = json.JSONDecoder()
+
+
+class _Reader:
+    def __init__(self, fh: TextIO, buffer_size: int):
+        self.fh = fh
+        self.buffer_size = buffer_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """
+        버퍼에 더 읽어 붙인다. 이미 소비한 앞부분은 버린다. 더 읽을 게 없으면 False.
+        """
+        if self.eof:
+            return False
+        data = self.fh.read(self.buffer_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos :] + data
+        self.pos = 0
+        return True
+
+    def peek(self) -> Optional[str]:
+        """
+        공백을 건너뛴 다음 문자 (소비하지 않음). 파일 끝이면 None.
+        """
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return None
+
+    def decode(self) -> Any:
+        """
+        현재 위치의 JSON 값 하나. 값이 버퍼 끝에서 잘렸으면 더 읽어 다시 시도.
+        """
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            # 숫자/리터럴은 구분자(공백 , ])가 보일 때까지 읽어야 잘리지 않은 값이다 (예: "1." + "5e3")
+            if self.buf[self.pos] not in '{["' and (end == len(self.buf) or self.buf[end] not in _DELIMITERS):
+                if self.fill():
+                    continue
+            self.pos = end
+            return value
+
+
+def iter_json_array(fh: TextIO, buffer_size: int = DEFAULT_BUFFER_SIZE) -> Iterator[Any]:
+    """
+    최상위가 배열인 JSON 파일에서 항목을 하나씩 yield.
+    """
+    reader = _Reader(fh, buffer_size)
+    if reader.peek() != "[":
+        raise ValueError("top-level JSON value is not an array")
+    reader.pos += 1
+
+    if reader.peek() == "]":
+        return
+    while True:
+        if reader.peek() is None:
+            raise ValueError("unexpected end of JSON array")
+        yield reader.decode()
+        token = reader.peek()
+        if token == ",":
+            reader.pos += 1
+        elif token == "]":
+            return
+        else:
+            raise ValueError(f"expected ',' or ']' in JSON array, got {token!r}")
+
+
+def peak_memory_mb() -> Optional[float]:
+    """
+    프로세스 최대 RSS (MB). resource 모듈이 없는 플랫폼이면 None.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux는 KB, macOS는 byte 단위
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
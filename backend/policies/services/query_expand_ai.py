@@ -1,9 +1,7 @@
 import json
-import os
 from typing import Dict, List, Optional, Set
 
-import requests
-from django.conf import settings
+from recommends.services.gms_client import post_json
 
 # 서비스 카테고리 동의어 (Single Source of Truth)
 CATEGORY_SYNONYMS: Dict[str, List[str]] = {
@@ -22,17 +20,6 @@ CATEGORY_SYNONYMS: Dict[str, List[str]] = {
 SYNONYM_MAP = CATEGORY_SYNONYMS
 
 GEMINI_MODEL = "models/gemini-2.5-flash lite"
-GEMINI_GENERATE_URL = (
-    "https://gms.ssafy.io/gmsapi/generativelanguage.googleapis.com/"
-    "v1beta/models/gemini-2.5-flash-lite:generateContent"
-)
-
-
-def _get_gms_key() -> str:
-    key = os.getenv("GMS_KEY", getattr(settings, "GMS_KEY", None))
-    if not key:
-        raise RuntimeError("GMS_KEY is not configured")
-    return key
 
 
 def expand_query(text: Optional[str]) -> List[str]:
@@ -55,6 +42,17 @@ def expand_query(text: Optional[str]) -> List[str]:
     return expanded
 
 
+def _parse_expansion(data: Dict) -> Dict:
+    text = (
+        data.get("candidates", [{}])[0]
+        .get("content", {})
+        .get("parts", [{}])[0]
+        .get("text", "")
+        .strip()
+    )
+    return json.loads(text)
+
+
 def expand_query_with_llm(user_query: str):
     """
     LLM 기반 쿼리 확장/필터 추출. GMS Gemini Flash 사용.
@@ -80,29 +78,15 @@ JSON 외 텍스트 출력 금지.
 "{user_query}"
 """
 
-    api_key = _get_gms_key()
-    headers = {
-        "Content-Type": "application/json",
-        "x-goog-api-key": api_key,
-    }
     payload = {
         "model": GEMINI_MODEL,
         "contents": [{"parts": [{"text": prompt}]}],
     }
+    fallback = {
+        "expanded_query": user_query,
+        "filters": {}
+    }
     try:
-        resp = requests.post(GEMINI_GENERATE_URL, headers=headers, json=payload, timeout=30)
-        resp.raise_for_status()
-        data = resp.json()
-        text = (
-            data.get("candidates", [{}])[0]
-            .get("content", {})
-            .get("parts", [{}])[0]
-            .get("text", "")
-            .strip()
-        )
-        return json.loads(text)
+        return post_json("gemini", payload, auth="header", site="query_expand", parse=_parse_expansion)
     except Exception:
-        return {
-            "expanded_query": user_query,
-            "filters": {}
-        }
+        return fallback
@@ -1,3 +1,297 @@
-from django.test import TestCase
+import itertools
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIRequestFactory
+
+from recommends.services.policy_index import _read_snapshot
+from .models import Policy
+from .services.loader_bulk import upsert_chunk
+from .services.loader_parallel import payload_hash
+from .services.loader_stream import iter_json_array
+from .utils import search_engine
+from .utils.search_engine import get_search_engine, ranked_policy_ids
+from .views import policy_search
+
+SIDOS = ["서울특별시", "경기도", ""]
+APPLICABLE = [[], ["경기도 수원시"], ["서울특별시", "부산광역시 해운대구"]]
+AGES = [(None, None), (19, 34), (None, 39), (25, None)]
+EMPLOYMENT = [[], ["미취업자"], ["재직자", "자영업자"]]
+
+
+def create_policies():
+    """
+    지역/연령/취업 상태/유형/카테고리/상태 조합별 정책 (패싯 ↔ DB 필터 비교용).
+    """
+    combos = itertools.product(
+        ["NATIONWIDE", "LOCAL"], SIDOS, APPLICABLE, AGES, EMPLOYMENT, ["YOUTH", "WELFARE"]
+    )
+    policies = []
+    for i, (scope, sido, applicable, (min_age, max_age), employment, policy_type) in enumerate(combos):
+        policies.append(
+            Policy(
+                source="test",
+                source_id=str(i),
+                title=f"정책 {i}",
+                policy_type=policy_type,
+                category=["일자리", "주거", "교육"][i % 3],
+                region_scope=scope,
+                region_sido=sido or None,
+                applicable_regions=applicable,
+                min_age=min_age,
+                max_age=max_age,
+                employment=employment,
+                status="INACTIVE" if i % 7 == 0 else "ACTIVE",
+                raw={},
+            )
+        )
+    Policy.objects.bulk_create(policies)
+
+
+def isolate_data_dir(test_case):
+    """
+    런타임 파일(결과 캐시 스탬프, 벡터 스토어 등)을 테스트가 끝나면 지워지는 임시 디렉터리로 돌린다.
+    """
+    tmp = tempfile.TemporaryDirectory()
+    test_case.addCleanup(tmp.cleanup)
+    data_dir = Path(tmp.name)
+    settings_override = override_settings(RECOMMEND_DATA_DIR=data_dir, VECTOR_STORE_PATH=str(data_dir / "chroma"))
+    settings_override.enable()
+    test_case.addCleanup(settings_override.disable)
+    return data_dir
+
+
+def build_snapshot(test_case):
+    """
+    임시 디렉터리에 정책 인덱스를 만들고 스냅샷으로 읽는다 (임베딩 제외).
+    """
+    path = isolate_data_dir(test_case) / "policy_index.json"
+    call_command("build_policy_index", "--output", str(path), "--skip-embeddings", stdout=StringIO())
+    return _read_snapshot(path)
+
+
+class PolicySearchFacetParityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_policies()
+
+    def setUp(self):
+        self.facets = build_snapshot(self).facets
+        self.factory = APIRequestFactory()
+
+    def _search_ids(self, params, facets):
+        ids = []
+        with mock.patch("policies.views.load_facets", return_value=facets), mock.patch(
+            "policies.views.MAX_ID_FILTER", 10_000
+        ):
+            page = 1
+            while True:
+                request = self.factory.get("/api/policies/search/", {**params, "page_size": 100, "page": page})
+                data = policy_search(request).data
+                ids.extend(row["id"] for row in data["results"])
+                if not data["next"]:
+                    return sorted(ids)
+                page += 1
+
+    def test_facet_filters_match_sql_filters(self):
+        filters = itertools.product(
+            [None, "서울특별시", "서울", "경기도", "수원", "부산"],
+            [None, 18, 30, 40],
+            [None, "미취업자", "재직", "자영업자"],
+            [None, "YOUTH"],
+            [None, "주거"],
+        )
+        for region, age, employment, policy_type, category in filters:
+            params = {
+                key: value
+                for key, value in {
+                    "region_sido": region,
+                    "age": age,
+                    "employment": employment,
+                    "policy_type": policy_type,
+                    "category": category,
+                }.items()
+                if value is not None
+            }
+            with self.subTest(**params):
+                self.assertEqual(self._search_ids(params, self.facets), self._search_ids(params, None))
+
+    def test_list_filters_match_whole_elements(self):
+        nationwide = set(Policy.objects.filter(status="ACTIVE", region_scope="NATIONWIDE").values_list("id", flat=True))
+        for facets in (self.facets, None):
+            with self.subTest(facets=facets is not None):
+                self.assertEqual(self._search_ids({"employment": "재직"}, facets), [])
+                self.assertEqual(
+                    self._search_ids({"employment": "재직자"}, facets),
+                    sorted(p.id for p in Policy.objects.filter(status="ACTIVE") if "재직자" in p.employment),
+                )
+                # 목록 원소의 일부("수원")는 일치로 보지 않는다 → 전국 정책만
+                self.assertEqual(set(self._search_ids({"region_sido": "수원"}, facets)), nationwide)
+                self.assertLess(nationwide, set(self._search_ids({"region_sido": "경기도 수원시"}, facets)))
+
+    def test_broad_facet_result_falls_back_to_sql(self):
+        mask = self.facets.select(policy_type="YOUTH")
+        self.assertIsNone(self.facets.ids_of(mask, limit=1))
+        self.assertEqual(len(self.facets.ids_of(mask)), int(mask.sum()))
+
+
+@override_settings(POLICY_CATALOG_CHECK_INTERVAL=0)
+class SearchEngineCacheTests(TestCase):
+    def setUp(self):
+        # 엔진 캐시는 정책 테이블 버전으로 무효화된다 (테스트마다 정책을 새로 만들므로 별도 초기화 불필요)
+        self.active = Policy.objects.create(source="test", source_id="a", title="청년 월세 지원", raw={})
+        self.inactive = Policy.objects.create(
+            source="test", source_id="i", title="청년 월세 종료", status="INACTIVE", raw={}
+        )
+
+    def _search(self, q, **params):
+        request = APIRequestFactory().get("/api/policies/search/", {"q": q, **params})
+        return [row["id"] for row in policy_search(request).data["results"]]
+
+    def test_indexes_only_active_policies(self):
+        self.assertEqual([pid for pid, _ in get_search_engine().search("월세")], [self.active.id])
+        self.assertEqual(self._search("월세", status="INACTIVE"), [self.inactive.id])
+
+    def test_in_place_edit_is_reindexed(self):
+        engine = get_search_engine()
+        self.assertIs(get_search_engine(), engine)
+        self.assertEqual(self._search("장학금"), [])
+
+        self.active.title = "청년 장학금 지원"
+        self.active.save()
+        self.assertEqual(self._search("장학금"), [self.active.id])
+
+
+@override_settings(POLICY_CATALOG_CHECK_INTERVAL=0)
+class RankedPolicyIdsTests(TestCase):
+    def setUp(self):
+        rows = [
+            ("청년 월세 지원", "2025-03-01", "2025-01-01", "LOCAL"),
+            ("월세 긴급 지원", None, "2025-02-01", "NATIONWIDE"),
+            ("청년 월세 대출 이자 지원", "2025-01-15", None, "NATIONWIDE"),
+            ("신혼 월세", "2025-02-10", "2025-03-01", "NATIONWIDE"),
+            ("장학금", "2025-01-01", "2025-01-01", "NATIONWIDE"),
+        ]
+        for i, (title, end_date, start_date, scope) in enumerate(rows):
+            Policy.objects.create(
+                source="test",
+                source_id=str(i),
+                title=title,
+                end_date=end_date,
+                start_date=start_date,
+                region_scope=scope,
+                raw={},
+            )
+        self.qs = Policy.objects.filter(status="ACTIVE", region_scope="NATIONWIDE")
+        patcher = mock.patch.object(search_engine, "ID_CHUNK", 2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _matched(self):
+        return {pid for pid, _ in get_search_engine().search("월세")}
+
+    def test_relevance_order_is_filtered_in_sql(self):
+        matched = self._matched()
+        relevance = [pid for pid, _ in get_search_engine().search("월세")]
+        allowed = set(self.qs.values_list("id", flat=True))
+        # 정책 테이블 버전 확인 1 + 매칭 id 4개를 2개씩 나눈 id__in 조회 2 (전체 id는 읽지 않는다)
+        with self.assertNumQueries(3):
+            ids = ranked_policy_ids(self.qs, "월세")
+        self.assertEqual(ids, [pid for pid in relevance if pid in allowed])
+        self.assertEqual(set(ids), matched & allowed)
+
+    def test_ordering_matches_database_order(self):
+        matched = self._matched()
+        for ordering in ("end_date", "-end_date", "-start_date", "title", "-id"):
+            with self.subTest(ordering=ordering):
+                expected = [pid for pid in self.qs.order_by(ordering).values_list("id", flat=True) if pid in matched]
+                self.assertEqual(ranked_policy_ids(self.qs, "월세", ordering=ordering), expected)
+
+
+STREAM_DOCUMENT = """
+ [ {"title": "청년 \\"월세\\" 지원, [서울]", "ages": [19, 34], "rate": 1.5e3},
+   -0.25 , "a,b]c" , true,null,
+   [[], {}, {"nested": {"k": "\\u00e9\\\\"}}],
+   12345678901234567890 ]
+"""
+
+
+class IterJsonArrayTests(SimpleTestCase):
+    def test_matches_json_load_at_every_buffer_size(self):
+        expected = json.loads(STREAM_DOCUMENT)
+        for buffer_size in range(1, len(STREAM_DOCUMENT) + 2):
+            with self.subTest(buffer_size=buffer_size):
+                items = list(iter_json_array(StringIO(STREAM_DOCUMENT), buffer_size=buffer_size))
+                self.assertEqual(items, expected)
+
+    def test_empty_array(self):
+        for document in ["[]", " [ \n ] "]:
+            for buffer_size in (1, 2, 64):
+                self.assertEqual(list(iter_json_array(StringIO(document), buffer_size=buffer_size)), [])
+
+    def test_malformed_input_raises(self):
+        for document in ['{"a": 1}', "[1, 2", "[1 2]", '[{"a": 1}', ""]:
+            for buffer_size in (1, 3, 64):
+                with self.subTest(document=document, buffer_size=buffer_size):
+                    with self.assertRaises(ValueError):
+                        list(iter_json_array(StringIO(document), buffer_size=buffer_size))
+
+
+def policy_payload(source_id, title, **fields):
+    return {"source": "test", "source_id": source_id, "title": title, "raw": {"id": source_id}, **fields}
+
+
+class UpsertChunkTests(TestCase):
+    def test_counts_and_changed_ids(self):
+        result = upsert_chunk([policy_payload("1", "정책 1"), policy_payload("2", "정책 2")])
+        created = dict(Policy.objects.values_list("source_id", "id"))
+        self.assertEqual((result["created"], result["updated"]), (2, 0))
+        self.assertEqual(sorted(result["changed_ids"]), sorted(created.values()))
+
+        result = upsert_chunk([policy_payload("2", "정책 2 수정"), policy_payload("3", "정책 3")])
+        self.assertEqual((result["created"], result["updated"]), (1, 1))
+        self.assertEqual(
+            sorted(result["changed_ids"]), sorted([created["2"], Policy.objects.get(source_id="3").id])
+        )
+        self.assertEqual(Policy.objects.get(source_id="2").title, "정책 2 수정")
+        self.assertEqual(Policy.objects.count(), 3)
+
+    def test_duplicate_key_in_chunk_uses_last_payload(self):
+        result = upsert_chunk([policy_payload("1", "첫 번째"), policy_payload("1", "마지막")])
+        self.assertEqual((result["created"], result["updated"]), (1, 0))
+        self.assertEqual(list(Policy.objects.values_list("title", flat=True)), ["마지막"])
+
+    def test_update_leaves_fields_outside_payload(self):
+        upsert_chunk([policy_payload("1", "정책 1", summary="요약")])
+        upsert_chunk([policy_payload("1", "정책 1 수정")])
+        policy = Policy.objects.get(source_id="1")
+        self.assertEqual((policy.title, policy.summary), ("정책 1 수정", "요약"))
+
+
+class UpsertChunkContentHashTests(TestCase):
+    def test_unchanged_payload_is_skipped_without_writing(self):
+        upsert_chunk([policy_payload("1", "정책 1"), policy_payload("2", "정책 2")])
+        before = dict(Policy.objects.values_list("source_id", "updated_at"))
+        # 해시가 같으면 DB 값을 덮어쓰지 않는다 (직접 바꾼 값이 그대로 남아야 함)
+        Policy.objects.filter(source_id="1").update(summary="수동 수정")
+
+        result = upsert_chunk([policy_payload("1", "정책 1"), policy_payload("2", "정책 2 수정")])
+        self.assertEqual((result["created"], result["updated"], result["unchanged"]), (0, 1, 1))
+        self.assertEqual(result["changed_ids"], [Policy.objects.get(source_id="2").id])
+
+        first = Policy.objects.get(source_id="1")
+        self.assertEqual(first.summary, "수동 수정")
+        self.assertEqual(first.updated_at, before["1"])
+        self.assertGreater(Policy.objects.get(source_id="2").updated_at, before["2"])
+
+    def test_content_hash_is_filled_when_missing(self):
+        payload = policy_payload("1", "정책 1")
+        upsert_chunk([dict(payload)])
+        stored = Policy.objects.get(source_id="1").content_hash
+        self.assertEqual(stored, payload_hash(payload))
+        self.assertEqual(upsert_chunk([dict(payload, content_hash=stored)])["unchanged"], 1)
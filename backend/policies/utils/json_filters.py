@@ -0,0 +1,27 @@
+import json
+
+from django.db.models import Q
+
+
+def json_list_icontains(field: str, term: str) -> Q:
+    """
+    JSON 목록 필드의 값 중 하나가 term을 부분 문자열로 포함하는지 (icontains).
+    SQLite는 JSONField를 ensure_ascii로 저장해 한글이 \\uXXXX로 들어 있으므로, 같은 방식으로 이스케이프한 term도 함께 찾는다.
+    """
+    condition = Q(**{f"{field}__icontains": term})
+    escaped = json.dumps(term)[1:-1]
+    if escaped != term:
+        condition |= Q(**{f"{field}__icontains": escaped})
+    return condition
+
+
+def json_list_contains(field: str, value: str) -> Q:
+    """
+    JSON 문자열 목록 필드에 value와 같은 원소가 있는지 (JSONField __contains=[value]와 같은 조건).
+    SQLite는 JSONField __contains를 지원하지 않으므로 저장된 JSON 텍스트에서 따옴표까지 포함한 원소 표기를 찾는다
+    (ensure_ascii로 이스케이프된 표기와 원문 표기 모두).
+    """
+    condition = Q()
+    for encoded in dict.fromkeys([json.dumps(value), json.dumps(value, ensure_ascii=False)]):
+        condition |= Q(**{f"{field}__icontains": encoded})
+    return condition
@@ -0,0 +1,166 @@
+import math
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from policies.models import Policy
+from policies.services.catalog import catalog_version
+from policies.services.normalize_ai import normalize_query
+
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# 필드별 가중치: 가중치만큼 해당 필드의 토큰을 반복 반영
+FIELD_WEIGHTS = {
+    "title": 2,
+    "search_summary": 1,
+    "keywords": 1,
+    "summary": 1,
+}
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """
+    한국어 친화 토큰화: 소문자 단어 + 3글자 이상 단어의 문자 2-gram.
+    조사/어미가 붙은 단어("청년들", "주거비를")도 질의("청년", "주거비")와 2-gram으로 매칭된다.
+    """
+    if not text:
+        return []
+    terms: List[str] = []
+    for word in WORD_PATTERN.findall(text.lower()):
+        terms.append(word)
+        if len(word) > 2:
+            terms.extend(word[i : i + 2] for i in range(len(word) - 1))
+    return terms
+
+
+def _policy_text_terms(title, search_summary, keywords, summary) -> List[str]:
+    fields = {
+        "title": title,
+        "search_summary": search_summary,
+        "keywords": " ".join(str(k) for k in keywords) if isinstance(keywords, list) else keywords,
+        "summary": summary,
+    }
+    terms: List[str] = []
+    for field, weight in FIELD_WEIGHTS.items():
+        terms.extend(tokenize(fields[field]) * weight)
+    return terms
+
+
+class BM25SearchEngine:
+    """
+    프로세스 내 BM25 역색인.
+    docs: (정책 id, 토큰 목록) 반복자
+    """
+
+    def __init__(self, docs: Iterable[Tuple[int, List[str]]], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_ids: List[int] = []
+        self.doc_lens: List[int] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+
+        for doc_id, terms in docs:
+            idx = len(self.doc_ids)
+            self.doc_ids.append(doc_id)
+            self.doc_lens.append(len(terms))
+            counts: Dict[str, int] = defaultdict(int)
+            for term in terms:
+                counts[term] += 1
+            for term, tf in counts.items():
+                self.postings[term].append((idx, tf))
+
+        self.doc_count = len(self.doc_ids)
+        self.avg_len = (sum(self.doc_lens) / self.doc_count) if self.doc_count else 0.0
+
+    def _idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (self.doc_count - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        [(정책 id, 점수)] 점수 내림차순. 질의 토큰 postings만 순회한다.
+        """
+        # 불용어 제거 후 비면 원문 질의 사용
+        terms = set(tokenize(normalize_query(query)) or tokenize(query))
+        if not terms or not self.doc_count:
+            return []
+
+        scores: Dict[int, float] = defaultdict(float)
+        for term in terms:
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = self._idf(term)
+            for idx, tf in posting:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lens[idx] / self.avg_len)
+                scores[idx] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda x: (-x[1], self.doc_ids[x[0]]))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [(self.doc_ids[idx], score) for idx, score in ranked]
+
+
+# 매칭 id를 DB 필터(id__in)로 나눠 보낼 때 한 번에 보내는 개수
+ID_CHUNK = 500
+
+_ENGINE: Optional[BM25SearchEngine] = None
+_ENGINE_VERSION: Optional[str] = None
+_LOCK = threading.Lock()
+
+
+def build_search_engine(qs=None) -> BM25SearchEngine:
+    """
+    qs(기본: ACTIVE 정책) 색인. 문서 수/평균 길이/IDF도 이 집합 기준.
+    """
+    if qs is None:
+        qs = Policy.objects.filter(status="ACTIVE")
+    rows = qs.values_list("id", "title", "search_summary", "keywords", "summary").iterator()
+    return BM25SearchEngine((pid, _policy_text_terms(*fields)) for pid, *fields in rows)
+
+
+def get_search_engine() -> BM25SearchEngine:
+    """
+    캐시된 ACTIVE 정책 엔진. 정책 테이블 버전(catalog_version: 추가/삭제/수정 반영, 프로세스 내 짧게 캐시)이
+    색인할 때와 다르면 다시 색인한다.
+    """
+    global _ENGINE, _ENGINE_VERSION
+    version = catalog_version()
+    engine = _ENGINE
+    if engine is not None and version == _ENGINE_VERSION:
+        return engine
+    with _LOCK:
+        if _ENGINE is None or version != _ENGINE_VERSION:
+            # 색인 전에 읽은 버전을 붙인다 (색인 중 바뀌면 다음 요청에서 다시 색인)
+            _ENGINE = build_search_engine()
+            _ENGINE_VERSION = version
+        return _ENGINE
+
+
+def _rows_in(qs, ids: List[int], *fields) -> List[Tuple]:
+    # 전체 id를 읽지 않고 매칭 id만 SQL에서 교집합 (SQLite 변수 개수 제한 안에서 나눠 조회)
+    rows: List[Tuple] = []
+    for start in range(0, len(ids), ID_CHUNK):
+        rows.extend(qs.filter(id__in=ids[start : start + ID_CHUNK]).values_list("id", *fields))
+    return rows
+
+
+def ranked_policy_ids(qs, query: str, ordering: Optional[str] = None, active_only: bool = True) -> List[int]:
+    """
+    qs(필터 적용된 쿼리셋) 중 BM25 매칭 정책 id 목록.
+    ordering이 없으면 관련도 순, 있으면 그 필드 순 (DB 정렬처럼 오름차순은 NULL 먼저, 값이 같으면 관련도 순).
+    active_only: qs가 ACTIVE 정책만 대상이면 캐시된 엔진, 아니면 qs만 즉석 색인 (비활성 정책 조회용).
+    DB에서는 매칭된 정책의 id(와 정렬 필드)만 읽는다.
+    """
+    engine = get_search_engine() if active_only else build_search_engine(qs)
+    matched = [pid for pid, _ in engine.search(query)]
+    if not matched:
+        return []
+    if not ordering:
+        allowed: Set[int] = {pid for pid, in _rows_in(qs, matched)}
+        return [pid for pid in matched if pid in allowed]
+    values = dict(_rows_in(qs, matched, ordering.lstrip("-")))
+    ids = [pid for pid in matched if pid in values]
+    ids.sort(key=lambda pid: (values[pid] is not None, values[pid]), reverse=ordering.startswith("-"))
+    return ids
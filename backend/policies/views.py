@@ -7,7 +7,11 @@ from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated, AllowAny
 
+from recommends.services.facet_index import MAX_ID_FILTER
+from recommends.services.policy_index import load_facets
 from .models import Policy, Wishlist
+from .utils.json_filters import json_list_contains
+from .utils.search_engine import ranked_policy_ids
 from .serializers import (
     PolicySerializer,
     PolicyListSerializer,
@@ -22,10 +26,8 @@ from .serializers import (
 def policy_list(request):
     qs = Policy.objects.filter(status="ACTIVE")
 
-    # 검색어
+    # 검색어 (BM25 랭킹은 필터 적용 후 아래에서)
     q = request.query_params.get("q")
-    if q:
-        qs = qs.filter(search_summary__icontains=q)
 
     # 카테고리 (콤마로 구분된 복수 값 지원)
     category = request.query_params.get("category")
@@ -57,6 +59,11 @@ def policy_list(request):
     if region:
         qs = qs.filter(Q(region_scope="NATIONWIDE") | Q(region_sido=region))
 
+    # 검색어가 있으면 관련도 순 (ordering 명시 시 해당 정렬 유지)
+    if q:
+        ids = ranked_policy_ids(qs, q, ordering=request.query_params.get("ordering"))
+        return _paginate_policy_ids(request, ids)
+
     # 정렬
     ordering = request.query_params.get("ordering", "-id")
     qs = qs.order_by(ordering)
@@ -87,12 +94,24 @@ class PolicySearchPagination(PageNumberPagination):
     max_page_size = 100
 
 
+def _paginate_policy_ids(request, ids):
+    """
+    정렬된 id 목록을 페이지네이션하고 현재 페이지의 행만 DB에서 조회.
+    """
+    paginator = PolicySearchPagination()
+    page_ids = paginator.paginate_queryset(ids, request)
+    policies = Policy.objects.in_bulk(page_ids)
+    page = [policies[pid] for pid in page_ids if pid in policies]
+    serializer = PolicyListSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
+
+
 @api_view(["GET"])
 @permission_classes([AllowAny])
 def policy_search(request):
     """
     정책 검색 API
-    - 검색(q): search_summary 기반
+    - 검색(q): BM25 (title/search_summary/keywords/summary), 기본 관련도 순
     - 필터: policy_type / category / region / age / employment / 진행 여부
     - deterministic
     """
@@ -102,50 +121,65 @@ def policy_search(request):
     status = request.query_params.get("status", "ACTIVE")
     qs = qs.filter(status=status)
 
-    # 검색어
+    # 검색어 (BM25 랭킹은 필터 적용 후 아래에서)
     q = request.query_params.get("q")
-    if q:
-        qs = qs.filter(search_summary__icontains=q)
 
-    # 정책 유형
     policy_type = request.query_params.get("policy_type")
-    if policy_type:
-        qs = qs.filter(policy_type=policy_type)
-
-    # 카테고리
     category = request.query_params.get("category")
-    if category:
-        qs = qs.filter(category=category)
-
-    # 지역
     region_sido = request.query_params.get("region_sido")
-    if region_sido:
-        qs = qs.filter(
-            Q(region_scope="NATIONWIDE")
-            | Q(region_sido=region_sido)
-            | Q(applicable_regions__contains=[region_sido])
-        )
+    employment = request.query_params.get("employment")
+    try:
+        age = int(request.query_params.get("age") or "")
+    except ValueError:
+        age = None
+
+    # ACTIVE 정책은 정책 인덱스 패싯 비트셋 교집합으로 유형/카테고리/지역/연령/취업 상태 필터
+    # (인덱스가 DB보다 오래됐거나 결과가 너무 넓으면 DB 필터)
+    ids = None
+    if status == "ACTIVE" and (policy_type or category or region_sido or age is not None or employment):
+        facets = load_facets()
+        if facets is not None:
+            mask = facets.select(
+                region=region_sido,
+                age=age,
+                category=category,
+                policy_type=policy_type,
+                employment=employment,
+            )
+            ids = facets.ids_of(mask, limit=MAX_ID_FILTER)
+    if ids is not None:
+        qs = qs.filter(id__in=ids)
+    else:
+        # 정책 유형
+        if policy_type:
+            qs = qs.filter(policy_type=policy_type)
 
-    region_sigungu = request.query_params.get("region_sigungu")
-    if region_sigungu:
-        qs = qs.filter(region_sigungu=region_sigungu)
+        # 카테고리
+        if category:
+            qs = qs.filter(category=category)
+
+        # 지역
+        if region_sido:
+            qs = qs.filter(
+                Q(region_scope="NATIONWIDE")
+                | Q(region_sido=region_sido)
+                | json_list_contains("applicable_regions", region_sido)  # SQLite 호환
+            )
 
-    # 연령
-    age = request.query_params.get("age")
-    if age:
-        try:
-            age = int(age)
+        # 연령
+        if age is not None:
             qs = qs.filter(
                 Q(min_age__isnull=True) | Q(min_age__lte=age),
                 Q(max_age__isnull=True) | Q(max_age__gte=age),
             )
-        except ValueError:
-            pass
 
-    # 취업 상태
-    employment = request.query_params.get("employment")
-    if employment:
-        qs = qs.filter(employment__contains=[employment])
+        # 취업 상태
+        if employment:
+            qs = qs.filter(json_list_contains("employment", employment))  # SQLite 호환
+
+    region_sigungu = request.query_params.get("region_sigungu")
+    if region_sigungu:
+        qs = qs.filter(region_sigungu=region_sigungu)
 
     # 진행 여부(오늘 기준)
     is_open = request.query_params.get("is_open")
@@ -156,14 +190,17 @@ def policy_search(request):
             Q(end_date__isnull=True) | Q(end_date__gte=today),
         )
 
-    # 정렬
-    ordering = request.query_params.get("ordering", "deadline")
-    if ordering == "latest":
-        qs = qs.order_by("-start_date")
-    elif ordering == "name":
-        qs = qs.order_by("title")
-    else:
-        qs = qs.order_by("end_date")
+    # 정렬 (검색어가 있으면 기본 관련도 순)
+    ordering = request.query_params.get("ordering", "relevance" if q else "deadline")
+    order_fields = {
+        "latest": "-start_date",
+        "name": "title",
+        "deadline": "end_date",
+    }
+    if q:
+        ids = ranked_policy_ids(qs, q, ordering=order_fields.get(ordering), active_only=status == "ACTIVE")
+        return _paginate_policy_ids(request, ids)
+    qs = qs.order_by(order_fields.get(ordering, "end_date"))
 
     paginator = PolicySearchPagination()
     page = paginator.paginate_queryset(qs, request)
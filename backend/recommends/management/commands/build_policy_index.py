@@ -1,38 +1,215 @@
-import json
 from pathlib import Path
 
+import numpy as np
 from django.core.management.base import BaseCommand
 
 from policies.models import Policy
+from policies.services.catalog import catalog_version, reset_catalog_version
+from recommends.services.columnar_index import columnar_path
+from recommends.services.embedding import embed_texts
+from recommends.services.policy_index import (
+    INDEX_PATH,
+    content_hash,
+    embedding_paths,
+    embedding_text,
+    index_digest,
+    normalize_rows,
+    read_index_embeddings,
+    read_index_file,
+    save_array,
+    write_columnar,
+    write_index,
+)
+from recommends.services.result_cache import invalidate_all
+from recommends.services.vector_store import clear_store_version, get_collection, store_version, sync_collection
+
+# _dump_embeddings 결과
+EMBEDDINGS_SAVED = "saved"
+EMBEDDINGS_UNCHANGED = "unchanged"
+EMBEDDINGS_FAILED = "failed"
 
 
 class Command(BaseCommand):
-    help = "ACTIVE 정책을 JSON 인덱스로 덤프"
+    help = "ACTIVE 정책을 JSON/컬럼형 바이너리 인덱스 + 정규화 임베딩 행렬(.npy)로 덤프 (기존 인덱스 대비 변경분만 갱신)"
 
     def add_arguments(self, parser):
-        parser.add_argument("--output", type=str, default="backend/recommends/data/policy_index.json")
+        parser.add_argument("--output", type=str, default=str(INDEX_PATH))
+        parser.add_argument("--skip-embeddings", action="store_true", help="임베딩 행렬 생성을 건너뜀")
+        parser.add_argument("--batch-size", type=int, default=100, help="임베딩 호출당 텍스트 수")
+        parser.add_argument("--full", action="store_true", help="기존 인덱스/임베딩을 무시하고 전부 다시 생성")
 
     def handle(self, *args, **options):
         output_path = Path(options["output"])
-        output_path.parent.mkdir(parents=True, exist_ok=True)
+        # 행을 읽기 전의 정책 테이블 버전을 기록 (읽는 동안 바뀌면 워커는 다음 재생성까지 DB 필터 사용)
+        reset_catalog_version()
+        catalog = catalog_version()
+        existing, previous_version, previous_catalog = self._previous_items(output_path)
+        previous = {} if options["full"] else existing
 
-        qs = Policy.objects.filter(status="ACTIVE").order_by("id")
         items = []
-        for p in qs:
-            items.append(
-                {
-                    "id": p.id,
-                    "title": p.title,
-                    "search_summary": p.search_summary or "",
-                    "summary": p.summary or "",
-                    "category": p.category or "",
-                    "region_scope": p.region_scope or "",
-                    "region_sido": p.region_sido or "",
-                    "applicable_regions": p.applicable_regions or [],
-                    "min_age": p.min_age,
-                    "max_age": p.max_age,
-                }
+        changed_ids = set()
+        counts = {"added": 0, "updated": 0, "unchanged": 0}
+        for p in Policy.objects.filter(status="ACTIVE").order_by("id").iterator():
+            item = {
+                "id": p.id,
+                "title": p.title,
+                "search_summary": p.search_summary or "",
+                "summary": p.summary or "",
+                "category": p.category or "",
+                "region_scope": p.region_scope or "",
+                "region_sido": p.region_sido or "",
+                "applicable_regions": p.applicable_regions or [],
+                "min_age": p.min_age,
+                "max_age": p.max_age,
+                "policy_type": p.policy_type or "",
+                "employment": p.employment or [],
+            }
+            item["content_hash"] = content_hash(item)
+            old = previous.get(p.id)
+            if old is None:
+                counts["added"] += 1
+                changed_ids.add(p.id)
+            elif old.get("content_hash") != item["content_hash"]:
+                counts["updated"] += 1
+                changed_ids.add(p.id)
+            else:
+                # 내용이 같으면 기존 항목을 그대로 사용
+                item = old
+                counts["unchanged"] += 1
+            items.append(item)
+        removed = len(set(previous) - {item["id"] for item in items})
+
+        index_changed = (
+            bool(counts["added"] or counts["updated"] or removed)
+            or catalog != previous_catalog
+            or not output_path.exists()
+            or not columnar_path(output_path).exists()
+        )
+        embeddings = None
+        if not options["skip_embeddings"] and items:
+            embeddings = self._dump_embeddings(items, previous, output_path, options["batch_size"], options["full"])
+
+        if not index_changed and embeddings != EMBEDDINGS_SAVED:
+            self.stdout.write(self.style.SUCCESS(f"Index unchanged ({len(items)} policies), nothing written"))
+            return
+
+        version = index_digest(items)
+        if embeddings == EMBEDDINGS_FAILED or (embeddings is None and self._vectors_stale(items, existing)):
+            # 갱신된 정책이 이전 벡터로 랭킹되지 않도록 (id 순서가 같아도) 이전 임베딩을 버린다
+            self._drop_embeddings(output_path)
+        # 워커는 컬럼형 바이너리를 mmap으로 읽고, JSON은 다음 증분 재생성의 기준(content_hash)으로 남긴다
+        write_columnar(output_path, items, version, catalog)
+        write_index(output_path, items, version, catalog)
+        self._sync_vector_store(items, output_path, version, None if options["full"] else changed_ids, previous_version)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Dumped {len(items)} policies to {output_path} (version={version}, "
+                f"added={counts['added']}, updated={counts['updated']}, removed={removed}, "
+                f"unchanged={counts['unchanged']})"
             )
+        )
+        invalidate_all()
+
+    def _previous_items(self, output_path):
+        """
+        기존 인덱스 ({id: 항목}, 버전, 정책 테이블 버전). 이전 형식이라 content_hash가 없으면 여기서 계산한다.
+        """
+        if not output_path.exists():
+            return {}, None, None
+        try:
+            items, version, catalog = read_index_file(output_path)
+        except ValueError:
+            return {}, None, None
+        for item in items:
+            item.setdefault("content_hash", content_hash(item))
+        return {item["id"]: item for item in items}, version, catalog
+
+    def _vectors_stale(self, items, previous) -> bool:
+        # 임베딩을 건너뛴 재생성에서 임베딩 입력 텍스트가 바뀐 정책이 있는지
+        return any(
+            embedding_text(previous[item["id"]]) != embedding_text(item) for item in items if item["id"] in previous
+        )
 
-        output_path.write_text(json.dumps(items, ensure_ascii=False, indent=2), encoding="utf-8")
-        self.stdout.write(self.style.SUCCESS(f"Dumped {len(items)} policies to {output_path}"))
+    def _drop_embeddings(self, output_path):
+        for path in embedding_paths(output_path):
+            if path.exists():
+                path.unlink()
+        self.stdout.write(self.style.WARNING("Stale embedding matrix removed (semantic ranking off until next rebuild)"))
+
+    def _sync_vector_store(self, items, output_path, version, changed_ids, previous_version):
+        """
+        벡터 스토어(build_vector_store로 만든 chromadb 컬렉션)가 있으면 인덱스와 같은 임베딩으로 변경분만 반영.
+        이전 인덱스 버전과 맞지 않던 컬렉션은 전부 다시 반영하고, 임베딩이 없으면 버전 스탬프만 지워 ANN을 끈다.
+        """
+        matrix = read_index_embeddings(output_path, [item["id"] for item in items])
+        if matrix is None:
+            # 스탬프만 지우면 되므로 chromadb 클라이언트는 열지 않는다
+            if store_version() is not None:
+                clear_store_version()
+                self.stdout.write(self.style.WARNING("Vector store disabled: no embedding matrix for this index"))
+            return
+        if get_collection() is None:
+            return
+        if store_version() != previous_version:
+            changed_ids = None
+        upserted, removed = sync_collection(items, matrix, version, changed_ids)
+        self.stdout.write(self.style.SUCCESS(f"Vector store synced: upserted={upserted}, removed={removed}"))
+
+    def _previous_vectors(self, previous, output_path):
+        """
+        기존 임베딩 행렬에서 {정책 id: 행}. 임베딩 입력 텍스트가 그대로인 행만 재사용 대상이 된다.
+        """
+        matrix_path, ids_path = embedding_paths(output_path)
+        if not previous or not matrix_path.exists() or not ids_path.exists():
+            return {}
+        ids = np.load(ids_path)
+        matrix = np.load(matrix_path, mmap_mode="r")
+        if ids.shape[0] != matrix.shape[0]:
+            return {}
+        return {int(pid): matrix[row] for row, pid in enumerate(ids) if int(pid) in previous}
+
+    def _dump_embeddings(self, items, previous, output_path, batch_size, full) -> str:
+        """
+        인덱스와 같은 순서로 정책 임베딩을 계산해 행 정규화 후 .npy로 원자적 저장 (np.load(mmap_mode="r") 용).
+        임베딩 입력 텍스트가 바뀐 정책만 새로 임베딩하고 나머지 행은 기존 행렬에서 복사.
+        EMBEDDINGS_SAVED / EMBEDDINGS_UNCHANGED(기존 행렬 그대로 유효) / EMBEDDINGS_FAILED 중 하나.
+        """
+        matrix_path, ids_path = embedding_paths(output_path)
+        old_vectors = {} if full else self._previous_vectors(previous, output_path)
+        reused = {
+            item["id"]: old_vectors[item["id"]]
+            for item in items
+            if item["id"] in old_vectors and embedding_text(previous[item["id"]]) == embedding_text(item)
+        }
+        missing = [item for item in items if item["id"] not in reused]
+        if not missing and len(old_vectors) == len(items):
+            return EMBEDDINGS_UNCHANGED
+
+        texts = [embedding_text(item) or " " for item in missing]
+        vectors = []
+        try:
+            for start in range(0, len(texts), batch_size):
+                vectors.extend(embed_texts(texts[start : start + batch_size]))
+        except Exception as exc:
+            self.stdout.write(self.style.WARNING(f"Embedding matrix skipped: {exc}"))
+            return EMBEDDINGS_FAILED
+
+        fresh = dict(zip((item["id"] for item in missing), normalize_rows(np.asarray(vectors, dtype=np.float32))))
+        if reused and fresh and len(next(iter(reused.values()))) != len(next(iter(fresh.values()))):
+            # 임베딩 모델 차원이 바뀌었으면 재사용 불가
+            self.stdout.write(self.style.WARNING("Embedding dimension changed, rerun with --full"))
+            return EMBEDDINGS_FAILED
+        matrix = np.asarray(
+            [fresh[item["id"]] if item["id"] in fresh else reused[item["id"]] for item in items],
+            dtype=np.float32,
+        )
+        # 행렬을 먼저 교체하고 id 파일을 나중에 교체 (읽는 쪽은 id 순서가 맞을 때만 행렬 사용)
+        save_array(matrix_path, matrix)
+        save_array(ids_path, np.asarray([item["id"] for item in items], dtype=np.int64))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Saved embedding matrix {matrix.shape} to {matrix_path} "
+                f"(embedded={len(missing)}, reused={len(reused)})"
+            )
+        )
+        return EMBEDDINGS_SAVED
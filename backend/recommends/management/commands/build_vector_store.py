@@ -0,0 +1,38 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recommends.services.policy_index import INDEX_PATH, read_index_file, read_index_embeddings
+from recommends.services.vector_store import reset_collection, sync_collection
+
+
+class Command(BaseCommand):
+    help = "정책 인덱스의 임베딩 행렬을 로컬 ANN 벡터 스토어(chromadb)에 적재/갱신 (build_policy_index 이후 실행)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--index", type=str, default=str(INDEX_PATH), help="정책 인덱스 JSON 경로")
+        parser.add_argument("--batch-size", type=int, default=500, help="업서트 배치 크기")
+        parser.add_argument("--rebuild", action="store_true", help="컬렉션을 지우고 새로 생성")
+
+    def handle(self, *args, **options):
+        index_path = Path(options["index"])
+        if not index_path.exists():
+            raise CommandError(f"Policy index not found: {index_path} (run build_policy_index first)")
+        items, version, _ = read_index_file(index_path)
+        matrix = read_index_embeddings(index_path, [item["id"] for item in items])
+        if matrix is None:
+            raise CommandError(
+                "Embedding matrix is missing or out of date (run build_policy_index without --skip-embeddings)"
+            )
+
+        if options["rebuild"]:
+            reset_collection()
+        # 임베딩은 인덱스와 같은 행렬을 그대로 사용 → 컬렉션이 인덱스 버전과 항상 같은 내용
+        result = sync_collection(items, matrix, version, batch_size=options["batch_size"])
+        if result is None:
+            raise CommandError("chromadb is not installed")
+
+        upserted, removed = result
+        self.stdout.write(
+            self.style.SUCCESS(f"Vector store refreshed: upserted={upserted}, removed={removed}, version={version}")
+        )
@@ -1,18 +1,24 @@
-from typing import List
-
-from django.contrib.auth.models import User
-
+import asyncio
 from collections import defaultdict
-from typing import List
+from functools import partial
+from typing import Dict, List
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth.models import User
 
 from policies.serializers import PolicyBasicSerializer
+from .services.budget import budget_timeout, with_request_budget
+from .services.circuit_breaker import circuit_available
+from .services.concurrency import gather_with_deadline, run_with_deadline
+from .services.gms_client import with_async_client
 from .services.profile_candidates import get_profile_candidates
+from .services.timing import stage
 
 from .scoring.profile_score import calculate_profile_score, category_bucket, _map_profile_interest
 from .reason.profile_reason import build_profile_reason
-from .reason.profile_reason_ai import build_profile_reason_ai
+from .reason.profile_reason_ai import abuild_profile_reasons_ai, build_profile_reasons_ai
+from .reason.reason_cache import get_cached_profile_reasons, store_profile_reasons
 
 
 def _profile_interest_buckets(profile) -> List[str]:
@@ -41,9 +47,9 @@ def _profile_interest_buckets(profile) -> List[str]:
     return unique
 
 
-def profile_recommend(user: User):
+def _profile_top(user: User):
     """
-    프로필 기반 추천: DB 하드 필터 -> 점수 계산 -> 정렬/슬라이싱.
+    DB 하드 필터 -> 점수 계산 -> 정렬/다양성 슬라이싱. (프로필, [(정책, 점수, 이유 목록)]) 반환.
     """
     profile = getattr(user, "profile", None)
     candidates = get_profile_candidates(profile)
@@ -97,30 +103,80 @@ def profile_recommend(user: User):
         diversified.append((policy, score, reasons))
         if len(diversified) >= 10:
             break
-    top = diversified
-
-    results: List[dict] = []
-    for policy, score, reasons in top:
-        ai_reason = build_profile_reason_ai(policy, profile)
-        results.append(
-            {
-                "policy": policy,
-                "score": score,
-                "reason": ai_reason or build_profile_reason(reasons),
-            }
-        )
-
-    serializer = PolicyBasicSerializer([r["policy"] for r in results], many=True)
-    serialized_map = {item["id"]: item for item in serializer.data}
+    return profile, diversified
 
+
+def _serialize_policies(top) -> Dict[int, dict]:
+    serializer = PolicyBasicSerializer([policy for policy, _, _ in top], many=True)
+    return {item["id"]: item for item in serializer.data}
+
+
+def _build_results(top, ai_reasons: Dict[int, str], serialized_map: Dict[int, dict]) -> List[dict]:
     return [
         {
-            "policy_id": r["policy"].id,
-            "title": r["policy"].title,
-            "category": r["policy"].category,
-            "score": r["score"],
-            "reason": r["reason"],
-            "policy": serialized_map.get(r["policy"].id),
+            "policy_id": policy.id,
+            "title": policy.title,
+            "category": policy.category,
+            "score": score,
+            "reason": ai_reasons.get(policy.id) or build_profile_reason(reasons),
+            "policy": serialized_map.get(policy.id),
         }
-        for r in results
+        for policy, score, reasons in top
     ]
+
+
+@with_request_budget
+def profile_recommend(user: User):
+    """
+    프로필 기반 추천: DB 하드 필터 -> 점수 계산 -> 정렬/슬라이싱.
+    """
+    with stage("candidates"):
+        profile, top = _profile_top(user)
+
+    # 이유 캐시 조회 후, 캐시에 없는 정책만 LLM 일괄 생성 (한 번 호출, 기한/누락/서킷 open 시 규칙 기반 이유)
+    ai_reasons, missing = get_cached_profile_reasons([policy for policy, _, _ in top], profile)
+    if missing and circuit_available("chat"):
+        with stage("reasons"):
+            batch = run_with_deadline(
+                {"reasons": partial(build_profile_reasons_ai, missing, profile)},
+                timeout=budget_timeout(getattr(settings, "RECOMMEND_REASON_TIMEOUT", 8.0)),
+            )
+        fresh = batch.get("reasons") or {}
+        store_profile_reasons(missing, profile, fresh)
+        ai_reasons.update(fresh)
+
+    with stage("serialize"):
+        serialized = _serialize_policies(top)
+    return _build_results(top, ai_reasons, serialized)
+
+
+@with_request_budget
+@with_async_client
+async def aprofile_recommend(user: User):
+    """
+    profile_recommend의 비동기 버전.
+    후보 조회/점수 계산은 DB 스레드에서 수행하고, LLM 이유 생성과 정책 직렬화를 동시에 기다린다.
+    """
+    with stage("candidates"):
+        profile, top = await sync_to_async(_profile_top)(user)
+
+    ai_reasons, missing = get_cached_profile_reasons([policy for policy, _, _ in top], profile)
+    serialize = sync_to_async(_serialize_policies)(top)
+    if missing and circuit_available("chat"):
+        # 직렬화와 동시에 진행되므로 reasons 구간에 직렬화 시간이 겹쳐 포함된다
+        with stage("reasons"):
+            serialized, batch = await asyncio.gather(
+                serialize,
+                gather_with_deadline(
+                    {"reasons": abuild_profile_reasons_ai(missing, profile)},
+                    timeout=budget_timeout(getattr(settings, "RECOMMEND_REASON_TIMEOUT", 8.0)),
+                ),
+            )
+        fresh = batch.get("reasons") or {}
+        store_profile_reasons(missing, profile, fresh)
+        ai_reasons.update(fresh)
+    else:
+        with stage("serialize"):
+            serialized = await serialize
+
+    return _build_results(top, ai_reasons, serialized)
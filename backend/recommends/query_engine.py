@@ -1,130 +1,406 @@
-from typing import List, Optional, Dict, Tuple
+import asyncio
+import time
+from concurrent.futures import Future, TimeoutError as FuturesTimeoutError, as_completed
+from functools import partial
+from typing import Iterator, List, Optional, Dict, Tuple
 
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth.models import User
 
-from .services.query_normalize_ai import normalize_query_llm
-from .services.embedding import embed_texts
-from .services.policy_index import load_index
-from .reason.query_reason_ai import build_query_reason_ai
+from .services.query_normalize_ai import anormalize_query_llm, normalize_query_llm
+from .services.embedding import aembed_texts, embed_texts
+from .services.policy_index import IndexSnapshot, load_snapshot
+from .services.regions import REGION_KEYWORDS
+from .services.timing import stage
+from .services.budget import budget_timeout, remaining_budget, with_request_budget
+from .services.circuit_breaker import circuit_available
+from .services.concurrency import gather_with_deadline, get_normalize_executor, run_with_deadline, submit
+from .services.gms_client import with_async_client
+from .services.vector_store import query_similar
+from .reason.query_reason_ai import abuild_query_reasons_ai, build_query_reason_ai, build_query_reasons_ai
 from .reason.query_reason import build_query_reason
 
-# 간단 지역 키워드 목록 (시/도 기준)
-REGION_KEYWORDS = {
-    "서울",
-    "부산",
-    "대구",
-    "인천",
-    "광주",
-    "대전",
-    "울산",
-    "세종",
-    "경기",
-    "강원",
-    "충북",
-    "충남",
-    "전북",
-    "전남",
-    "경북",
-    "경남",
-    "제주",
-}
-
-
-def _score_candidate(item: Dict, keywords: List[str]) -> float:
-    """
-    간단 키워드 매칭 점수.
-    """
-    if not keywords:
-        return 0.0
-    text = " ".join(
-        [
-            item.get("title") or "",
-            item.get("search_summary") or "",
-            item.get("summary") or "",
-            item.get("category") or "",
+TOP_K = 4
+# 벡터 스토어(ANN)에서 가져올 후보 수
+VECTOR_TOP_K = 50
+# 임베딩 유사도(코사인)에 더하는 키워드 매칭 1건당 가산점
+KEYWORD_WEIGHT = 0.02
+
+
+def _top_positions(scored: List[Tuple[float, int]]) -> List[int]:
+    scored.sort(key=lambda x: x[0], reverse=True)
+    return [pos for _, pos in scored[:TOP_K]]
+
+
+def _unit_vector(vector) -> Optional[np.ndarray]:
+    query_vec = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(query_vec)
+    if norm == 0:
+        return None
+    return query_vec / norm
+
+
+class _Eligibility:
+    """
+    연령/지역 필터 통과 여부 (패싯 기준). 카탈로그 전체 마스크는 필요할 때(임베딩 행렬/키워드 랭킹)만 한 번 계산하고,
+    ANN 후보처럼 일부 위치만 확인할 때는 그 행만 검사한다 → ANN 경로는 카탈로그 크기와 무관.
+    """
+
+    def __init__(self, index: IndexSnapshot, age: Optional[int], region_terms):
+        self._facets = index.facets
+        self._age = age
+        self._region_terms = region_terms
+        self._mask: Optional[np.ndarray] = None
+
+    def mask(self) -> np.ndarray:
+        if self._mask is None:
+            mask = self._facets.all()
+            if self._age is not None:
+                mask &= self._facets.age(self._age)
+            if self._region_terms:
+                mask &= self._facets.region(self._region_terms)
+            self._mask = mask
+        return self._mask
+
+    def check(self, positions: List[int]) -> np.ndarray:
+        rows = np.asarray(positions, dtype=np.int64)
+        if self._mask is not None or len(rows) * 8 > self._facets.count:
+            return self.mask()[rows]
+        passed = np.ones(len(rows), dtype=bool)
+        if self._age is not None:
+            passed &= self._facets.age(self._age, rows=rows)
+        if self._region_terms:
+            passed &= self._facets.region(self._region_terms, rows=rows)
+        return passed
+
+
+def _semantic_rank(
+    index: IndexSnapshot,
+    query_vec: np.ndarray,
+    keyword_scores: Dict[int, float],
+    eligible: _Eligibility,
+    region_terms,
+    age: Optional[int],
+) -> Optional[List[int]]:
+    """
+    단위 질의 벡터로 랭킹. 사용 불가 시 None.
+    1) 로컬 벡터 스토어(ANN, 지역/연령 메타데이터 필터) top-k - 후보 위치만 필터 확인
+    2) 없으면 사전 계산된 임베딩 행렬과 행렬-벡터 곱 한 번으로 전체 카탈로그 랭킹
+    """
+    hits = query_similar(query_vec.tolist(), VECTOR_TOP_K, region_terms=region_terms, age=age, version=index.version)
+    if hits:
+        positions = index.positions
+        candidates = [(positions[pid], sim) for pid, sim in hits if pid in positions]
+        passed = eligible.check([pos for pos, _ in candidates])
+        scored = [
+            (sim + KEYWORD_WEIGHT * keyword_scores.get(pos, 0.0), pos)
+            for (pos, sim), ok in zip(candidates, passed)
+            if ok
         ]
-    ).lower()
-    score = 0
-    for kw in keywords:
-        if kw and kw.lower() in text:
-            score += 1
-    return float(score)
+        if scored:
+            return _top_positions(scored)
 
+    matrix = index.embeddings
+    if matrix is None:
+        return None
+    try:
+        sims = matrix @ query_vec
+    except Exception:
+        return None
 
-def _cosine_sim(a, b) -> float:
-    dot = sum(x * y for x, y in zip(a, b))
-    na = sum(x * x for x in a) ** 0.5
-    nb = sum(y * y for y in b) ** 0.5
-    if na == 0 or nb == 0:
-        return 0.0
-    return dot / (na * nb)
+    positions = np.flatnonzero(eligible.mask())
+    if not len(positions):
+        return []
+    bonus = np.zeros(len(sims), dtype=np.float32)
+    if keyword_scores:
+        bonus[list(keyword_scores)] = list(keyword_scores.values())
+    scores = sims[positions] + KEYWORD_WEIGHT * bonus[positions]
+    k = min(TOP_K, len(positions))
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return [int(positions[i]) for i in top]
 
 
-def query_recommend(query: str, user: Optional[User] = None) -> List[dict]:
+def _semantic_top(
+    index: IndexSnapshot,
+    intent: str,
+    keyword_scores: Dict[int, float],
+    eligible: _Eligibility,
+    region_terms,
+    age: Optional[int],
+) -> Optional[List[int]]:
+    """
+    임베딩 랭킹 (질의만 임베딩). 사용 불가 시 None.
+    """
+    try:
+        query_vec = _unit_vector(embed_texts([intent])[0])
+    except Exception:
+        return None
+    if query_vec is None:
+        return None
+    return _semantic_rank(index, query_vec, keyword_scores, eligible, region_terms, age)
+
+
+async def _asemantic_top(
+    index: IndexSnapshot,
+    intent: str,
+    keyword_scores: Dict[int, float],
+    eligible: _Eligibility,
+    region_terms,
+    age: Optional[int],
+) -> Optional[List[int]]:
+    """
+    _semantic_top의 비동기 버전 (임베딩은 await, 벡터 스토어/행렬 랭킹은 스레드에서).
+    """
+    try:
+        query_vec = _unit_vector((await aembed_texts([intent]))[0])
+    except Exception:
+        return None
+    if query_vec is None:
+        return None
+    return await asyncio.to_thread(_semantic_rank, index, query_vec, keyword_scores, eligible, region_terms, age)
+
+
+def _user_age(user: Optional[User]) -> Optional[int]:
+    return getattr(getattr(user, "profile", None), "age", None)
+
+
+def _query_terms(query: str, normalized: Dict) -> Tuple[str, List[str], set]:
     """
-    JSON 인덱스 기반: LLM 정규화 → 키워드 필터로 후보 30개 → 임베딩 유사도 top4 → LLM 이유.
+    (의도 문장, 검색어 목록, 지역 키워드) 추출.
     """
-    normalized = normalize_query_llm(query)
     intent = normalized.get("intent") or query
     keywords = normalized.get("keywords") or []
     tokens = intent.split() + query.split()
     terms = [t for t in keywords + tokens if t]
-
-    # 지역 키워드 추출
     region_terms = {t for t in terms for r in REGION_KEYWORDS if r in t}
-    has_region_filter = bool(region_terms)
+    return intent, terms, region_terms
 
-    index = load_index()
-    if not index:
-        return []
 
-    # 1) 키워드 매칭 후보 선별 (최소 1개 이상 매칭)
-    scored: List[Tuple[float, Dict]] = []
-    for item in index:
-        if has_region_filter:
-            region_match = False
-            item_region = (item.get("region_sido") or "").lower()
-            item_regions = [str(r).lower() for r in (item.get("applicable_regions") or [])]
-            for rt in region_terms:
-                lrt = rt.lower()
-                if lrt in item_region or any(lrt in r for r in item_regions) or item.get("region_scope") == "NATIONWIDE":
-                    region_match = True
-                    break
-            if not region_match:
-                continue
-        score = _score_candidate(item, terms)
-        if score <= 0:
-            continue
-        scored.append((score, item))
+def _normalize_deadline() -> Optional[float]:
+    # 정규화 대기 시간도 요청 예산 안에서만 허용
+    timeout = getattr(settings, "QUERY_NORMALIZE_TIMEOUT", 2.0)
+    timeout = budget_timeout(timeout) if timeout else remaining_budget()
+    return None if timeout is None else time.monotonic() + timeout
 
-    scored.sort(key=lambda x: x[0], reverse=True)
-    candidates = [item for _, item in scored[:30]] if scored else []
-    if not candidates:
-        return []
 
-    # 2) 임베딩 재랭크 (search_summary 우선, fallback summary/title)
-    texts = [
-        (c.get("search_summary") or c.get("summary") or c.get("title") or "")[:400] for c in candidates
-    ]
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+
+def _prefilter(index: IndexSnapshot, query: str) -> Dict[int, float]:
+    """
+    LLM 정규화를 기다리는 동안 원문 토큰만으로 키워드 점수를 미리 계산 (매칭 문서만).
+    """
+    return index.keywords.score(query.split())
+
+
+def _merge_normalized(
+    index: IndexSnapshot,
+    query: str,
+    normalized: Optional[Dict],
+    raw_scores: Dict[int, float],
+) -> Tuple[str, Dict[int, float], set]:
+    """
+    정규화 결과가 도착하면 LLM 키워드/의도 토큰 점수를 원문 토큰 점수에 더한다 (점수는 키워드별 합이라 순차 계산과 같음).
+    정규화가 늦거나 실패하면(None) 원문 토큰 후보를 그대로 사용.
+    """
+    if normalized is None:
+        _, _, region_terms = _query_terms(query, {})
+        return query, raw_scores, region_terms
+
+    intent, _, region_terms = _query_terms(query, normalized)
+    extra = [t for t in (normalized.get("keywords") or []) + intent.split() if t]
+    scores = dict(raw_scores)
+    for pos, score in index.keywords.score(extra).items():
+        scores[pos] = scores.get(pos, 0.0) + score
+    return intent, scores, region_terms
+
+
+def _wait_normalized(future: Future, deadline: Optional[float]) -> Optional[Dict]:
     try:
-        query_vec = embed_texts([intent])[0]
-        doc_vecs = embed_texts(texts)
-        sims = [(_cosine_sim(query_vec, dv), c) for dv, c in zip(doc_vecs, candidates)]
-        sims.sort(key=lambda x: x[0], reverse=True)
-        top_items = [c for _, c in sims[:4]]
+        return future.result(timeout=_remaining(deadline))
     except Exception:
-        top_items = candidates[:4]
-
-    results = []
-    for item in top_items:
-        ai_reason = build_query_reason_ai(item, query, summary=item.get("search_summary") or item.get("summary"))
-        fallback = build_query_reason(item, query)
-        results.append(
-            {
-                "policy_id": item["id"],
-                "title": item.get("title"),
-                "category": item.get("category"),
-                "reason": ai_reason or fallback,
-            }
+        # 기한 초과: 아직 대기 중이면 취소, 실행 중이면 백그라운드에서 끝까지 실행되어 캐시만 채운다
+        future.cancel()
+        return None
+
+
+async def _await_normalized(task: asyncio.Future, deadline: Optional[float]) -> Optional[Dict]:
+    done, _ = await asyncio.wait({task}, timeout=_remaining(deadline))
+    if not done:
+        task.cancel()
+        return None
+    if task.exception() is not None:
+        return None
+    return task.result()
+
+
+def _keyword_top(keyword_scores: Dict[int, float], eligible: _Eligibility) -> List[int]:
+    # fallback: 필터를 통과한 키워드 매칭 후보 (최소 1개 이상 매칭)
+    matched = sorted(pos for pos, score in keyword_scores.items() if score > 0)
+    if not matched:
+        return []
+    passed = eligible.check(matched)
+    return _top_positions([(keyword_scores[pos], pos) for pos, ok in zip(matched, passed) if ok])
+
+
+def query_cards(top_items: List[Dict]) -> List[dict]:
+    """
+    이유가 채워지기 전의 추천 카드 (스트리밍 응답의 첫 이벤트).
+    """
+    return [
+        {
+            "policy_id": item["id"],
+            "title": item.get("title"),
+            "category": item.get("category"),
+            "reason": None,
+        }
+        for item in top_items
+    ]
+
+
+def _build_results(top_items: List[Dict], query: str, ai_reasons: Dict[int, str]) -> List[dict]:
+    return [
+        {
+            "policy_id": item["id"],
+            "title": item.get("title"),
+            "category": item.get("category"),
+            "reason": ai_reasons.get(item["id"]) or build_query_reason(item, query),
+        }
+        for item in top_items
+    ]
+
+
+def rank_query(query: str, user: Optional[User] = None) -> List[Dict]:
+    """
+    이유 생성 전까지의 검색 단계: LLM 정규화 → 지역/연령 필터 → 임베딩/키워드 랭킹. 상위 인덱스 항목(dict) 반환.
+    정규화를 기다리는 동안 원문 토큰으로 후보를 미리 거르고(speculative), 정규화가 기한을 넘기거나 실패하면 그 후보를 사용.
+    """
+    deadline = _normalize_deadline()
+    normalize_future = submit(normalize_query_llm, query, executor=get_normalize_executor())
+
+    with stage("prefilter"):
+        index = load_snapshot()
+        if not index.items:
+            return []
+
+        # 1) 원문 토큰 키워드 점수 (정규화와 겹쳐 실행)
+        age = _user_age(user)
+        raw_scores = _prefilter(index, query)
+
+    # 2) 정규화 결과 병합 + 지역 필터
+    with stage("normalize"):
+        normalized = _wait_normalized(normalize_future, deadline)
+    with stage("rank"):
+        intent, keyword_scores, region_terms = _merge_normalized(index, query, normalized, raw_scores)
+        eligible = _Eligibility(index, age, region_terms)
+
+        # 3) 임베딩 랭킹 (질의만 임베딩)
+        top_positions = _semantic_top(index, intent, keyword_scores, eligible, region_terms, age)
+        if top_positions is None:
+            top_positions = _keyword_top(keyword_scores, eligible)
+    # 인덱스 레코드는 읽기 전용 view → 밖으로 넘길 항목만 dict로 만든다
+    return [dict(index.items[pos]) for pos in top_positions]
+
+
+def iter_query_reasons(top_items: List[Dict], query: str) -> Iterator[Tuple[int, str]]:
+    """
+    (정책 id, 이유)를 내보낸다 (스트리밍 응답용). 기한을 넘기거나 실패/서킷 open인 정책은 규칙 기반 이유로 채운다.
+    기본은 query_recommend와 같은 일괄 LLM 호출 한 번. RECOMMEND_STREAM_REASONS_PER_POLICY가 켜져 있으면
+    정책별로 동시에 호출해 끝나는 순서대로 내보낸다 (첫 이유가 빨리 오지만 호출 수가 정책 수만큼 늘어남).
+    """
+    pending = {item["id"]: item for item in top_items}
+    timeout = budget_timeout(getattr(settings, "RECOMMEND_REASON_TIMEOUT", 8.0))
+    if circuit_available("chat") and not getattr(settings, "RECOMMEND_STREAM_REASONS_PER_POLICY", False):
+        with stage("reasons"):
+            batch = run_with_deadline({"reasons": partial(build_query_reasons_ai, top_items, query)}, timeout=timeout)
+        reasons = batch.get("reasons") or {}
+        for item in top_items:
+            yield item["id"], reasons.get(item["id"]) or build_query_reason(item, query)
+        return
+    if circuit_available("chat"):
+        futures = {submit(build_query_reason_ai, item, query): item["id"] for item in top_items}
+        try:
+            for future in as_completed(futures, timeout=timeout):
+                pid = futures[future]
+                item = pending.pop(pid)
+                try:
+                    reason = future.result()
+                except Exception:
+                    reason = ""
+                yield pid, reason or build_query_reason(item, query)
+        except FuturesTimeoutError:
+            for future in futures:
+                future.cancel()
+    for pid, item in pending.items():
+        yield pid, build_query_reason(item, query)
+
+
+@with_request_budget
+def query_recommend(query: str, user: Optional[User] = None) -> List[dict]:
+    """
+    JSON 인덱스 기반: LLM 정규화 → 지역/연령 필터 → 벡터 스토어 또는 임베딩 행렬 유사도(+키워드 가산) top4 → LLM 이유.
+    임베딩을 쓸 수 없으면(서킷 open 포함) 키워드 매칭 순으로 대체. 모든 단계는 요청 예산(RECOMMEND_REQUEST_BUDGET) 안에서 실행.
+    """
+    top_items = rank_query(query, user)
+    if not top_items:
+        return []
+
+    # LLM 이유 일괄 생성 (한 번 호출, 기한/누락/서킷 open 시 규칙 기반 이유)
+    batch = {}
+    if circuit_available("chat"):
+        with stage("reasons"):
+            batch = run_with_deadline(
+                {"reasons": partial(build_query_reasons_ai, top_items, query)},
+                timeout=budget_timeout(getattr(settings, "RECOMMEND_REASON_TIMEOUT", 8.0)),
+            )
+    return _build_results(top_items, query, batch.get("reasons") or {})
+
+
+@with_request_budget
+@with_async_client
+async def aquery_recommend(query: str, user: Optional[User] = None) -> List[dict]:
+    """
+    query_recommend의 비동기 버전.
+    LLM 정규화를 띄워 둔 채 프로필 연령 조회(DB)/인덱스 로드/원문 토큰 사전 필터를 수행한 뒤 같은 단계를 진행.
+    키워드 점수 계산과 카탈로그 전체 마스크가 필요할 수 있는 랭킹은 이벤트 루프를 막지 않도록 스레드에서 실행.
+    """
+    deadline = _normalize_deadline()
+    normalize_task = asyncio.ensure_future(anormalize_query_llm(query))
+
+    with stage("prefilter"):
+        age, index = await asyncio.gather(
+            sync_to_async(_user_age)(user),
+            asyncio.to_thread(load_snapshot),
         )
-    return results
+        if not index.items:
+            normalize_task.cancel()
+            return []
+        raw_scores = await asyncio.to_thread(_prefilter, index, query)
+
+    with stage("normalize"):
+        normalized = await _await_normalized(normalize_task, deadline)
+    with stage("rank"):
+        intent, keyword_scores, region_terms = await asyncio.to_thread(
+            _merge_normalized, index, query, normalized, raw_scores
+        )
+        eligible = _Eligibility(index, age, region_terms)
+
+        top_positions = await _asemantic_top(index, intent, keyword_scores, eligible, region_terms, age)
+        if top_positions is None:
+            top_positions = await asyncio.to_thread(_keyword_top, keyword_scores, eligible)
+    top_items = [dict(index.items[pos]) for pos in top_positions]
+    if not top_items:
+        return []
+
+    batch = {}
+    if circuit_available("chat"):
+        with stage("reasons"):
+            batch = await gather_with_deadline(
+                {"reasons": abuild_query_reasons_ai(top_items, query)},
+                timeout=budget_timeout(getattr(settings, "RECOMMEND_REASON_TIMEOUT", 8.0)),
+            )
+    return _build_results(top_items, query, batch.get("reasons") or {})
@@ -1,37 +1,71 @@
-from typing import Optional
+from typing import Dict, List, Optional
 
-from ..services.ai_client import chat_completion
+from ..services.ai_client import achat_completion, chat_completion
+from .reason_json import reasons_parser
 
 
-def build_profile_reason_ai(policy, profile) -> str:
+def _profile_reasons_messages(policies: List, profile) -> List[Dict[str, str]]:
     """
-    LLM으로 프로필 기반 추천 이유 생성. 실패 시 빈 문자열 반환.
+    일괄 이유 생성 프롬프트.
     """
-    policy_summary = getattr(policy, "summary", "") or getattr(policy, "search_summary", "") or ""
-    policy_region = getattr(policy, "region_scope", "") or ""
     profile_region = getattr(profile, "region_sido", None) or getattr(profile, "region", None) or ""
     profile_interest = getattr(profile, "interest", None) or ""
 
+    lines = []
+    for policy in policies:
+        policy_summary = getattr(policy, "summary", "") or getattr(policy, "search_summary", "") or ""
+        policy_region = getattr(policy, "region_scope", "") or ""
+        lines.append(
+            f"- id:{policy.id}, 제목:{getattr(policy, 'title', '')}, 요약:{policy_summary[:200]}, 지역:{policy_region}"
+        )
+
     system = (
-        "너는 정책 추천 카드의 설명을 짧게 써주는 보조야. 한국어로 한 문장(50자 내외)으로 답해."
-        "알고리즘 설명 없이, 사용자 관심/지역과 정책 내용을 연결해서 설명해."
+        "너는 정책 추천 카드의 설명을 짧게 써주는 보조야. 각 정책마다 한국어로 한 문장(50자 내외)으로 답해."
+        "알고리즘 설명 없이, 사용자 관심/지역과 정책 내용을 연결해서 설명해. JSON으로만 답변해."
     )
     user = (
-        f"정책 제목: {getattr(policy, 'title', '')}\n"
-        f"정책 요약: {policy_summary}\n"
-        f"정책 지역: {policy_region}\n"
         f"사용자 관심: {profile_interest}\n"
         f"사용자 지역: {profile_region}\n"
-        "한 문장으로, 친근하게 작성해."
+        f"정책 목록:\n" + "\n".join(lines) + "\n"
+        "모든 정책에 대해 친근한 한 문장으로, 아래 JSON 리스트 포맷으로만 출력:\n"
+        '[{"id": <정책 id>, "reason": "<한 문장>"}]'
     )
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": user},
+    ]
+
+
+def build_profile_reasons_ai(policies: List, profile) -> Dict[int, str]:
+    """
+    LLM 한 번 호출로 프로필 기반 추천 이유를 일괄 생성.
+    {정책 id: 이유} 반환. 누락/잘못된 id는 빠지며 실패 시 빈 dict (호출측에서 규칙 기반 fallback).
+    """
+    if not policies:
+        return {}
+    try:
+        return chat_completion(
+            _profile_reasons_messages(policies, profile),
+            model="gpt-4o-mini",
+            site="profile_reasons",
+            parse=reasons_parser([p.id for p in policies], 80),
+        )
+    except Exception:
+        return {}
+
+
+async def abuild_profile_reasons_ai(policies: List, profile) -> Dict[int, str]:
+    """
+    build_profile_reasons_ai의 비동기 버전.
+    """
+    if not policies:
+        return {}
     try:
-        text = chat_completion(
-            [
-                {"role": "system", "content": system},
-                {"role": "user", "content": user},
-            ],
+        return await achat_completion(
+            _profile_reasons_messages(policies, profile),
             model="gpt-4o-mini",
-        ).strip()
-        return text[:80]
+            site="profile_reasons",
+            parse=reasons_parser([p.id for p in policies], 80),
+        )
     except Exception:
-        return ""
+        return {}
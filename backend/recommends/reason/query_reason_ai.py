@@ -1,6 +1,7 @@
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
-from ..services.ai_client import chat_completion
+from ..services.ai_client import achat_completion, chat_completion
+from .reason_json import reasons_parser
 
 
 def build_query_reason_ai(policy, query: str, summary: Optional[str] = None) -> str:
@@ -32,7 +33,73 @@ def build_query_reason_ai(policy, query: str, summary: Optional[str] = None) ->
                 {"role": "user", "content": user},
             ],
             model="gpt-4o-mini",
+            site="query_reason",
         ).strip()
         return text[:80]
     except Exception:
         return ""
+
+
+def _query_reasons_messages(policies: List, query: str) -> Tuple[List[Dict[str, str]], List]:
+    """
+    일괄 이유 생성 프롬프트와 정책 id 목록.
+    """
+    lines = []
+    ids = []
+    for policy in policies:
+        if isinstance(policy, dict):
+            pid = policy.get("id")
+            title = policy.get("title", "")
+            summary_text = policy.get("search_summary") or policy.get("summary") or ""
+        else:
+            pid = getattr(policy, "id", None)
+            title = getattr(policy, "title", "")
+            summary_text = getattr(policy, "search_summary", "") or getattr(policy, "summary", "") or ""
+        ids.append(pid)
+        lines.append(f"- id:{pid}, 제목:{title}, 요약:{summary_text[:200]}")
+
+    system = (
+        "너는 정책 추천 이유를 짧게 생성하는 보조야. 각 정책마다 한국어 한 문장(50~80자)으로 답해. "
+        "알고리즘 설명 없이, 사용자의 질의와 정책 내용을 연결해서 구체적으로 설명해. "
+        "가능하면 지역/혜택/대상 단어를 포함해줘. JSON으로만 답변해."
+    )
+    user = (
+        f"사용자 질의: {query}\n"
+        f"정책 목록:\n" + "\n".join(lines) + "\n"
+        "모든 정책에 대해 아래 JSON 리스트 포맷으로만 출력:\n"
+        '[{"id": <정책 id>, "reason": "<한 문장>"}]'
+    )
+    messages = [
+        {"role": "system", "content": system},
+        {"role": "user", "content": user},
+    ]
+    return messages, ids
+
+
+def build_query_reasons_ai(policies: List, query: str) -> Dict[int, str]:
+    """
+    LLM 한 번 호출로 상위 정책들의 질의-정책 연결 이유를 생성.
+    {정책 id: 이유} 반환. 누락/잘못된 id는 빠지며 실패 시 빈 dict (호출측에서 규칙 기반 fallback).
+    """
+    if not policies:
+        return {}
+    messages, ids = _query_reasons_messages(policies, query)
+    try:
+        return chat_completion(messages, model="gpt-4o-mini", site="query_reasons", parse=reasons_parser(ids, 80))
+    except Exception:
+        return {}
+
+
+async def abuild_query_reasons_ai(policies: List, query: str) -> Dict[int, str]:
+    """
+    build_query_reasons_ai의 비동기 버전.
+    """
+    if not policies:
+        return {}
+    messages, ids = _query_reasons_messages(policies, query)
+    try:
+        return await achat_completion(
+            messages, model="gpt-4o-mini", site="query_reasons", parse=reasons_parser(ids, 80)
+        )
+    except Exception:
+        return {}
@@ -0,0 +1,75 @@
+import hashlib
+import json
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+
+from ..services.ttl_cache import TTLCache
+
+_PROFILE_REASONS = TTLCache(
+    max_entries=getattr(settings, "REASON_CACHE_MAX_ENTRIES", 5000),
+    ttl=getattr(settings, "REASON_CACHE_TTL", 6 * 60 * 60),
+)
+
+
+def policy_content_hash(policy) -> str:
+    """
+    프로필 추천 이유 생성에 쓰이는 정책 필드(제목/요약/지역)의 해시.
+    재적재로 내용이 바뀐 정책은 해시가 달라져 기존 캐시 항목을 더 이상 사용하지 않는다.
+    """
+    content = "\x1f".join(
+        [
+            getattr(policy, "title", "") or "",
+            getattr(policy, "summary", "") or "",
+            getattr(policy, "search_summary", "") or "",
+            getattr(policy, "region_scope", "") or "",
+        ]
+    )
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+def profile_signature(profile) -> str:
+    """
+    이유 생성에 쓰이는 프로필 필드(관심/지역)만으로 만든 정규화 시그니처.
+    관심·지역이 같은 사용자끼리 캐시를 공유한다.
+    """
+    fields = {
+        "interest": (getattr(profile, "interest", None) or "").strip(),
+        "region": (getattr(profile, "region_sido", None) or getattr(profile, "region", None) or "").strip(),
+    }
+    return json.dumps(fields, ensure_ascii=False, sort_keys=True)
+
+
+def _key(policy, signature: str) -> Tuple[int, str, str]:
+    return (policy.id, policy_content_hash(policy), signature)
+
+
+def get_cached_profile_reasons(policies: List, profile) -> Tuple[Dict[int, str], List]:
+    """
+    캐시된 이유 {정책 id: 이유}와 캐시에 없는 정책 목록을 반환.
+    """
+    signature = profile_signature(profile)
+    cached: Dict[int, str] = {}
+    missing = []
+    for policy in policies:
+        reason = _PROFILE_REASONS.get(_key(policy, signature))
+        if reason:
+            cached[policy.id] = reason
+        else:
+            missing.append(policy)
+    return cached, missing
+
+
+def store_profile_reasons(policies: List, profile, reasons: Dict[int, str]):
+    """
+    LLM이 생성한 이유만 저장 (규칙 기반 fallback은 저장하지 않음).
+    """
+    signature = profile_signature(profile)
+    for policy in policies:
+        reason = reasons.get(policy.id)
+        if reason:
+            _PROFILE_REASONS.set(_key(policy, signature), reason)
+
+
+def profile_reason_cache_stats() -> Dict[str, float]:
+    return _PROFILE_REASONS.stats()
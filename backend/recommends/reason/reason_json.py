@@ -0,0 +1,51 @@
+import json
+import re
+from typing import Callable, Dict, Iterable
+
+
+def reasons_parser(valid_ids: Iterable[int], max_len: int) -> Callable[[str], Dict[int, str]]:
+    """
+    chat_completion(parse=)에 넘길 해석 함수. 이유를 하나도 얻지 못하면 ValueError (호출이 parse_failure로 기록됨).
+    """
+    valid_ids = list(valid_ids)
+
+    def parse(text: str) -> Dict[int, str]:
+        reasons = parse_reasons(text, valid_ids, max_len)
+        if not reasons:
+            raise ValueError("no usable reasons in model response")
+        return reasons
+
+    return parse
+
+
+def parse_reasons(text: str, valid_ids: Iterable[int], max_len: int) -> Dict[int, str]:
+    """
+    모델 응답의 JSON 리스트([{"id": .., "reason": ..}])를 {정책 id: 이유}로 변환.
+    요청하지 않은 id, 빈 reason, 형식 오류 항목은 버린다. 실패 시 빈 dict.
+    """
+    try:
+        items = json.loads(text)
+    except Exception:
+        match = re.search(r"\[.*\]", text or "", re.DOTALL)
+        if not match:
+            return {}
+        try:
+            items = json.loads(match.group(0))
+        except Exception:
+            return {}
+    if not isinstance(items, list):
+        return {}
+
+    valid = set(valid_ids)
+    reasons: Dict[int, str] = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        try:
+            pid = int(item.get("id"))
+        except (TypeError, ValueError):
+            continue
+        reason = str(item.get("reason") or "").strip()
+        if pid in valid and reason and pid not in reasons:
+            reasons[pid] = reason[:max_len]
+    return reasons
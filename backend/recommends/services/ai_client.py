@@ -1,60 +1,45 @@
-import os
-from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Optional
 
-import requests
-from django.conf import settings
+from .gms_client import apost_json, post_json
 
 
-def _load_env():
+def _content_parser(parse: Optional[Callable[[str], Any]]) -> Callable[[Dict[str, Any]], Any]:
+    # 응답 텍스트 추출도 해석의 일부 (형식이 다르면 parse_failure로 기록)
+    def parse_content(data: Dict[str, Any]) -> Any:
+        text = data["choices"][0]["message"]["content"]
+        return text if parse is None else parse(text)
+
+    return parse_content
+
+
+def chat_completion(
+    messages: List[Dict[str, Any]],
+    model: str = "gpt-4o-mini",
+    site: Optional[str] = None,
+    parse: Optional[Callable[[str], Any]] = None,
+) -> Any:
     """
-    Minimal .env loader (no external deps). Looks for .env at project root (backend와 같은 레벨).
+    GMS 프록시를 통해 OpenAI Chat Completions 호출. site는 호출 위치 라벨.
+    parse를 주면 응답 텍스트 대신 parse(텍스트)를 반환하고, 실패하면 호출을 parse_failure로 기록한 뒤 ResponseParseError.
     """
-    try:
-        env_path = Path(__file__).resolve().parents[3] / ".env"
-        if not env_path.exists():
-            return
-        for line in env_path.read_text(encoding="utf-8").splitlines():
-            if not line or line.strip().startswith("#") or "=" not in line:
-                continue
-            k, v = line.split("=", 1)
-            k = k.strip()
-            v = v.strip().strip('"').strip("'")
-            if k and k not in os.environ:
-                os.environ[k] = v
-    except Exception:
-        return
-
-
-def _get_gms_key() -> str:
-    key = os.getenv("GMS_KEY", getattr(settings, "GMS_KEY", None))
-    if not key:
-        _load_env()
-        key = os.getenv("GMS_KEY", getattr(settings, "GMS_KEY", None))
-    if not key:
-        raise RuntimeError("GMS_KEY is not configured")
-    return key
-
-
-def chat_completion(messages: List[Dict[str, Any]], model: str = "gpt-4o-mini") -> str:
+    payload = {
+        "model": model,
+        "messages": messages,
+    }
+    return post_json("chat", payload, site=site, parse=_content_parser(parse))
+
+
+async def achat_completion(
+    messages: List[Dict[str, Any]],
+    model: str = "gpt-4o-mini",
+    site: Optional[str] = None,
+    parse: Optional[Callable[[str], Any]] = None,
+) -> Any:
     """
-    GMS 프록시를 통해 OpenAI Chat Completions 호출.
+    chat_completion의 비동기 버전.
     """
-    api_key = _get_gms_key()
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {api_key}",
-    }
     payload = {
         "model": model,
         "messages": messages,
     }
-    resp = requests.post(
-        "https://gms.ssafy.io/gmsapi/api.openai.com/v1/chat/completions",
-        headers=headers,
-        json=payload,
-        timeout=30,
-    )
-    resp.raise_for_status()
-    data = resp.json()
-    return data["choices"][0]["message"]["content"]
+    return await apost_json("chat", payload, site=site, parse=_content_parser(parse))
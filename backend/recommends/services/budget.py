@@ -0,0 +1,93 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Optional
+
+from django.conf import settings
+
+# 현재 요청의 마감 시각 (time.monotonic 기준). 스레드 풀로 넘길 때는 contextvars.copy_context()로 전달.
+_DEADLINE: ContextVar[Optional[float]] = ContextVar("recommend_budget_deadline", default=None)
+
+
+class BudgetExceededError(RuntimeError):
+    """
+    요청 전체 예산을 다 써서 업스트림을 호출하지 않음.
+    """
+
+
+@contextmanager
+def request_budget(seconds: Optional[float] = None):
+    """
+    요청 전체 시간 예산(초). 중첩되면 더 이른 마감 시각을 사용한다.
+    """
+    if seconds is None:
+        seconds = getattr(settings, "RECOMMEND_REQUEST_BUDGET", 15.0)
+    deadline = time.monotonic() + seconds
+    current = _DEADLINE.get()
+    token = _DEADLINE.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(token)
+
+
+def with_request_budget(func):
+    """
+    엔진 진입점용 데코레이터 (동기/비동기 함수 모두 지원).
+    """
+    if asyncio.iscoroutinefunction(func):
+
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            with request_budget():
+                return await func(*args, **kwargs)
+
+        return async_wrapper
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with request_budget():
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+class WorkBudget:
+    """
+    스트리밍 응답용 요청 예산: step() 블록 안에서 쓴 시간만 차감한다.
+    yield로 멈춰 있는 동안(클라이언트가 읽는 시간)은 예산을 쓰지 않고, 예산 컨텍스트가 블록 밖(yield 너머)으로 새지 않는다.
+    """
+
+    def __init__(self, seconds: Optional[float] = None):
+        if seconds is None:
+            seconds = getattr(settings, "RECOMMEND_REQUEST_BUDGET", 15.0)
+        self.remaining = seconds
+
+    @contextmanager
+    def step(self):
+        started = time.monotonic()
+        try:
+            with request_budget(self.remaining):
+                yield
+        finally:
+            self.remaining = max(0.0, self.remaining - (time.monotonic() - started))
+
+
+def remaining_budget() -> Optional[float]:
+    """
+    남은 예산(초). 예산이 없는 호출(관리 명령 등)은 None.
+    """
+    deadline = _DEADLINE.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def budget_timeout(timeout: float) -> float:
+    """
+    단계별 타임아웃을 남은 예산 이하로 제한.
+    """
+    remaining = remaining_budget()
+    return timeout if remaining is None else min(timeout, remaining)
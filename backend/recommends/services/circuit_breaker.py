@@ -0,0 +1,126 @@
+import threading
+import time
+from typing import Dict
+
+from django.conf import settings
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    업스트림 서킷이 열려 있어 호출하지 않음 (호출측에서 규칙 기반 fallback).
+    """
+
+
+class CircuitBreaker:
+    """
+    업스트림(chat / embeddings / gemini)별 서킷 브레이커 (스레드 안전).
+    - closed: 연속 실패 또는 느린 응답(slow_call 초 이상)이 failure_threshold회 쌓이면 open
+    - open: reset_timeout(초) 동안 호출 차단
+    - half_open: 시험 호출 한 건만 허용, 성공하면 closed / 실패하면 다시 open
+    """
+
+    def __init__(self, name: str, failure_threshold: int, slow_call: float, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call = slow_call
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+            self._trial_in_flight = False
+
+    def available(self) -> bool:
+        """
+        호출 가능 여부만 확인 (half-open 시험 호출 슬롯은 소비하지 않음).
+        """
+        with self._lock:
+            self._refresh()
+            return self.state == CLOSED or (self.state == HALF_OPEN and not self._trial_in_flight)
+
+    def allow(self) -> bool:
+        """
+        호출 직전에 사용. half-open이면 시험 호출 한 건만 통과시킨다.
+        """
+        with self._lock:
+            self._refresh()
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, ok: bool, latency: float):
+        """
+        호출 결과 기록. 성공이라도 slow_call 초 이상 걸리면 실패로 센다.
+        """
+        failed = not ok or latency >= self.slow_call
+        with self._lock:
+            self._trial_in_flight = False
+            if not failed:
+                self.state = CLOSED
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        """
+        업스트림 상태와 무관하게 끝난 호출 (예: 요청 예산 소진) - 시험 호출 슬롯만 반납.
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            self._refresh()
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "rejected": self.rejected,
+            }
+
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+_LOCK = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    breaker = _BREAKERS.get(name)
+    if breaker is None:
+        with _LOCK:
+            breaker = _BREAKERS.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    name,
+                    failure_threshold=getattr(settings, "GMS_BREAKER_FAILURE_THRESHOLD", 5),
+                    slow_call=getattr(settings, "GMS_BREAKER_SLOW_CALL", 10.0),
+                    reset_timeout=getattr(settings, "GMS_BREAKER_RESET_TIMEOUT", 30.0),
+                )
+                _BREAKERS[name] = breaker
+    return breaker
+
+
+def circuit_available(name: str) -> bool:
+    """
+    엔진에서 LLM 단계를 시도할지 판단 (열려 있으면 바로 규칙 기반 경로).
+    """
+    return get_breaker(name).available()
+
+
+def breaker_stats() -> Dict[str, Dict[str, object]]:
+    return {name: breaker.stats() for name, breaker in list(_BREAKERS.items())}
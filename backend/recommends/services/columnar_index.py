@@ -0,0 +1,278 @@
+import json
+import mmap
+import struct
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .keyword_index import POSTING_COLUMNS, TERM_COLUMNS, TEXT_COLUMN, build_postings
+
+# 정책 인덱스의 컬럼형 바이너리 형식 (인덱스 JSON과 같은 이름의 .bin).
+# [MAGIC 8B][헤더 길이 u32][헤더 JSON][정렬 패딩][컬럼 섹션들...]
+# - 고정 폭 컬럼: id(int64), min_age/max_age(int32, 없으면 -1), 코드 컬럼(uint16, 헤더 문자열 테이블 인덱스)
+# - 텍스트 컬럼: 바이트 오프셋(uint32, n+1) + UTF-8 blob
+# - 목록 컬럼(applicable_regions, employment): 오프셋(uint32, n+1) + 값 코드(uint16)
+# - 키워드 섹션: 검색 대상 텍스트, 정렬된 토큰/n-gram 용어(텍스트 컬럼) + postings(오프셋 + 위치 uint32)
+# 읽는 쪽은 파일을 mmap으로 열어 numpy view만 만들고, 패싯/키워드 검색도 이 view 위에서 계산하기 때문에
+# 여러 워커가 OS 페이지 캐시 한 벌을 공유한다.
+
+MAGIC = b"BBPIDX01"
+AGE_NONE = -1
+
+FIELDS = (
+    "id",
+    "title",
+    "search_summary",
+    "summary",
+    "category",
+    "region_scope",
+    "region_sido",
+    "applicable_regions",
+    "min_age",
+    "max_age",
+    "policy_type",
+    "employment",
+)
+TEXT_FIELDS = ("title", "search_summary", "summary")
+CODE_FIELDS = ("category", "region_scope", "region_sido", "policy_type")
+LIST_FIELDS = ("applicable_regions", "employment")
+_ALIGN = 8
+
+
+def columnar_path(index_path: Path) -> Path:
+    """
+    인덱스 JSON 옆에 저장되는 컬럼형 바이너리 경로.
+    """
+    return index_path.with_suffix(".bin")
+
+
+def _string_table(values) -> Tuple[List[str], Dict[str, int]]:
+    # 코드 0은 빈 문자열
+    table = [""] + sorted({v for v in values if v} - {""})
+    return table, {value: code for code, value in enumerate(table)}
+
+
+def _text_column(values: List[str]) -> Tuple[np.ndarray, bytes]:
+    encoded = [(v or "").encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint32)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    return offsets, b"".join(encoded)
+
+
+def _csr_column(lists: List[List[int]]) -> Tuple[np.ndarray, np.ndarray]:
+    offsets = np.zeros(len(lists) + 1, dtype=np.uint32)
+    offsets[1:] = np.cumsum([len(values) for values in lists])
+    values = np.fromiter((v for values in lists for v in values), dtype=np.uint32, count=int(offsets[-1]))
+    return offsets, values
+
+
+def _age_column(items: List[Dict], field: str) -> np.ndarray:
+    return np.asarray(
+        [AGE_NONE if item.get(field) is None else int(item[field]) for item in items],
+        dtype=np.int32,
+    )
+
+
+def encode_columnar(items: List[Dict], version: str, catalog: Optional[str] = None) -> bytes:
+    """
+    인덱스 항목(dict 목록) → 컬럼형 바이너리. catalog: 인덱스를 만든 시점의 정책 테이블 버전.
+    """
+    sections: List[Tuple[str, bytes, str, int]] = []
+
+    def add(name: str, array: np.ndarray):
+        sections.append((name, array.tobytes(), array.dtype.str, int(array.shape[0])))
+
+    strings: Dict[str, List[str]] = {}
+    add("id", np.asarray([item["id"] for item in items], dtype=np.int64))
+    add("min_age", _age_column(items, "min_age"))
+    add("max_age", _age_column(items, "max_age"))
+    for field in CODE_FIELDS:
+        table, codes = _string_table(item.get(field) or "" for item in items)
+        strings[field] = table
+        add(field, np.asarray([codes[item.get(field) or ""] for item in items], dtype=np.uint16))
+
+    for field in LIST_FIELDS:
+        lists = [[str(v) for v in (item.get(field) or [])] for item in items]
+        table, codes = _string_table(v for values in lists for v in values)
+        strings[field] = table
+        offsets = np.zeros(len(items) + 1, dtype=np.uint32)
+        offsets[1:] = np.cumsum([len(values) for values in lists])
+        add(f"{field}_offsets", offsets)
+        add(field, np.asarray([codes[v] for values in lists for v in values], dtype=np.uint16))
+
+    def add_text(name: str, values: List[str]):
+        offsets, blob = _text_column(values)
+        add(f"{name}_offsets", offsets)
+        sections.append((f"{name}_blob", blob, "|u1", len(blob)))
+
+    for field in TEXT_FIELDS:
+        add_text(field, [item.get(field) or "" for item in items])
+
+    # 키워드 역색인: 용어는 UTF-8 바이트 순으로 정렬해 두고 읽는 쪽이 이진 탐색
+    texts, tokens, grams = build_postings(items)
+    add_text(TEXT_COLUMN, texts)
+    for kind, postings in (("token", tokens), ("gram", grams)):
+        terms = sorted(postings, key=lambda term: term.encode("utf-8"))
+        add_text(TERM_COLUMNS[kind], terms)
+        offsets, values = _csr_column([postings[term] for term in terms])
+        add(f"{POSTING_COLUMNS[kind]}_offsets", offsets)
+        add(POSTING_COLUMNS[kind], values)
+
+    columns = {}
+    body = bytearray()
+    for name, raw, dtype, length in sections:
+        body.extend(b"\0" * (-len(body) % _ALIGN))
+        columns[name] = {"offset": len(body), "dtype": dtype, "length": length}
+        body.extend(raw)
+
+    header = json.dumps(
+        {"version": version, "catalog": catalog, "count": len(items), "columns": columns, "strings": strings},
+        ensure_ascii=False,
+    ).encode("utf-8")
+    prefix = MAGIC + struct.pack("<I", len(header)) + header
+    return prefix + b"\0" * (-len(prefix) % _ALIGN) + bytes(body)
+
+
+class PolicyRecord(Mapping):
+    """
+    컬럼형 인덱스의 한 행에 대한 읽기 전용 view. dict처럼 record["title"], record.get("min_age")로 읽고,
+    값은 접근할 때만 mmap에서 디코딩한다. 밖으로 넘길 때는 dict(record).
+    """
+
+    __slots__ = ("_index", "_pos")
+
+    def __init__(self, index: "ColumnarIndex", pos: int):
+        self._index = index
+        self._pos = pos
+
+    def __getitem__(self, key: str) -> Any:
+        return self._index.value(self._pos, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(FIELDS)
+
+    def __len__(self) -> int:
+        return len(FIELDS)
+
+    def __repr__(self) -> str:
+        return f"PolicyRecord(id={self['id']}, title={self['title']!r})"
+
+
+class ColumnarIndex(Sequence):
+    """
+    mmap으로 연 컬럼형 정책 인덱스. index[pos]는 PolicyRecord, 벡터 연산용 컬럼(ids, min_age, max_age)도 노출.
+    source가 bytes면 (이전 형식 JSON을 메모리에서 변환한 경우) 그 버퍼를 그대로 읽는다.
+    """
+
+    def __init__(self, source: Union[Path, bytes]):
+        if isinstance(source, bytes):
+            self._mm = source
+        else:
+            with open(source, "rb") as fh:
+                self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[: len(MAGIC)] != MAGIC:
+            label = "<memory>" if isinstance(source, bytes) else source
+            raise ValueError(f"not a policy index file: {label}")
+        (header_len,) = struct.unpack_from("<I", self._mm, len(MAGIC))
+        header_start = len(MAGIC) + 4
+        header = json.loads(self._mm[header_start : header_start + header_len].decode("utf-8"))
+        data_start = header_start + header_len
+        data_start += -data_start % _ALIGN
+
+        self.version: str = header["version"]
+        self.catalog: Optional[str] = header.get("catalog")
+        self.count: int = header["count"]
+        self._strings: Dict[str, List[str]] = header["strings"]
+        self._columns: Dict[str, np.ndarray] = {}
+        self._blob_starts: Dict[str, int] = {}
+        for name, spec in header["columns"].items():
+            if name.endswith("_blob"):
+                self._blob_starts[name[: -len("_blob")]] = data_start + spec["offset"]
+                continue
+            self._columns[name] = np.frombuffer(
+                self._mm, dtype=np.dtype(spec["dtype"]), count=spec["length"], offset=data_start + spec["offset"]
+            )
+
+        self.ids: np.ndarray = self._columns["id"]
+        self.min_age: np.ndarray = self._columns["min_age"]
+        self.max_age: np.ndarray = self._columns["max_age"]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, pos):
+        if isinstance(pos, slice):
+            return [PolicyRecord(self, i) for i in range(*pos.indices(self.count))]
+        if pos < 0:
+            pos += self.count
+        if not 0 <= pos < self.count:
+            raise IndexError(pos)
+        return PolicyRecord(self, pos)
+
+    @property
+    def has_keywords(self) -> bool:
+        # 키워드 섹션이 추가되기 전에 만든 파일이면 False
+        return TEXT_COLUMN in self._blob_starts
+
+    def column(self, name: str) -> Optional[np.ndarray]:
+        return self._columns.get(name)
+
+    def string_table(self, field: str) -> List[str]:
+        return self._strings.get(field) or [""]
+
+    def csr(self, name: str, row: int) -> np.ndarray:
+        """
+        오프셋 + 값 컬럼에서 row번째 구간 (view).
+        """
+        offsets = self._columns[f"{name}_offsets"]
+        return self._columns[name][int(offsets[row]) : int(offsets[row + 1])]
+
+    def _raw_text(self, field: str, pos: int) -> bytes:
+        offsets = self._columns[f"{field}_offsets"]
+        start = self._blob_starts[field]
+        return self._mm[start + int(offsets[pos]) : start + int(offsets[pos + 1])]
+
+    def text(self, field: str, pos: int) -> str:
+        return self._raw_text(field, pos).decode("utf-8")
+
+    def find_text(self, field: str, value: str) -> Optional[int]:
+        """
+        UTF-8 바이트 순으로 정렬된 텍스트 컬럼에서 value의 행 (이진 탐색, 없으면 None).
+        """
+        offsets = self._columns.get(f"{field}_offsets")
+        if offsets is None:
+            return None
+        target = value.encode("utf-8")
+        lo, hi = 0, len(offsets) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._raw_text(field, mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(offsets) - 1 and self._raw_text(field, lo) == target:
+            return lo
+        return None
+
+    def value(self, pos: int, field: str) -> Any:
+        if field == "id":
+            return int(self.ids[pos])
+        if field in TEXT_FIELDS:
+            return self.text(field, pos)
+        if field in CODE_FIELDS:
+            # 컬럼이 추가되기 전에 만든 파일이면 빈 값
+            codes = self._columns.get(field)
+            return "" if codes is None else self._strings[field][int(codes[pos])]
+        if field in ("min_age", "max_age"):
+            age = int(self._columns[field][pos])
+            return None if age == AGE_NONE else age
+        if field in LIST_FIELDS:
+            offsets = self._columns.get(f"{field}_offsets")
+            if offsets is None:
+                return []
+            table = self._strings[field]
+            codes = self._columns[field][int(offsets[pos]) : int(offsets[pos + 1])]
+            return [table[int(code)] for code in codes]
+        raise KeyError(field)
@@ -0,0 +1,85 @@
+import asyncio
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Awaitable, Callable, Dict, Hashable, Optional
+
+from django.conf import settings
+
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_NORMALIZE_EXECUTOR: Optional[ThreadPoolExecutor] = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    LLM 호출용 공유 스레드 풀 (프로세스당 하나, 워커 수 제한).
+    """
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        _EXECUTOR = ThreadPoolExecutor(
+            max_workers=getattr(settings, "RECOMMEND_REASON_WORKERS", 8),
+            thread_name_prefix="recommend-llm",
+        )
+    return _EXECUTOR
+
+
+def get_normalize_executor() -> ThreadPoolExecutor:
+    """
+    질의 정규화(speculative) 전용 작은 풀. 이유 생성 풀의 워커를 차지하지 않도록 분리.
+    """
+    global _NORMALIZE_EXECUTOR
+    if _NORMALIZE_EXECUTOR is None:
+        _NORMALIZE_EXECUTOR = ThreadPoolExecutor(
+            max_workers=getattr(settings, "QUERY_NORMALIZE_WORKERS", 2),
+            thread_name_prefix="query-normalize",
+        )
+    return _NORMALIZE_EXECUTOR
+
+
+def submit(fn: Callable, *args, executor: Optional[ThreadPoolExecutor] = None, **kwargs) -> Future:
+    """
+    풀에 작업 제출 (기본: 공유 LLM 풀). 호출 스레드의 contextvars(요청 예산 등)를 그대로 넘긴다.
+    """
+    context = contextvars.copy_context()
+    return (executor or get_executor()).submit(context.run, fn, *args, **kwargs)
+
+
+def run_with_deadline(tasks: Dict[Hashable, Callable[[], object]], timeout: float) -> Dict[Hashable, object]:
+    """
+    작업들을 공유 풀에서 동시에 실행하고 timeout(초) 안에 끝난 결과만 {키: 결과}로 반환.
+    기한 내 끝나지 않았거나 예외가 난 작업은 결과에서 빠진다 (호출측에서 fallback).
+    아직 시작하지 않은 작업은 취소하고, 실행 중인 작업은 기다리지 않는다.
+    """
+    if not tasks:
+        return {}
+    futures = {submit(fn): key for key, fn in tasks.items()}
+    done, not_done = wait(futures, timeout=timeout)
+    for future in not_done:
+        future.cancel()
+
+    results: Dict[Hashable, object] = {}
+    for future in done:
+        try:
+            results[futures[future]] = future.result()
+        except Exception:
+            continue
+    return results
+
+
+async def gather_with_deadline(tasks: Dict[Hashable, Awaitable], timeout: float) -> Dict[Hashable, object]:
+    """
+    run_with_deadline의 비동기 버전: 코루틴들을 동시에 await하고 timeout(초) 안에 끝난 결과만 반환.
+    기한을 넘긴 작업은 취소한다.
+    """
+    if not tasks:
+        return {}
+    futures = {asyncio.ensure_future(aw): key for key, aw in tasks.items()}
+    done, pending = await asyncio.wait(futures, timeout=timeout)
+    for future in pending:
+        future.cancel()
+
+    results: Dict[Hashable, object] = {}
+    for future in done:
+        if future.cancelled() or future.exception() is not None:
+            continue
+        results[futures[future]] = future.result()
+    return results
@@ -1,36 +1,68 @@
-import os
-from typing import List
+import asyncio
+from typing import Any, Dict, List
 
-import requests
 from django.conf import settings
 
+from .embedding_batcher import get_embedding_batcher
+from .embedding_cache import get_embedding_cache
+from .gms_client import apost_json, post_json
+from .local_ai import embedding_cache_model, is_local_backend
 
-def _get_gms_key() -> str:
-    key = os.getenv("GMS_KEY", getattr(settings, "GMS_KEY", None))
-    if not key:
-        raise RuntimeError("GMS_KEY is not configured")
-    return key
 
+def _parse_embeddings(data: Dict[str, Any], texts: List[str]) -> List[List[float]]:
+    embeddings = [item["embedding"] for item in data.get("data", [])]
+    if len(embeddings) != len(texts):
+        raise RuntimeError("embedding count mismatch")
+    return embeddings
 
-def embed_texts(texts: List[str], model: str = "text-embedding-3-small") -> List[List[float]]:
+
+def _cache_model(model: str) -> str:
+    # 로컬 백엔드 벡터는 별도 캐시 네임스페이스
+    return embedding_cache_model(model) if is_local_backend() else model
+
+
+def _request_embeddings(texts: List[str], model: str) -> List[List[float]]:
     """
     GMS 프록시를 통해 OpenAI Embeddings 호출.
     """
-    api_key = _get_gms_key()
-    headers = {
-        "Content-Type": "application/json",
-        "x-goog-api-key": api_key,
-    }
     payload = {"model": model, "input": texts}
-    resp = requests.post(
-        "https://gms.ssafy.io/gmsapi/api.openai.com/v1/embeddings",
-        headers=headers,
-        json=payload,
-        timeout=30,
-    )
-    resp.raise_for_status()
-    data = resp.json()
-    embeddings = [item["embedding"] for item in data.get("data", [])]
-    if len(embeddings) != len(texts):
-        raise RuntimeError("embedding count mismatch")
-    return embeddings
+    return _parse_embeddings(post_json("embeddings", payload, auth="header", site="embeddings"), texts)
+
+
+def _fetch_embeddings(texts: List[str], model: str) -> List[List[float]]:
+    # 동시 요청을 묶어 보내는 micro-batcher 경유 (EMBEDDING_BATCH_WAIT_MS=0이면 바로 호출)
+    if getattr(settings, "EMBEDDING_BATCH_WAIT_MS", 5) <= 0:
+        return _request_embeddings(texts, model)
+    return get_embedding_batcher(_request_embeddings).embed(texts, model)
+
+
+def embed_texts(texts: List[str], model: str = "text-embedding-3-small") -> List[List[float]]:
+    """
+    디스크 캐시 우선 임베딩. 캐시 미스(중복 제거)만 프록시로 보내고 입력 순서대로 반환.
+    캐시 미스는 다른 스레드의 동시 요청과 묶여 한 번의 호출로 전송될 수 있다.
+    """
+    cache = get_embedding_cache()
+    cache_model = _cache_model(model)
+    vectors = cache.get_many(cache_model, texts)
+    missing = [t for t in dict.fromkeys(texts) if t not in vectors]
+    if missing:
+        fetched = _fetch_embeddings(missing, model)
+        cache.set_many(cache_model, zip(missing, fetched))
+        vectors.update(zip(missing, fetched))
+    return [vectors[t] for t in texts]
+
+
+async def aembed_texts(texts: List[str], model: str = "text-embedding-3-small") -> List[List[float]]:
+    """
+    embed_texts의 비동기 버전. 디스크 캐시(SQLite)는 스레드에서 조회/저장.
+    """
+    cache = get_embedding_cache()
+    cache_model = _cache_model(model)
+    vectors = await asyncio.to_thread(cache.get_many, cache_model, texts)
+    missing = [t for t in dict.fromkeys(texts) if t not in vectors]
+    if missing:
+        payload = {"model": model, "input": missing}
+        fetched = _parse_embeddings(await apost_json("embeddings", payload, auth="header", site="embeddings"), missing)
+        await asyncio.to_thread(cache.set_many, cache_model, list(zip(missing, fetched)))
+        vectors.update(zip(missing, fetched))
+    return [vectors[t] for t in texts]
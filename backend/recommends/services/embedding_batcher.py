@@ -0,0 +1,161 @@
+import contextvars
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, List, Tuple
+
+from django.conf import settings
+
+from .budget import BudgetExceededError, remaining_budget
+
+EmbedFn = Callable[[List[str], str], List[List[float]]]
+
+
+class EmbeddingBatcher:
+    """
+    동시 스레드의 임베딩 요청을 모아 한 번의 업스트림 호출로 보내는 micro-batcher.
+    - 모델별 대기열에 텍스트를 넣고 전송 작업은 전용 스레드 풀에 모델당 하나만 예약
+    - 전송 작업이 대기열을 가져가기 전까지 들어온 텍스트는 같은 배치로 묶인다 (한가할 때는 바로 전송)
+    - 같은 모델의 배치가 이미 전송 중이면 max_wait초 더 모은 뒤 전송, 대기열은 max_batch 단위로 나눠 전송
+    - 대기 중이거나 전송 중인 같은 텍스트는 같은 Future를 공유 (중복 제거)
+    - 업스트림 호출은 특정 요청의 예산/컨텍스트 없이 실행되고, 각 호출자는 자기 남은 예산만큼만 기다린다
+    """
+
+    def __init__(self, request_fn: EmbedFn, max_batch: int, max_wait: float, concurrency: int = 4):
+        self.request_fn = request_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.texts = 0
+        self.coalesced = 0
+        self._queues: Dict[str, List[str]] = {}
+        self._inflight: Dict[Tuple[str, str], Future] = {}
+        self._scheduled: Dict[str, bool] = {}
+        self._sending: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="embedding-batch")
+
+    def embed(self, texts: List[str], model: str) -> List[List[float]]:
+        remaining = remaining_budget()
+        if remaining is not None and remaining <= 0:
+            raise BudgetExceededError("request budget exhausted before embeddings call")
+
+        futures: Dict[str, Future] = {}
+        with self._lock:
+            queue = self._queues.setdefault(model, [])
+            for text in dict.fromkeys(texts):
+                future = self._inflight.get((model, text))
+                if future is not None:
+                    self.coalesced += 1
+                else:
+                    future = Future()
+                    self._inflight[(model, text)] = future
+                    queue.append(text)
+                futures[text] = future
+            schedule = bool(queue) and not self._scheduled.get(model)
+            if schedule:
+                self._scheduled[model] = True
+
+        if schedule:
+            self._executor.submit(self._dispatch, model)
+        return [self._wait(futures[text]) for text in texts]
+
+    @staticmethod
+    def _wait(future: Future) -> List[float]:
+        """
+        호출자 자신의 남은 요청 예산만큼만 기다린다 (예산이 없으면 무기한).
+        """
+        try:
+            return future.result(timeout=remaining_budget())
+        except FutureTimeoutError:
+            if future.done():
+                raise
+            raise BudgetExceededError("request budget exhausted waiting for embeddings") from None
+
+    def _dispatch(self, model: str):
+        """
+        대기열에서 배치 하나를 꺼내 전송. 남은 텍스트가 있으면 다음 전송 작업을 예약한다.
+        """
+        with self._lock:
+            busy = self._sending.get(model, 0) > 0
+            short = len(self._queues.get(model) or []) < self.max_batch
+        if busy and short and self.max_wait > 0:
+            time.sleep(self.max_wait)
+
+        with self._lock:
+            queue = self._queues.get(model) or []
+            batch, self._queues[model] = queue[: self.max_batch], queue[self.max_batch :]
+            more = bool(self._queues[model])
+            self._scheduled[model] = more
+            self._sending[model] = self._sending.get(model, 0) + 1
+        if more:
+            self._executor.submit(self._dispatch, model)
+
+        try:
+            if batch:
+                self._send(batch, model)
+        finally:
+            with self._lock:
+                self._sending[model] -= 1
+
+    def _send(self, batch: List[str], model: str):
+        """
+        업스트림 호출 후 배치의 모든 Future를 결과 또는 예외로 채운다 (어떤 경우에도 미해결 Future를 남기지 않음).
+        """
+        vectors = None
+        error: BaseException = RuntimeError("embedding batch aborted")
+        try:
+            # 빈 컨텍스트에서 실행: 먼저 온 요청의 예산이 공유 호출의 타임아웃/예산 검사에 쓰이지 않도록
+            vectors = contextvars.Context().run(self.request_fn, batch, model)
+            if len(vectors) != len(batch):
+                error = RuntimeError("embedding count mismatch")
+            else:
+                error = None
+        except Exception as exc:
+            error = exc
+        finally:
+            with self._lock:
+                self.batches += 1
+                self.texts += len(batch)
+                futures = [self._inflight.pop((model, text)) for text in batch]
+            for i, future in enumerate(futures):
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(vectors[i])
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "batches": self.batches,
+            "texts": self.texts,
+            "coalesced": self.coalesced,
+            "avg_batch_size": (self.texts / self.batches) if self.batches else 0.0,
+        }
+
+
+_BATCHER = None
+_LOCK = threading.Lock()
+
+
+def get_embedding_batcher(request_fn: EmbedFn) -> EmbeddingBatcher:
+    global _BATCHER
+    if _BATCHER is None:
+        with _LOCK:
+            if _BATCHER is None:
+                _BATCHER = EmbeddingBatcher(
+                    request_fn,
+                    max_batch=getattr(settings, "EMBEDDING_BATCH_MAX_SIZE", 64),
+                    max_wait=getattr(settings, "EMBEDDING_BATCH_WAIT_MS", 5) / 1000.0,
+                    concurrency=getattr(settings, "EMBEDDING_BATCH_CONCURRENCY", 4),
+                )
+    return _BATCHER
+
+
+def embedding_batcher_stats() -> Dict[str, float]:
+    """
+    아직 배처가 만들어지지 않았으면(임베딩 호출 전) 빈 통계.
+    """
+    if _BATCHER is None:
+        return {"batches": 0, "texts": 0, "coalesced": 0, "avg_batch_size": 0.0}
+    return _BATCHER.stats()
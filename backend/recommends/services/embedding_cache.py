@@ -0,0 +1,135 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+DEFAULT_CACHE_PATH = Path(settings.BASE_DIR) / "recommends" / "data" / "embedding_cache.sqlite3"
+
+
+def cache_key(model: str, text: str) -> str:
+    """
+    (모델명, 텍스트 해시) 캐시 키.
+    """
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{model}:{digest}"
+
+
+class EmbeddingCache:
+    """
+    SQLite 기반 디스크 임베딩 캐시.
+    - 키: 모델명 + 텍스트 sha256
+    - 값: float32 벡터 바이트
+    - 최대 항목 수 초과 시 마지막 사용 시각이 오래된 순(LRU)으로 제거
+    - 프로세스 내 hit/miss 카운터
+    """
+
+    def __init__(self, path: Path, max_entries: int):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embedding_cache ("
+                " key TEXT PRIMARY KEY,"
+                " vector BLOB NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS embedding_cache_last_used ON embedding_cache (last_used)")
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, model: str, texts: Iterable[str]) -> Dict[str, List[float]]:
+        """
+        캐시에 있는 텍스트만 {텍스트: 벡터}로 반환. 조회된 항목은 last_used 갱신.
+        """
+        texts = list(texts)
+        keys = {cache_key(model, t): t for t in texts}
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            try:
+                conn = self._connect()
+                key_list = list(keys)
+                # SQLite 변수 개수 제한을 피하려고 나눠서 조회
+                for start in range(0, len(key_list), 500):
+                    chunk = key_list[start : start + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = conn.execute(
+                        f"SELECT key, vector FROM embedding_cache WHERE key IN ({placeholders})", chunk
+                    ).fetchall()
+                    for key, blob in rows:
+                        found[keys[key]] = np.frombuffer(blob, dtype=np.float32).tolist()
+                    if rows:
+                        conn.execute(
+                            f"UPDATE embedding_cache SET last_used = ? WHERE key IN ({placeholders})",
+                            [time.time(), *chunk],
+                        )
+                conn.commit()
+            except sqlite3.Error:
+                found = {}
+            hit_count = sum(1 for t in texts if t in found)
+            self.hits += hit_count
+            self.misses += len(texts) - hit_count
+        return found
+
+    def set_many(self, model: str, pairs: Iterable[Tuple[str, List[float]]]):
+        """
+        (텍스트, 벡터) 저장 후 최대 항목 수를 넘으면 LRU 제거.
+        """
+        now = time.time()
+        rows = [
+            (cache_key(model, text), np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text, vector in pairs
+        ]
+        if not rows:
+            return
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embedding_cache (key, vector, last_used) VALUES (?, ?, ?)", rows
+                )
+                (count,) = conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()
+                overflow = count - self.max_entries
+                if overflow > 0:
+                    conn.execute(
+                        "DELETE FROM embedding_cache WHERE key IN ("
+                        " SELECT key FROM embedding_cache ORDER BY last_used ASC LIMIT ?)",
+                        (overflow,),
+                    )
+                conn.commit()
+            except sqlite3.Error:
+                return
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+        }
+
+
+_CACHE: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = EmbeddingCache(
+            path=getattr(settings, "EMBEDDING_CACHE_PATH", None) or DEFAULT_CACHE_PATH,
+            max_entries=getattr(settings, "EMBEDDING_CACHE_MAX_ENTRIES", 20000),
+        )
+    return _CACHE
@@ -0,0 +1,128 @@
+from typing import Callable, Iterable, List, Optional
+
+import numpy as np
+
+from .columnar_index import AGE_NONE, ColumnarIndex
+
+# 정책 인덱스 위치와 같은 순서의 패싯 마스크 (numpy bool 배열). 필터는 마스크 AND/OR로 계산한다.
+# 마스크는 요청마다 컬럼형 인덱스의 코드 컬럼(mmap)에서 만들고, 워커에 값별 비트셋을 상주시키지 않는다.
+
+# id__in 으로 넘길 최대 id 수 (SQL 파라미터 하나씩). 이보다 넓은 결과는 호출측이 DB 필터로 처리한다.
+MAX_ID_FILTER = 500
+
+
+class FacetIndex:
+    """
+    정책 인덱스 패싯 (컬럼형 인덱스의 코드 컬럼 위에서 계산):
+    - 값 필터: region_sido, applicable_regions, category, policy_type, employment
+      (조건에 맞는 문자열 테이블 코드를 고른 뒤 코드 컬럼과 비교)
+    - 전국 정책 마스크
+    - 연령 조건은 min_age/max_age 컬럼 비교
+    rows를 주면 (ANN 후보처럼) 그 위치들만 검사해 len(rows) 길이의 결과를 돌려준다.
+    """
+
+    def __init__(self, columns: ColumnarIndex):
+        self.count = len(columns)
+        self.ids = columns.ids
+        self._columns = columns
+        self.nationwide = self._mask("region_scope", lambda value: value == "NATIONWIDE")
+
+    def _mask(self, field: str, accept: Callable[[str], bool], rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        문자열 테이블 값 중 accept를 만족하는 값을 가진 행. 목록 컬럼은 값 하나라도 만족하면 포함.
+        """
+        codes = [code for code, value in enumerate(self._columns.string_table(field)) if accept(value)]
+        values = self._columns.column(field)
+        if not codes or values is None:
+            return np.zeros(self.count if rows is None else len(rows), dtype=bool)
+        offsets = self._columns.column(f"{field}_offsets")
+        if rows is not None:
+            if offsets is None:
+                return np.isin(values[rows], codes)
+            return np.fromiter(
+                (np.isin(values[offsets[row] : offsets[row + 1]], codes).any() for row in rows),
+                dtype=bool,
+                count=len(rows),
+            )
+        hits = np.isin(values, codes)
+        if offsets is None:
+            return hits
+        # 행별 값 구간 [offsets[i], offsets[i+1]) 안의 hit 수
+        counts = np.concatenate(([0], np.cumsum(hits)))
+        return counts[offsets[1:]] > counts[offsets[:-1]]
+
+    def ids_of(self, mask: np.ndarray, limit: Optional[int] = None) -> Optional[List[int]]:
+        """
+        마스크에 해당하는 정책 id 목록 (DB 조회 id__in 용). limit보다 많으면 None.
+        """
+        if limit is not None and int(np.count_nonzero(mask)) > limit:
+            return None
+        return self.ids[mask].tolist()
+
+    def all(self) -> np.ndarray:
+        return np.ones(self.count, dtype=bool)
+
+    def _lookup(self, field: str, value: str, partial: bool, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        값 마스크. partial이면 value를 부분 문자열로 포함하는 모든 값의 OR (대소문자 무시).
+        """
+        if not partial:
+            return self._mask(field, lambda v: bool(v) and v == value, rows)
+        term = value.lower()
+        return self._mask(field, lambda v: bool(v) and term in v.lower(), rows)
+
+    def age(self, age: int, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        min_age <= age <= max_age (비어 있는 쪽은 통과).
+        """
+        min_age, max_age = self._columns.min_age, self._columns.max_age
+        if rows is not None:
+            min_age, max_age = min_age[rows], max_age[rows]
+        return ((min_age == AGE_NONE) | (min_age <= age)) & ((max_age == AGE_NONE) | (max_age >= age))
+
+    def region(
+        self,
+        terms: Iterable[str],
+        partial: bool = True,
+        exact_sido: bool = False,
+        rows: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        전국 정책이거나 region_sido/applicable_regions가 지역어 중 하나와 일치(partial이면 부분 문자열)하면 통과.
+        exact_sido: region_sido는 partial과 무관하게 정확히 일치할 때만 (DB 필터와 같은 조건).
+        """
+        result = self.nationwide.copy() if rows is None else self.nationwide[rows]
+        for term in terms:
+            if not term:
+                continue
+            result |= self._lookup("region_sido", term, partial and not exact_sido, rows)
+            result |= self._lookup("applicable_regions", term, partial, rows)
+        return result
+
+    def employment_match(self, status: str, partial: bool = False) -> np.ndarray:
+        return self._lookup("employment", status, partial)
+
+    def select(
+        self,
+        region: Optional[str] = None,
+        age: Optional[int] = None,
+        category: Optional[str] = None,
+        policy_type: Optional[str] = None,
+        employment: Optional[str] = None,
+    ) -> np.ndarray:
+        """
+        주어진 필터의 교집합 마스크 (None인 필터는 건너뜀). policy_search DB 필터와 같은 조건:
+        모두 정확히 일치 (applicable_regions/employment는 목록 원소 중 하나가 같으면 통과).
+        """
+        mask = self.all()
+        if region:
+            mask &= self.region([region], partial=False)
+        if age is not None:
+            mask &= self.age(age)
+        if category:
+            mask &= self._lookup("category", category, False)
+        if policy_type:
+            mask &= self._lookup("policy_type", policy_type, False)
+        if employment:
+            mask &= self.employment_match(employment)
+        return mask
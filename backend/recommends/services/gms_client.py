@@ -0,0 +1,423 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from .budget import BudgetExceededError, remaining_budget
+from .circuit_breaker import CircuitBreaker, CircuitOpenError, get_breaker
+from .instrumentation import input_size, record_call
+from .local_ai import is_local_backend, local_latency, respond as local_respond
+
+GMS_BASE_URL = "https://gms.ssafy.io/gmsapi"
+
+ENDPOINTS = {
+    "chat": f"{GMS_BASE_URL}/api.openai.com/v1/chat/completions",
+    "embeddings": f"{GMS_BASE_URL}/api.openai.com/v1/embeddings",
+    "gemini": (
+        f"{GMS_BASE_URL}/generativelanguage.googleapis.com/"
+        "v1beta/models/gemini-2.5-flash-lite:generateContent"
+    ),
+}
+
+# 엔드포인트별 읽기 타임아웃 설정 키 (초)
+TIMEOUT_SETTINGS = {
+    "chat": "GMS_CHAT_TIMEOUT",
+    "embeddings": "GMS_EMBEDDING_TIMEOUT",
+    "gemini": "GMS_GEMINI_TIMEOUT",
+}
+
+# 재시도 대상 HTTP 상태 (rate limit / 일시적 서버 오류)
+RETRY_STATUS = {429, 500, 502, 503, 504}
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 4.0
+
+
+class ResponseParseError(ValueError):
+    """
+    호출은 성공했지만 post_json(parse=)에 넘긴 해석 함수가 응답을 해석하지 못함 (호출은 parse_failure로 기록됨).
+    """
+
+
+_API_KEY: Optional[str] = None
+_SESSION: Optional[requests.Session] = None
+# 비동기 엔진 호출 하나 동안 공유하는 httpx 클라이언트 (async_client_scope가 열고 닫는다)
+_ASYNC_CLIENT: ContextVar[Optional[httpx.AsyncClient]] = ContextVar("gms_async_client", default=None)
+_LOCK = threading.Lock()
+
+
+def _load_env():
+    """
+    Minimal .env loader (no external deps). Looks for .env at project root (backend와 같은 레벨).
+    """
+    try:
+        env_path = Path(__file__).resolve().parents[3] / ".env"
+        if not env_path.exists():
+            return
+        for line in env_path.read_text(encoding="utf-8").splitlines():
+            if not line or line.strip().startswith("#") or "=" not in line:
+                continue
+            k, v = line.split("=", 1)
+            k = k.strip()
+            v = v.strip().strip('"').strip("'")
+            if k and k not in os.environ:
+                os.environ[k] = v
+    except Exception:
+        return
+
+
+def get_gms_key() -> str:
+    """
+    GMS 키를 한 번만 찾아서 재사용 (.env는 최초 미스 때 한 번만 읽음).
+    """
+    global _API_KEY
+    if _API_KEY:
+        return _API_KEY
+    with _LOCK:
+        if not _API_KEY:
+            key = os.getenv("GMS_KEY", getattr(settings, "GMS_KEY", None))
+            if not key:
+                _load_env()
+                key = os.getenv("GMS_KEY", getattr(settings, "GMS_KEY", None))
+            if not key:
+                raise RuntimeError("GMS_KEY is not configured")
+            _API_KEY = key
+    return _API_KEY
+
+
+def get_session() -> requests.Session:
+    """
+    keep-alive 커넥션 풀을 가진 공유 세션 (TLS 핸드셰이크 재사용).
+    """
+    global _SESSION
+    if _SESSION is None:
+        with _LOCK:
+            if _SESSION is None:
+                pool_size = getattr(settings, "GMS_POOL_MAXSIZE", 16)
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=len(ENDPOINTS), pool_maxsize=pool_size)
+                session.mount("https://", adapter)
+                _SESSION = session
+    return _SESSION
+
+
+@asynccontextmanager
+async def async_client_scope():
+    """
+    블록 안의 비동기 호출(동시에 띄운 task 포함)이 keep-alive 클라이언트 하나를 공유하고, 블록을 벗어나면 닫는다.
+    WSGI/runserver에서는 async view마다 이벤트 루프가 새로 만들어지므로 클라이언트를 루프보다 오래 두지 않는다.
+    이미 열린 범위 안이면 그 클라이언트를 그대로 쓴다.
+    """
+    client = _ASYNC_CLIENT.get()
+    if client is not None:
+        yield client
+        return
+    pool_size = getattr(settings, "GMS_POOL_MAXSIZE", 16)
+    async with httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+    ) as client:
+        token = _ASYNC_CLIENT.set(client)
+        try:
+            yield client
+        finally:
+            _ASYNC_CLIENT.reset(token)
+
+
+def with_async_client(func):
+    """
+    비동기 엔진 진입점용 데코레이터: 호출 동안 async_client_scope를 연다.
+    """
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        async with async_client_scope():
+            return await func(*args, **kwargs)
+
+    return wrapper
+
+
+def get_timeout(endpoint: str):
+    """
+    (연결, 읽기) 타임아웃 튜플.
+    """
+    connect = getattr(settings, "GMS_CONNECT_TIMEOUT", 3.05)
+    read = getattr(settings, TIMEOUT_SETTINGS.get(endpoint, ""), 30)
+    return (connect, read)
+
+
+def _backoff(attempt: int) -> float:
+    # full jitter: 0 ~ min(cap, base * 2^attempt)
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+
+def _auth(auth: str, api_key: Optional[str]) -> Tuple[Dict[str, str], Optional[Dict[str, str]]]:
+    """
+    (헤더, 쿼리 파라미터). auth: "bearer"(Authorization) / "header"(x-goog-api-key) / "query"(?key=)
+    """
+    key = api_key or get_gms_key()
+    headers = {"Content-Type": "application/json"}
+    params = None
+    if auth == "bearer":
+        headers["Authorization"] = f"Bearer {key}"
+    elif auth == "header":
+        headers["x-goog-api-key"] = key
+    else:
+        params = {"key": key}
+    return headers, params
+
+
+def _acquire(endpoint: str) -> CircuitBreaker:
+    """
+    호출 전 검사: 요청 예산이 남아 있고 업스트림 서킷이 호출을 허용해야 한다.
+    """
+    remaining = remaining_budget()
+    if remaining is not None and remaining <= 0:
+        raise BudgetExceededError(f"request budget exhausted before {endpoint} call")
+    breaker = get_breaker(endpoint)
+    if not breaker.allow():
+        raise CircuitOpenError(f"{endpoint} circuit is open")
+    return breaker
+
+
+def _attempt_timeout(endpoint: str) -> Tuple[float, float, bool]:
+    """
+    (연결, 읽기, 예산으로 줄였는지). 읽기 타임아웃은 남은 요청 예산을 넘지 않는다.
+    """
+    connect, read = get_timeout(endpoint)
+    remaining = remaining_budget()
+    if remaining is None:
+        return connect, read, False
+    if remaining <= 0:
+        raise BudgetExceededError(f"request budget exhausted during {endpoint} call")
+    return min(connect, remaining), min(read, remaining), remaining < read
+
+
+def _retry_delay(endpoint: str, attempt: int) -> float:
+    delay = _backoff(attempt)
+    remaining = remaining_budget()
+    if remaining is not None and delay >= remaining:
+        raise BudgetExceededError(f"request budget exhausted while retrying {endpoint}")
+    return delay
+
+
+def _settle(breaker: CircuitBreaker, started: float, exc: Optional[BaseException] = None, trimmed: bool = False):
+    """
+    호출 결과를 서킷에 기록.
+    - 예산 소진/예산 때문에 줄인 타임아웃/취소: 업스트림 탓이 아니므로 기록하지 않음
+    - 재시도 대상이 아닌 4xx: 업스트림은 정상 응답한 것으로 봄
+    """
+    latency = time.monotonic() - started
+    if exc is None:
+        breaker.record(True, latency)
+    elif not isinstance(exc, Exception) or isinstance(exc, BudgetExceededError) or (
+        trimmed and isinstance(exc, (requests.Timeout, httpx.TimeoutException))
+    ):
+        breaker.release()
+    elif (
+        isinstance(exc, (requests.HTTPError, httpx.HTTPStatusError))
+        and exc.response is not None
+        and exc.response.status_code not in RETRY_STATUS
+    ):
+        breaker.record(True, latency)
+    else:
+        breaker.record(False, latency)
+
+
+def _outcome(exc: BaseException) -> str:
+    if isinstance(exc, CircuitOpenError):
+        return "circuit_open"
+    if isinstance(exc, BudgetExceededError):
+        return "budget_exceeded"
+    if isinstance(exc, (requests.Timeout, httpx.TimeoutException)):
+        return "timeout"
+    if isinstance(exc, (requests.HTTPError, httpx.HTTPStatusError)):
+        return "http_error"
+    if isinstance(exc, (requests.ConnectionError, httpx.TransportError)):
+        return "connection_error"
+    if isinstance(exc, ValueError):
+        # 응답 본문이 JSON이 아님
+        return "parse_failure"
+    return "error"
+
+
+def _model(endpoint: str, payload: Dict[str, Any]) -> str:
+    # Gemini는 모델명이 URL 경로에 있음
+    return payload.get("model") or ENDPOINTS[endpoint].rsplit("/", 1)[-1].split(":", 1)[0]
+
+
+def _record(endpoint: str, payload: Dict[str, Any], site: Optional[str], started: float, outcome: str, data=None):
+    record_call(
+        site or endpoint,
+        _model(endpoint, payload),
+        input_size(endpoint, payload),
+        time.monotonic() - started,
+        outcome,
+        data,
+    )
+
+
+def _finish(
+    endpoint: str,
+    payload: Dict[str, Any],
+    site: Optional[str],
+    started: float,
+    data: Dict[str, Any],
+    parse: Optional[Callable[[Dict[str, Any]], Any]],
+):
+    """
+    응답 해석까지 끝난 뒤 호출을 한 번만 기록한다. parse가 실패하면 outcome="parse_failure"로 기록하고 ResponseParseError.
+    """
+    if parse is None:
+        _record(endpoint, payload, site, started, "ok", data)
+        return data
+    try:
+        result = parse(data)
+    except Exception as exc:
+        _record(endpoint, payload, site, started, "parse_failure", data)
+        raise ResponseParseError(f"{site or endpoint} response could not be parsed") from exc
+    _record(endpoint, payload, site, started, "ok", data)
+    return result
+
+
+def post_json(
+    endpoint: str,
+    payload: Dict[str, Any],
+    auth: str = "bearer",
+    api_key: Optional[str] = None,
+    site: Optional[str] = None,
+    parse: Optional[Callable[[Dict[str, Any]], Any]] = None,
+) -> Any:
+    """
+    GMS 프록시 POST 호출 후 JSON 응답 반환.
+    - 429/5xx, 연결 오류는 jitter backoff로 재시도 (읽기 타임아웃은 재시도하지 않음)
+    - 서킷이 열려 있으면 CircuitOpenError, 요청 예산을 다 쓰면 BudgetExceededError
+    - site: 호출 위치 라벨 (예: "query_normalize"). 계측 집계 키, AI_BACKEND="local"이면 로컬 응답 템플릿 선택에 사용
+    - parse: 응답 해석 함수. 주면 그 결과를 반환하고, 해석에 실패하면 호출을 parse_failure로 기록한 뒤 ResponseParseError
+    """
+    started = time.monotonic()
+    try:
+        data = _post_json(endpoint, payload, auth, api_key, site)
+    except Exception as exc:
+        _record(endpoint, payload, site, started, _outcome(exc))
+        raise
+    return _finish(endpoint, payload, site, started, data, parse)
+
+
+async def apost_json(
+    endpoint: str,
+    payload: Dict[str, Any],
+    auth: str = "bearer",
+    api_key: Optional[str] = None,
+    site: Optional[str] = None,
+    parse: Optional[Callable[[Dict[str, Any]], Any]] = None,
+) -> Any:
+    """
+    post_json의 비동기 버전 (httpx). 재시도/타임아웃/서킷/예산/로컬 백엔드/계측/parse 규칙은 동일.
+    """
+    started = time.monotonic()
+    try:
+        data = await _apost_json(endpoint, payload, auth, api_key, site)
+    except Exception as exc:
+        _record(endpoint, payload, site, started, _outcome(exc))
+        raise
+    return _finish(endpoint, payload, site, started, data, parse)
+
+
+def _post_json(
+    endpoint: str,
+    payload: Dict[str, Any],
+    auth: str,
+    api_key: Optional[str],
+    site: Optional[str],
+) -> Dict[str, Any]:
+    if is_local_backend():
+        time.sleep(local_latency(endpoint))
+        return local_respond(endpoint, payload, site)
+    headers, params = _auth(auth, api_key)
+    max_retries = getattr(settings, "GMS_MAX_RETRIES", 2)
+    session = get_session()
+    breaker = _acquire(endpoint)
+    started = time.monotonic()
+    trimmed = False
+    try:
+        for attempt in range(max_retries + 1):
+            connect, read, trimmed = _attempt_timeout(endpoint)
+            try:
+                resp = session.post(
+                    ENDPOINTS[endpoint],
+                    headers=headers,
+                    params=params,
+                    json=payload,
+                    timeout=(connect, read),
+                )
+            except requests.ConnectionError:
+                if attempt >= max_retries:
+                    raise
+            else:
+                if resp.status_code not in RETRY_STATUS or attempt >= max_retries:
+                    resp.raise_for_status()
+                    data = resp.json()
+                    break
+            time.sleep(_retry_delay(endpoint, attempt))
+    except BaseException as exc:
+        _settle(breaker, started, exc, trimmed)
+        raise
+    _settle(breaker, started)
+    return data
+
+
+async def _apost_json(
+    endpoint: str,
+    payload: Dict[str, Any],
+    auth: str,
+    api_key: Optional[str],
+    site: Optional[str],
+) -> Dict[str, Any]:
+    if is_local_backend():
+        await asyncio.sleep(local_latency(endpoint))
+        return local_respond(endpoint, payload, site)
+    client = _ASYNC_CLIENT.get()
+    if client is None:
+        # 범위 밖 단독 호출: 이번 호출 동안만 클라이언트를 열고 닫는다
+        async with async_client_scope():
+            return await _apost_json(endpoint, payload, auth, api_key, site)
+    headers, params = _auth(auth, api_key)
+    max_retries = getattr(settings, "GMS_MAX_RETRIES", 2)
+    breaker = _acquire(endpoint)
+    started = time.monotonic()
+    trimmed = False
+    try:
+        for attempt in range(max_retries + 1):
+            connect, read, trimmed = _attempt_timeout(endpoint)
+            try:
+                resp = await client.post(
+                    ENDPOINTS[endpoint],
+                    headers=headers,
+                    params=params,
+                    json=payload,
+                    timeout=httpx.Timeout(read, connect=connect),
+                )
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                if attempt >= max_retries:
+                    raise
+            else:
+                if resp.status_code not in RETRY_STATUS or attempt >= max_retries:
+                    resp.raise_for_status()
+                    data = resp.json()
+                    break
+            await asyncio.sleep(_retry_delay(endpoint, attempt))
+    except BaseException as exc:
+        _settle(breaker, started, exc, trimmed)
+        raise
+    _settle(breaker, started)
+    return data
@@ -0,0 +1,140 @@
+import bisect
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Optional
+
+# 프록시 호출 계측: 호출 위치(site)별 지연 히스토그램, 토큰 사용량, 입력 크기, 결과(outcome) 집계 (프로세스 내)
+
+# 지연 히스토그램 버킷 상한 (ms). 마지막 버킷은 그 이상 전부.
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+OUTCOMES = ("ok", "timeout", "http_error", "connection_error", "circuit_open", "budget_exceeded", "parse_failure", "error")
+
+
+def _new_site() -> Dict[str, Any]:
+    return {
+        "calls": 0,
+        "outcomes": defaultdict(int),
+        "models": defaultdict(int),
+        "latency_buckets": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+        "latency_ms_sum": 0.0,
+        "latency_ms_max": 0.0,
+        "input_chars": 0,
+        "input_items": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "total_tokens": 0,
+    }
+
+
+_SITES: Dict[str, Dict[str, Any]] = defaultdict(_new_site)
+_LOCK = threading.Lock()
+
+
+def input_size(endpoint: str, payload: Dict[str, Any]) -> Dict[str, int]:
+    """
+    요청 입력 크기 (문자 수, 항목 수: 메시지/텍스트/part 개수).
+    """
+    if endpoint == "embeddings":
+        texts = payload.get("input") or []
+        if isinstance(texts, str):
+            texts = [texts]
+        return {"chars": sum(len(t) for t in texts), "items": len(texts)}
+    if endpoint == "gemini":
+        parts = [part for content in payload.get("contents", []) for part in content.get("parts", [])]
+        return {"chars": sum(len(p.get("text", "")) for p in parts), "items": len(parts)}
+    messages = payload.get("messages") or []
+    return {"chars": sum(len(str(m.get("content", ""))) for m in messages), "items": len(messages)}
+
+
+def token_usage(data: Optional[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    응답의 토큰 사용량. OpenAI(usage) / Gemini(usageMetadata) 형식 모두 지원, 없으면 0.
+    """
+    if not isinstance(data, dict):
+        return {"prompt": 0, "completion": 0, "total": 0}
+    usage = data.get("usage")
+    if isinstance(usage, dict):
+        prompt = int(usage.get("prompt_tokens") or 0)
+        completion = int(usage.get("completion_tokens") or 0)
+        return {"prompt": prompt, "completion": completion, "total": int(usage.get("total_tokens") or prompt + completion)}
+    meta = data.get("usageMetadata")
+    if isinstance(meta, dict):
+        prompt = int(meta.get("promptTokenCount") or 0)
+        completion = int(meta.get("candidatesTokenCount") or 0)
+        return {"prompt": prompt, "completion": completion, "total": int(meta.get("totalTokenCount") or prompt + completion)}
+    return {"prompt": 0, "completion": 0, "total": 0}
+
+
+def record_call(
+    site: str,
+    model: str,
+    size: Dict[str, int],
+    latency: float,
+    outcome: str,
+    data: Optional[Dict[str, Any]] = None,
+):
+    latency_ms = latency * 1000
+    usage = token_usage(data)
+    with _LOCK:
+        stats = _SITES[site]
+        stats["calls"] += 1
+        stats["outcomes"][outcome] += 1
+        stats["models"][model] += 1
+        stats["latency_buckets"][bisect.bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+        stats["latency_ms_sum"] += latency_ms
+        stats["latency_ms_max"] = max(stats["latency_ms_max"], latency_ms)
+        stats["input_chars"] += size.get("chars", 0)
+        stats["input_items"] += size.get("items", 0)
+        stats["prompt_tokens"] += usage["prompt"]
+        stats["completion_tokens"] += usage["completion"]
+        stats["total_tokens"] += usage["total"]
+
+
+def _percentile(buckets, calls: int, q: float) -> Optional[float]:
+    # 히스토그램 기반 근사 (해당 버킷 상한 ms)
+    if not calls:
+        return None
+    rank = q * calls
+    seen = 0
+    for i, count in enumerate(buckets):
+        seen += count
+        if seen >= rank:
+            return float(LATENCY_BUCKETS_MS[i]) if i < len(LATENCY_BUCKETS_MS) else None
+    return None
+
+
+def call_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    site별 집계 스냅샷 (JSON 직렬화 가능).
+    """
+    with _LOCK:
+        result = {}
+        for site, stats in _SITES.items():
+            calls = stats["calls"]
+            buckets = list(stats["latency_buckets"])
+            labels = [f"le_{b}ms" for b in LATENCY_BUCKETS_MS] + ["inf"]
+            result[site] = {
+                "calls": calls,
+                "outcomes": dict(stats["outcomes"]),
+                "models": dict(stats["models"]),
+                "latency_ms": {
+                    "avg": (stats["latency_ms_sum"] / calls) if calls else None,
+                    "max": stats["latency_ms_max"],
+                    "p50": _percentile(buckets, calls, 0.5),
+                    "p95": _percentile(buckets, calls, 0.95),
+                    "histogram": dict(zip(labels, buckets)),
+                },
+                "input": {"chars": stats["input_chars"], "items": stats["input_items"]},
+                "tokens": {
+                    "prompt": stats["prompt_tokens"],
+                    "completion": stats["completion_tokens"],
+                    "total": stats["total_tokens"],
+                },
+            }
+        return result
+
+
+def reset_stats():
+    with _LOCK:
+        _SITES.clear()
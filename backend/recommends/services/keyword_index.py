@@ -0,0 +1,95 @@
+from collections import defaultdict
+from typing import TYPE_CHECKING, Dict, Iterable, List, Mapping, Sequence, Set, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from .columnar_index import ColumnarIndex
+
+INDEXED_FIELDS = ("title", "search_summary", "summary", "category")
+# 컬럼형 바이너리 안의 키워드 섹션 이름: 검색 대상 텍스트, 토큰/n-gram 용어(정렬) + postings
+TEXT_COLUMN = "kw_text"
+TERM_COLUMNS = {"token": "kw_token_terms", "gram": "kw_gram_terms"}
+POSTING_COLUMNS = {"token": "kw_token_postings", "gram": "kw_gram_postings"}
+
+_EMPTY = np.zeros(0, dtype=np.uint32)
+
+
+def _char_grams(text: str, n: int) -> Set[str]:
+    return {text[i : i + n] for i in range(len(text) - n + 1)}
+
+
+def build_postings(items: Sequence[Mapping]) -> Tuple[List[str], Dict[str, List[int]], Dict[str, List[int]]]:
+    """
+    인덱스 생성 시 한 번만 계산: (검색 대상 텍스트, 토큰 postings, 1-gram/2-gram postings).
+    postings 값은 오름차순 인덱스 위치 목록.
+    """
+    texts: List[str] = []
+    tokens: Dict[str, List[int]] = defaultdict(list)
+    grams: Dict[str, List[int]] = defaultdict(list)
+    for pos, item in enumerate(items):
+        text = " ".join(item.get(field) or "" for field in INDEXED_FIELDS).lower()
+        texts.append(text)
+        for token in set(text.split()):
+            tokens[token].append(pos)
+        for gram in _char_grams(text, 1) | _char_grams(text, 2):
+            grams[gram].append(pos)
+    return texts, tokens, grams
+
+
+class KeywordIndex:
+    """
+    정책 인덱스용 역색인 (컬럼형 바이너리의 키워드 섹션을 mmap으로 읽음 - 워커 힙에 postings를 만들지 않는다).
+    - 토큰 postings: 공백 기준 토큰 → 인덱스 위치
+    - 문자 n-gram postings: 1-gram/2-gram → 인덱스 위치 (한국어 부분 문자열 매칭용)
+    매칭 기준은 기존과 같다: 키워드가 (title, search_summary, summary, category) 결합 텍스트의 부분 문자열인지.
+    """
+
+    def __init__(self, columns: "ColumnarIndex"):
+        self._columns = columns
+
+    def _postings(self, kind: str, term: str) -> np.ndarray:
+        row = self._columns.find_text(TERM_COLUMNS[kind], term)
+        return _EMPTY if row is None else self._columns.csr(POSTING_COLUMNS[kind], row)
+
+    def match(self, term: str) -> Set[int]:
+        """
+        term을 부분 문자열로 포함하는 문서 위치 집합.
+        토큰 완전 일치는 바로 채택하고, 나머지는 2-gram postings 교집합 후보만 검증한다.
+        """
+        term = term.lower()
+        if not term:
+            return set()
+        if len(term) == 1:
+            return set(self._postings("gram", term).tolist())
+
+        matched = set(self._postings("token", term).tolist())
+        postings = sorted((self._postings("gram", g) for g in _char_grams(term, 2)), key=len)
+        if not postings or not len(postings[0]):
+            return matched
+        candidates = postings[0]
+        for posting in postings[1:]:
+            candidates = np.intersect1d(candidates, posting, assume_unique=True)
+            if not len(candidates):
+                return matched
+        matched.update(
+            pos
+            for pos in candidates.tolist()
+            if pos not in matched and term in self._columns.text(TEXT_COLUMN, pos)
+        )
+        return matched
+
+    def score(self, keywords: Iterable[str]) -> Dict[int, float]:
+        """
+        키워드 매칭 점수 {인덱스 위치: 매칭 키워드 수}. 질의 키워드 postings만 조회한다.
+        """
+        scores: Dict[int, float] = defaultdict(float)
+        cache: Dict[str, Set[int]] = {}
+        for kw in keywords:
+            if not kw:
+                continue
+            if kw not in cache:
+                cache[kw] = self.match(kw)
+            for pos in cache[kw]:
+                scores[pos] += 1
+        return dict(scores)
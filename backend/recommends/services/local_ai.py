@@ -0,0 +1,113 @@
+import hashlib
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from django.conf import settings
+
+# AI_BACKEND="local": GMS 프록시 대신 결정적(deterministic) 로컬 구현으로 응답 (부하 테스트/벤치마크용).
+# 응답은 실제 업스트림과 같은 JSON 형태라서 호출측 파싱 코드까지 그대로 실행된다.
+
+DEFAULT_EMBEDDING_DIM = 1536
+
+
+def is_local_backend() -> bool:
+    return getattr(settings, "AI_BACKEND", "gms") == "local"
+
+
+def local_latency(endpoint: str) -> float:
+    """
+    엔드포인트별 인위적 지연(초).
+    """
+    if endpoint == "embeddings":
+        return getattr(settings, "AI_LOCAL_EMBEDDING_LATENCY", 0.0)
+    return getattr(settings, "AI_LOCAL_CHAT_LATENCY", 0.0)
+
+
+def embedding_cache_model(model: str) -> str:
+    """
+    로컬 해시 임베딩이 실제 모델 벡터와 같은 디스크 캐시 키를 쓰지 않도록 분리.
+    """
+    dim = getattr(settings, "AI_LOCAL_EMBEDDING_DIM", DEFAULT_EMBEDDING_DIM)
+    return f"local-hash-{dim}:{model}"
+
+
+def hash_embedding(text: str, dim: int = DEFAULT_EMBEDDING_DIM) -> List[float]:
+    """
+    feature hashing 임베딩: 공백 토큰 + 문자 2-gram을 부호 있는 해시로 dim 차원에 누적 후 L2 정규화.
+    프로세스/실행과 무관하게 같은 텍스트는 같은 벡터.
+    """
+    vec = np.zeros(dim, dtype=np.float32)
+    text = (text or "").lower()
+    features = text.split() + [text[i : i + 2] for i in range(len(text) - 1) if not text[i : i + 2].isspace()]
+    for feature in features:
+        h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+        vec[h % dim] += 1.0 if (h >> 63) & 1 else -1.0
+    norm = np.linalg.norm(vec)
+    if norm > 0:
+        vec /= norm
+    return vec.tolist()
+
+
+def _line_after(prompt: str, label: str) -> str:
+    match = re.search(re.escape(label) + r"\s*(.*)", prompt)
+    return match.group(1).strip() if match else ""
+
+
+def _listed_policies(prompt: str) -> List[Dict[str, Any]]:
+    # 일괄 프롬프트의 "- id:<id>, 제목:<제목>, ..." 줄
+    return [
+        {"id": int(pid), "title": title.strip()}
+        for pid, title in re.findall(r"-\s*id:(\d+),\s*제목:(.*?)(?:,\s*(?:유사도|요약):|$)", prompt, re.MULTILINE)
+    ]
+
+
+def _reason(title: str) -> str:
+    return f"{title} 정책이 요청하신 조건과 관련 있어 추천합니다."[:80]
+
+
+def chat_text(site: str, prompt: str) -> str:
+    """
+    호출 위치(site)별 템플릿 응답 텍스트.
+    """
+    if site == "query_normalize":
+        query = _line_after(prompt, "입력 질의:")
+        return json.dumps({"intent": query, "keywords": query.split()[:5]}, ensure_ascii=False)
+    if site == "query_expand":
+        match = re.search(r'사용자 입력:\s*"(.*)"', prompt, re.DOTALL)
+        query = match.group(1).strip() if match else ""
+        return json.dumps({"expanded_query": query, "filters": {}}, ensure_ascii=False)
+    if site in ("query_reasons", "profile_reasons", "policy_top3"):
+        policies = _listed_policies(prompt)
+        if site == "policy_top3":
+            policies = policies[:3]
+        return json.dumps(
+            [{"id": p["id"], "reason": _reason(p["title"])} for p in policies],
+            ensure_ascii=False,
+        )
+    return _reason(_line_after(prompt, "정책 제목:"))
+
+
+def _prompt(endpoint: str, payload: Dict[str, Any]) -> str:
+    if endpoint == "gemini":
+        parts = payload.get("contents", [{}])[0].get("parts", [])
+        return "\n".join(part.get("text", "") for part in parts)
+    return "\n".join(str(m.get("content", "")) for m in payload.get("messages", []))
+
+
+def respond(endpoint: str, payload: Dict[str, Any], site: Optional[str] = None) -> Dict[str, Any]:
+    """
+    업스트림과 같은 형태의 응답 JSON 생성 (OpenAI chat / embeddings, Gemini generateContent).
+    """
+    if endpoint == "embeddings":
+        dim = getattr(settings, "AI_LOCAL_EMBEDDING_DIM", DEFAULT_EMBEDDING_DIM)
+        texts = payload.get("input") or []
+        if isinstance(texts, str):
+            texts = [texts]
+        return {"data": [{"index": i, "embedding": hash_embedding(t, dim)} for i, t in enumerate(texts)]}
+
+    text = chat_text(site or endpoint, _prompt(endpoint, payload))
+    if endpoint == "gemini":
+        return {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+    return {"choices": [{"message": {"role": "assistant", "content": text}}]}
@@ -1,18 +1,279 @@
+import hashlib
 import json
+import os
+import threading
+import time
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional, Sequence, Tuple
 
-INDEX_PATH = Path("backend/recommends/data/policy_index.json")
+import numpy as np
+from django.conf import settings
 
-_CACHE: List[Dict] = []
+from policies.services.catalog import catalog_version
+from .columnar_index import ColumnarIndex, columnar_path, encode_columnar
+from .facet_index import FacetIndex
+from .keyword_index import KeywordIndex
 
+INDEX_PATH = Path(
+    getattr(settings, "POLICY_INDEX_PATH", Path(settings.BASE_DIR) / "recommends" / "data" / "policy_index.json")
+)
 
-def load_index() -> List[Dict]:
-    global _CACHE
-    if _CACHE:
-        return _CACHE
-    if not INDEX_PATH.exists():
-        return []
-    data = json.loads(INDEX_PATH.read_text(encoding="utf-8"))
-    _CACHE = data
-    return data
+FileStamp = Optional[Tuple[int, ...]]
+
+
+class IndexSnapshot:
+    """
+    한 시점의 정책 인덱스 (항목, 키워드 역색인, 패싯, id→위치, 임베딩 행렬).
+    재적재 시 통째로 교체되므로 요청 하나는 처음 받은 스냅샷만 사용하면 일관된 값을 본다.
+    items[pos]는 dict처럼 읽는 읽기 전용 레코드 - 응답/이유 생성으로 넘길 때는 dict(items[pos]).
+    catalog: 인덱스를 만든 시점의 정책 테이블 버전 (policies.services.catalog). 이전 형식 파일이면 None.
+    """
+
+    def __init__(
+        self,
+        items: ColumnarIndex,
+        version: str,
+        stamp: FileStamp,
+        embeddings: Optional[np.ndarray] = None,
+        catalog: Optional[str] = None,
+    ):
+        self.items = items
+        self.version = version
+        self.stamp = stamp
+        self.catalog = catalog
+        self.ids = items.ids
+        # 역색인/패싯은 컬럼형 인덱스(mmap) 위의 view - 워커마다 따로 만들지 않는다
+        self.keywords = KeywordIndex(items)
+        self.facets = FacetIndex(items)
+        self.positions: Dict[int, int] = {int(pid): pos for pos, pid in enumerate(self.ids)}
+        self.embeddings = embeddings
+
+
+_SNAPSHOT: Optional[IndexSnapshot] = None
+_CHECKED_AT = 0.0
+_RELOADING = False
+_FAILED_STAMP: FileStamp = None
+_LOCK = threading.Lock()
+
+
+def embedding_paths(index_path: Path) -> Tuple[Path, Path]:
+    """
+    인덱스 JSON 옆에 저장되는 (임베딩 행렬, 행별 정책 id) 경로.
+    """
+    return (
+        index_path.with_name("policy_embeddings.npy"),
+        index_path.with_name("policy_embedding_ids.npy"),
+    )
+
+
+def embedding_text(item: Dict) -> str:
+    """
+    정책 임베딩 입력 텍스트 (search_summary 우선, fallback summary/title).
+    """
+    return (item.get("search_summary") or item.get("summary") or item.get("title") or "")[:400]
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    행 단위 L2 정규화. 내적이 곧 코사인 유사도가 되도록 한다.
+    """
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+def content_hash(item: Dict) -> str:
+    """
+    인덱스 항목 내용 해시 (content_hash 필드 자신은 제외). 증분 재생성 시 변경 여부 판단용.
+    """
+    body = {key: value for key, value in item.items() if key != "content_hash"}
+    raw = json.dumps(body, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def index_digest(items: List[Dict]) -> str:
+    """
+    인덱스 전체 버전 스탬프: (id, 내용 해시) 목록의 해시. 내용이 같으면 같은 버전.
+    """
+    digest = hashlib.sha1()
+    for item in items:
+        digest.update(f"{item['id']}:{item.get('content_hash') or content_hash(item)};".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def _atomic_write(path: Path, write):
+    # 같은 디렉터리의 임시 파일에 쓴 뒤 os.replace → 읽는 쪽은 이전/새 파일 중 하나만 본다
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as fh:
+            write(fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def write_index(path: Path, items: List[Dict], version: str, catalog: Optional[str] = None):
+    """
+    버전 스탬프(와 만든 시점의 정책 테이블 버전)가 붙은 인덱스 JSON을 원자적으로 저장.
+    """
+    data = {"version": version, "catalog": catalog, "built_at": int(time.time()), "items": items}
+    raw = json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+    _atomic_write(path, lambda fh: fh.write(raw))
+
+
+def write_columnar(path: Path, items: List[Dict], version: str, catalog: Optional[str] = None):
+    """
+    워커들이 mmap으로 공유하는 컬럼형 바이너리(인덱스 JSON과 같은 이름의 .bin)를 원자적으로 저장.
+    """
+    raw = encode_columnar(items, version, catalog)
+    _atomic_write(columnar_path(path), lambda fh: fh.write(raw))
+
+
+def save_array(path: Path, array: np.ndarray):
+    """
+    .npy 원자적 저장 (이미 mmap 중인 프로세스는 교체 전 파일을 계속 읽는다).
+    """
+    _atomic_write(path, lambda fh: np.save(fh, array))
+
+
+def read_index_file(path: Path) -> Tuple[List[Dict], Optional[str], Optional[str]]:
+    """
+    인덱스 파일 → (항목 목록, 버전, 정책 테이블 버전). 버전 스탬프가 없는 이전 형식(JSON 배열)도 읽는다.
+    """
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if isinstance(data, list):
+        return data, None, None
+    return data.get("items") or [], data.get("version"), data.get("catalog")
+
+
+def _file_stamp(path: Path) -> FileStamp:
+    """
+    변경 감지용 (mtime, inode) - 인덱스 JSON, 컬럼형 바이너리, 임베딩 id 파일. 인덱스가 없으면 None.
+    """
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    stamp = (stat.st_mtime_ns, stat.st_ino)
+    for extra in (columnar_path(path), embedding_paths(path)[1]):
+        try:
+            extra_stat = extra.stat()
+        except OSError:
+            continue
+        stamp += (extra_stat.st_mtime_ns, extra_stat.st_ino)
+    return stamp
+
+
+def read_index_embeddings(path: Path, item_ids: Sequence[int]) -> Optional[np.ndarray]:
+    """
+    인덱스 순서와 같은 행 순서의 정규화 임베딩 행렬 (memory-mapped, 읽기 전용).
+    파일이 없거나 인덱스와 id 순서가 어긋나면 None.
+    """
+    item_ids = np.asarray(item_ids, dtype=np.int64)
+    matrix_path, ids_path = embedding_paths(path)
+    if not item_ids.shape[0] or not matrix_path.exists() or not ids_path.exists():
+        return None
+    if not np.array_equal(np.load(ids_path), item_ids):
+        return None
+    matrix = np.load(matrix_path, mmap_mode="r")
+    return matrix if matrix.shape[0] == item_ids.shape[0] else None
+
+
+def _read_items(path: Path) -> Tuple[ColumnarIndex, Optional[str], Optional[str]]:
+    """
+    컬럼형 바이너리가 있으면 mmap으로 열고 (JSON 파싱 없음), 없거나 키워드 섹션이 없는 이전 형식이면
+    항목을 읽어 메모리에서 같은 형식으로 변환한다.
+    """
+    binary_path = columnar_path(path)
+    if binary_path.exists():
+        items = ColumnarIndex(binary_path)
+        if items.has_keywords:
+            return items, items.version, items.catalog
+        records, version, catalog = [dict(record) for record in items], items.version, items.catalog
+    else:
+        records, version, catalog = read_index_file(path)
+    return ColumnarIndex(encode_columnar(records, version, catalog)), version, catalog
+
+
+def _read_snapshot(path: Path) -> IndexSnapshot:
+    stamp = _file_stamp(path)
+    if stamp is None:
+        return IndexSnapshot(ColumnarIndex(encode_columnar([], "none")), "none", None)
+    items, version, catalog = _read_items(path)
+    snapshot = IndexSnapshot(items, version or str(stamp[0]), stamp, catalog=catalog)
+    snapshot.embeddings = read_index_embeddings(path, snapshot.ids)
+    return snapshot
+
+
+def _reload(path: Path, stamp: FileStamp):
+    """
+    백그라운드 재적재: 새 스냅샷을 다 만든 뒤 교체. 실패(쓰는 중/깨진 파일)하면 이전 스냅샷 유지.
+    """
+    global _SNAPSHOT, _RELOADING, _FAILED_STAMP
+    try:
+        snapshot = _read_snapshot(path)
+    except Exception:
+        _FAILED_STAMP = stamp
+    else:
+        _SNAPSHOT = snapshot
+    finally:
+        _RELOADING = False
+
+
+def _maybe_reload(snapshot: IndexSnapshot):
+    """
+    POLICY_INDEX_CHECK_INTERVAL초마다 파일 stat만 비교하고, 바뀌었으면 재적재 스레드를 띄운다.
+    요청은 기다리지 않고 현재 스냅샷으로 계속 처리된다.
+    """
+    global _CHECKED_AT, _RELOADING
+    now = time.monotonic()
+    if now - _CHECKED_AT < getattr(settings, "POLICY_INDEX_CHECK_INTERVAL", 2.0):
+        return
+    with _LOCK:
+        if _RELOADING or now - _CHECKED_AT < getattr(settings, "POLICY_INDEX_CHECK_INTERVAL", 2.0):
+            return
+        _CHECKED_AT = now
+        stamp = _file_stamp(INDEX_PATH)
+        if stamp == snapshot.stamp or stamp == _FAILED_STAMP:
+            return
+        _RELOADING = True
+    threading.Thread(target=_reload, args=(INDEX_PATH, stamp), name="policy-index-reload", daemon=True).start()
+
+
+def load_snapshot() -> IndexSnapshot:
+    """
+    현재 인덱스 스냅샷. 첫 호출만 동기 적재하고, 이후 변경은 백그라운드에서 교체된다.
+    """
+    global _SNAPSHOT, _CHECKED_AT
+    snapshot = _SNAPSHOT
+    if snapshot is None:
+        with _LOCK:
+            if _SNAPSHOT is None:
+                _SNAPSHOT = _read_snapshot(INDEX_PATH)
+                _CHECKED_AT = time.monotonic()
+            return _SNAPSHOT
+    _maybe_reload(snapshot)
+    return snapshot
+
+
+
+def index_version() -> str:
+    """
+    현재 스냅샷의 인덱스 버전. 결과 캐시 키에 사용.
+    """
+    return load_snapshot().version
+
+
+def load_facets() -> Optional[FacetIndex]:
+    """
+    ACTIVE 정책 패싯 비트셋. 인덱스가 아직 없거나, 인덱스를 만든 뒤 정책 테이블이 바뀌었으면
+    (새로 적재/활성화된 정책이 빠지지 않도록) None → 호출측은 DB 필터로 fallback.
+    """
+    snapshot = load_snapshot()
+    if not len(snapshot.items) or snapshot.catalog is None or snapshot.catalog != catalog_version():
+        return None
+    return snapshot.facets
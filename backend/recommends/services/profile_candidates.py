@@ -1,12 +1,22 @@
 from django.db.models import Q
 
 from policies.models import Policy
+from policies.utils.json_filters import json_list_icontains
+from .facet_index import MAX_ID_FILTER
+from .policy_index import load_facets
 
 
 def get_profile_candidates(profile):
     """
     프로필 기반 후보 추출: 하드 필터만 수행.
+    정책 인덱스가 DB와 같은 버전이면 패싯 비트셋 교집합으로 id를 구하고, 아니면(또는 결과가 너무 넓으면) DB 필터.
     """
+    facets = load_facets()
+    if facets is not None:
+        candidates = _facet_candidates(profile, facets)
+        if candidates is not None:
+            return candidates
+
     qs = Policy.objects.filter(status="ACTIVE")
 
     # 지역
@@ -15,7 +25,7 @@ def get_profile_candidates(profile):
         qs = qs.filter(
             Q(region_scope="NATIONWIDE")
             | Q(region_sido=profile_sido)
-            | Q(applicable_regions__icontains=profile_sido)  # SQLite 호환
+            | json_list_icontains("applicable_regions", profile_sido)  # SQLite 호환
         )
 
     # 연령
@@ -29,8 +39,36 @@ def get_profile_candidates(profile):
     # 취업 상태 (profile.employment_status -> policy.employment 리스트)
     employment_status = getattr(profile, "employment_status", None)
     if employment_status:
-        filtered = qs.filter(employment__icontains=employment_status)  # SQLite 호환
+        filtered = qs.filter(json_list_icontains("employment", employment_status))  # SQLite 호환
         # 매칭이 전혀 없으면 취업 상태 필터는 건너뛴다 (과도 컷 방지)
         qs = filtered if filtered.exists() else qs
 
     return qs
+
+
+def _facet_candidates(profile, facets):
+    """
+    DB 필터와 같은 조건을 비트셋으로 계산 (region_sido는 정확히 일치, applicable_regions/취업 상태는 부분 문자열).
+    결과가 MAX_ID_FILTER개보다 많으면 None.
+    """
+    mask = facets.all()
+
+    profile_sido = getattr(profile, "region_sido", None) or getattr(profile, "region", None)
+    if profile_sido:
+        mask &= facets.region([profile_sido], partial=True, exact_sido=True)
+
+    profile_age = getattr(profile, "age", None)
+    if profile_age:
+        mask &= facets.age(profile_age)
+
+    employment_status = getattr(profile, "employment_status", None)
+    if employment_status:
+        filtered = mask & facets.employment_match(employment_status, partial=True)
+        # 매칭이 전혀 없으면 취업 상태 필터는 건너뛴다 (과도 컷 방지)
+        mask = filtered if filtered.any() else mask
+
+    ids = facets.ids_of(mask, limit=MAX_ID_FILTER)
+    if ids is None:
+        return None
+    # 인덱스 재생성 전 비활성화된 정책은 status 조건으로 제외
+    return Policy.objects.filter(status="ACTIVE", id__in=ids)
@@ -1,13 +1,36 @@
 import json
-from typing import Dict, Optional
+import threading
+from functools import partial
+from typing import Dict, Iterable, List, Optional, Tuple
 
-from .ai_client import chat_completion
+from django.conf import settings
 
+from policies.services.normalize_ai import normalize_query
+from policies.services.query_expand_ai import expand_query
+from .ai_client import achat_completion, chat_completion
+from .ttl_cache import TTLCache
 
-def normalize_query_llm(query: str) -> Dict[str, Optional[str]]:
-    """
-    LLM을 사용해 질의를 요약/정규화.
-    """
+# 추천 화면에서 제공하는 예시 질의 (정규화 캐시 사전 적재 대상)
+QUERY_EXAMPLES = [
+    "분야:창업 | 대상:청년 | 혜택:장비 구입비 지원",
+    "분야:교육 | 대상:대학원생 | 혜택:등록금·장학금",
+    "분야:주거 | 대상:청년 | 혜택:전세/월세 대출·이자지원",
+    "분야:보건 | 대상:저소득 | 혜택:의료비/건강검진 바우처",
+    "분야:취업 | 대상:군 전역 예정자 | 혜택:직업훈련 바우처",
+]
+
+# 1단계: 원문 질의 그대로, 2단계: 특수문자/불용어 제거한 정규화 질의
+_EXACT_CACHE = TTLCache(
+    max_entries=getattr(settings, "QUERY_CACHE_MAX_ENTRIES", 2000),
+    ttl=getattr(settings, "QUERY_CACHE_TTL", 24 * 60 * 60),
+)
+_NORMALIZED_CACHE = TTLCache(
+    max_entries=getattr(settings, "QUERY_CACHE_MAX_ENTRIES", 2000),
+    ttl=getattr(settings, "QUERY_CACHE_TTL", 24 * 60 * 60),
+)
+
+
+def _normalize_messages(query: str) -> List[Dict[str, str]]:
     system = (
         "너는 한국어 정책 검색 보조야. 사용자의 질의를 간결한 의도 문장으로 정리하고, "
         "핵심 키워드만 쉼표로 분리해 반환해. JSON으로만 답변해."
@@ -18,17 +41,133 @@ def normalize_query_llm(query: str) -> Dict[str, Optional[str]]:
         '{ "intent": "<짧은 의도 문장>", "keywords": ["키워드1","키워드2"] }\n'
         "불확실하면 intent는 입력 그대로, keywords는 비워도 된다."
     )
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": user},
+    ]
+
+
+def _parse_normalized(raw: str, query: str) -> Dict[str, Optional[str]]:
+    data = json.loads(raw)
+    intent = data.get("intent") or query
+    keywords = data.get("keywords") or []
+    return {"intent": intent, "keywords": keywords}
+
+
+def rule_normalize(query: str) -> Dict[str, Optional[str]]:
+    """
+    규칙 기반 정규화 (LLM 실패/서킷 open 시): 의도는 원문, 키워드는 카테고리 동의어 확장.
+    """
+    return {"intent": query, "keywords": expand_query(query)[1:]}
+
+
+def _normalize_with_llm(query: str) -> Tuple[Dict[str, Optional[str]], bool]:
+    """
+    LLM을 사용해 질의를 요약/정규화. (결과, 성공 여부) 반환.
+    서킷이 열려 있거나 응답을 해석하지 못하면 규칙 기반 결과를 쓴다.
+    """
     try:
-        raw = chat_completion(
-            [
-                {"role": "system", "content": system},
-                {"role": "user", "content": user},
-            ],
-            model="gpt-4o-mini",
+        return (
+            chat_completion(
+                _normalize_messages(query),
+                model="gpt-4o-mini",
+                site="query_normalize",
+                parse=partial(_parse_normalized, query=query),
+            ),
+            True,
         )
-        data = json.loads(raw)
-        intent = data.get("intent") or query
-        keywords = data.get("keywords") or []
-        return {"intent": intent, "keywords": keywords}
     except Exception:
-        return {"intent": query, "keywords": []}
+        return rule_normalize(query), False
+
+
+async def _anormalize_with_llm(query: str) -> Tuple[Dict[str, Optional[str]], bool]:
+    try:
+        return (
+            await achat_completion(
+                _normalize_messages(query),
+                model="gpt-4o-mini",
+                site="query_normalize",
+                parse=partial(_parse_normalized, query=query),
+            ),
+            True,
+        )
+    except Exception:
+        return rule_normalize(query), False
+
+
+def _copy(result: Dict) -> Dict[str, Optional[str]]:
+    return {"intent": result["intent"], "keywords": list(result["keywords"])}
+
+
+def _lookup(query: str) -> Tuple[Optional[Dict], Optional[str]]:
+    """
+    원문 질의 → 정규화 질의 순으로 캐시 조회. (캐시 결과 또는 None, 정규화 키) 반환.
+    """
+    cached = _EXACT_CACHE.get(query)
+    if cached is not None:
+        return _copy(cached), None
+
+    normalized_key = normalize_query(query)
+    if normalized_key:
+        cached = _NORMALIZED_CACHE.get(normalized_key)
+        if cached is not None:
+            _EXACT_CACHE.set(query, cached)
+            return _copy(cached), normalized_key
+    return None, normalized_key
+
+
+def _store(query: str, normalized_key: Optional[str], result: Dict, ok: bool):
+    if ok:
+        _EXACT_CACHE.set(query, result)
+        if normalized_key:
+            _NORMALIZED_CACHE.set(normalized_key, result)
+
+
+def normalize_query_llm(query: str) -> Dict[str, Optional[str]]:
+    """
+    LLM을 사용해 질의를 요약/정규화.
+    원문 질의 → 정규화 질의(normalize_query) 순으로 캐시를 조회하고, 성공한 LLM 결과만 캐시한다.
+    """
+    cached, normalized_key = _lookup(query)
+    if cached is not None:
+        return cached
+    result, ok = _normalize_with_llm(query)
+    _store(query, normalized_key, result, ok)
+    return _copy(result)
+
+
+async def anormalize_query_llm(query: str) -> Dict[str, Optional[str]]:
+    """
+    normalize_query_llm의 비동기 버전 (같은 캐시 사용).
+    """
+    cached, normalized_key = _lookup(query)
+    if cached is not None:
+        return cached
+    result, ok = await _anormalize_with_llm(query)
+    _store(query, normalized_key, result, ok)
+    return _copy(result)
+
+
+def seed_query_cache(queries: Iterable[str] = QUERY_EXAMPLES):
+    """
+    자주 쓰이는 질의(기본: QUERY_EXAMPLES)를 미리 정규화해 캐시에 적재.
+    """
+    for query in queries:
+        normalize_query_llm(query)
+
+
+def start_query_cache_seed():
+    """
+    웹 서버 진입점(config/wsgi.py, config/asgi.py)에서 호출: QUERY_CACHE_PRESEED가 켜져 있을 때만
+    예시 질의 정규화 캐시를 백그라운드에서 채운다 (기동 지연 없음). 관리 명령/테스트/스크립트에서는 실행되지 않는다.
+    """
+    if not getattr(settings, "QUERY_CACHE_PRESEED", False):
+        return
+    threading.Thread(target=seed_query_cache, name="query-cache-seed", daemon=True).start()
+
+
+def query_cache_stats() -> Dict[str, Dict[str, float]]:
+    return {
+        "exact": _EXACT_CACHE.stats(),
+        "normalized": _NORMALIZED_CACHE.stats(),
+    }
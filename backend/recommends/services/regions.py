@@ -0,0 +1,36 @@
+from typing import Iterable, Set
+
+# 간단 지역 키워드 목록 (시/도 기준)
+REGION_KEYWORDS = {
+    "서울",
+    "부산",
+    "대구",
+    "인천",
+    "광주",
+    "대전",
+    "울산",
+    "세종",
+    "경기",
+    "강원",
+    "충북",
+    "충남",
+    "전북",
+    "전남",
+    "경북",
+    "경남",
+    "제주",
+}
+
+
+def region_keywords_in(texts: Iterable[str]) -> Set[str]:
+    """
+    텍스트들에 포함된 시/도 키워드 집합. 예: ["서울특별시 종로구"] -> {"서울"}
+    """
+    found = set()
+    for text in texts:
+        if not text:
+            continue
+        for region in REGION_KEYWORDS:
+            if region in text:
+                found.add(region)
+    return found
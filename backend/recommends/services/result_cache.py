@@ -0,0 +1,112 @@
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from django.conf import settings
+
+from policies.services.normalize_ai import normalize_query
+from .policy_index import index_version
+from .ttl_cache import TTLCache
+
+# 정책 적재/인덱스 재생성 시 갱신되는 세대 스탬프 파일 (프로세스 간 전체 무효화용)
+# 프로필 결과는 프로필 스냅샷 자체가 키라서 프로필이 바뀌면 자연히 다른 키가 된다 (별도 무효화 불필요)
+GENERATION_FILE = "result_cache.stamp"
+
+_PROFILE_RESULTS = TTLCache(
+    max_entries=getattr(settings, "RESULT_CACHE_MAX_ENTRIES", 1000),
+    ttl=getattr(settings, "RESULT_CACHE_TTL", 10 * 60),
+)
+_QUERY_RESULTS = TTLCache(
+    max_entries=getattr(settings, "RESULT_CACHE_MAX_ENTRIES", 1000),
+    ttl=getattr(settings, "RESULT_CACHE_TTL", 10 * 60),
+)
+_SEEN_GENERATION: Optional[int] = None
+
+
+def profile_snapshot(profile) -> dict:
+    """추천 로그에 남길 주요 프로필 스냅샷 (프로필 추천 결과 캐시 키 기준)."""
+    if not profile:
+        return {}
+    return {
+        "age": profile.age,
+        "region": profile.region,
+        "gender": profile.gender,
+        "employment_status": profile.employment_status,
+        "education_level": profile.education_level,
+        "income_quintile": profile.income_quintile,
+        "major": profile.major,
+        "interest": profile.interest,
+        "special_targets": profile.special_targets,
+    }
+
+
+def _hash(value) -> str:
+    raw = json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _generation_path() -> Path:
+    # 설정은 호출 시점에 읽는다 (테스트/배포에서 RECOMMEND_DATA_DIR을 바꿔도 반영되도록)
+    data_dir = getattr(settings, "RECOMMEND_DATA_DIR", None) or Path(settings.BASE_DIR) / "recommends" / "data"
+    return Path(data_dir) / GENERATION_FILE
+
+
+def _current_generation() -> int:
+    try:
+        return _generation_path().stat().st_mtime_ns
+    except OSError:
+        return 0
+
+
+def _sync_generation():
+    """
+    다른 프로세스(load_policies, build_policy_index)가 스탬프를 갱신했으면 전체 캐시 비움.
+    """
+    global _SEEN_GENERATION
+    generation = _current_generation()
+    if _SEEN_GENERATION is not None and generation != _SEEN_GENERATION:
+        _PROFILE_RESULTS.clear()
+        _QUERY_RESULTS.clear()
+    _SEEN_GENERATION = generation
+
+
+def invalidate_all():
+    """
+    모든 추천 결과 무효화 (정책 적재/인덱스 재생성 후 호출).
+    """
+    path = _generation_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(str(time.time_ns()), encoding="utf-8")
+    _PROFILE_RESULTS.clear()
+    _QUERY_RESULTS.clear()
+
+
+def _profile_key(snapshot: dict) -> str:
+    return _hash(snapshot)
+
+
+def _query_key(query: str, age: Optional[int]) -> str:
+    return _hash([normalize_query(query) or query, age, index_version()])
+
+
+def get_profile_results(snapshot: dict) -> Optional[List[dict]]:
+    _sync_generation()
+    return _PROFILE_RESULTS.get(_profile_key(snapshot))
+
+
+def set_profile_results(snapshot: dict, results: List[dict]):
+    _PROFILE_RESULTS.set(_profile_key(snapshot), results)
+
+
+def get_query_results(query: str, age: Optional[int]) -> Optional[List[dict]]:
+    """
+    질의 결과 (정규화 질의 + 연령 필터 + 인덱스 버전 기준).
+    """
+    _sync_generation()
+    return _QUERY_RESULTS.get(_query_key(query, age))
+
+
+def set_query_results(query: str, age: Optional[int], results: List[dict]):
+    _QUERY_RESULTS.set(_query_key(query, age), results)
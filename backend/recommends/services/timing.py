@@ -0,0 +1,73 @@
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, Optional
+
+# 요청별 단계 소요 시간 (Server-Timing 헤더용). 풀 스레드로는 contextvars 복사로 같은 dict가 전달된다.
+_TIMINGS: ContextVar[Optional[Dict[str, float]]] = ContextVar("recommend_stage_timings", default=None)
+
+
+@contextmanager
+def collect_timings():
+    """
+    뷰에서 요청 단위로 단계 시간을 모은다. {단계: 초} dict를 돌려준다.
+    """
+    timings: Dict[str, float] = OrderedDict()
+    token = _TIMINGS.set(timings)
+    started = time.monotonic()
+    try:
+        yield timings
+    finally:
+        timings["total"] = time.monotonic() - started
+        _TIMINGS.reset(token)
+
+
+@contextmanager
+def stage(name: str):
+    """
+    단계 소요 시간 기록 (같은 이름은 누적). 수집 중이 아니면 아무것도 하지 않는다.
+    """
+    timings = _TIMINGS.get()
+    if timings is None:
+        yield
+        return
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + (time.monotonic() - started)
+
+
+def server_timing(timings: Dict[str, float]) -> str:
+    """
+    Server-Timing 헤더 값 (예: "normalize;dur=812.4, rank;dur=35.0, total;dur=1203.9").
+    """
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items())
+
+
+def with_server_timing(view):
+    """
+    뷰 데코레이터: 단계 시간을 모아 응답에 Server-Timing 헤더를 붙인다 (동기/비동기 뷰 모두 지원).
+    """
+    if asyncio.iscoroutinefunction(view):
+
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            with collect_timings() as timings:
+                response = await view(request, *args, **kwargs)
+            response["Server-Timing"] = server_timing(timings)
+            return response
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with collect_timings() as timings:
+            response = view(request, *args, **kwargs)
+        response["Server-Timing"] = server_timing(timings)
+        return response
+
+    return wrapper
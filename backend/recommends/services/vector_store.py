@@ -0,0 +1,207 @@
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from .regions import region_keywords_in
+
+VECTOR_STORE_PATH = Path(settings.BASE_DIR) / "recommends" / "data" / "chroma"
+COLLECTION_NAME = "policies"
+# 컬렉션에 마지막으로 반영한 정책 인덱스 버전 (VECTOR_STORE_PATH 안). 스냅샷 버전과 다르면 ANN을 쓰지 않는다.
+VERSION_FILE = "index_version"
+
+# chromadb 메타데이터는 None을 허용하지 않으므로 연령 미지정은 넓은 범위로 저장
+AGE_MIN_SENTINEL = 0
+AGE_MAX_SENTINEL = 200
+
+_CLIENT = None
+_CLIENT_LOCK = threading.Lock()
+_VERSION: Tuple[Optional[int], Optional[str]] = (None, None)
+
+
+def _store_path() -> Path:
+    return Path(getattr(settings, "VECTOR_STORE_PATH", None) or VECTOR_STORE_PATH)
+
+
+def _get_client():
+    """
+    chromadb PersistentClient (선택 의존성, 프로세스당 하나). 설치되어 있지 않으면 None.
+    """
+    global _CLIENT
+    if _CLIENT is not None:
+        return _CLIENT
+    try:
+        import chromadb
+        from chromadb.config import Settings
+    except ImportError:
+        return None
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            _CLIENT = chromadb.PersistentClient(
+                path=str(_store_path()), settings=Settings(anonymized_telemetry=False)
+            )
+        return _CLIENT
+
+
+def get_collection(create: bool = False):
+    """
+    정책 임베딩 컬렉션 (코사인 거리 HNSW). 없으면 None (create=True면 생성).
+    조회만 할 때는 저장 디렉터리가 없으면 클라이언트를 열지 않는다 (PersistentClient가 디렉터리를 만들기 때문).
+    """
+    if not create and not _store_path().exists():
+        return None
+    client = _get_client()
+    if client is None:
+        return None
+    if create:
+        return client.get_or_create_collection(COLLECTION_NAME, metadata={"hnsw:space": "cosine"})
+    try:
+        return client.get_collection(COLLECTION_NAME)
+    except ValueError:
+        return None
+
+
+def reset_collection():
+    client = _get_client()
+    if client is None:
+        return
+    try:
+        client.delete_collection(COLLECTION_NAME)
+    except ValueError:
+        pass
+
+
+def store_version() -> Optional[str]:
+    """
+    컬렉션에 반영된 정책 인덱스 버전 (스탬프 파일 mtime이 바뀔 때만 다시 읽음). 없으면 None.
+    """
+    global _VERSION
+    path = _store_path() / VERSION_FILE
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return None
+    if _VERSION[0] != mtime:
+        _VERSION = (mtime, path.read_text(encoding="utf-8").strip() or None)
+    return _VERSION[1]
+
+
+def clear_store_version():
+    """
+    컬렉션을 고치는 동안/인덱스와 맞출 수 없을 때 스탬프 제거 → 워커는 ANN 대신 임베딩 행렬 사용.
+    """
+    try:
+        (_store_path() / VERSION_FILE).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _write_store_version(version: str):
+    path = _store_path() / VERSION_FILE
+    tmp_path = path.with_name(f".{VERSION_FILE}.{os.getpid()}.tmp")
+    tmp_path.write_text(version, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def policy_metadata(item: Mapping) -> Dict:
+    """
+    필터용 메타데이터 (정책 인덱스 항목 기준). 다중 지역 정책을 위해 시/도 키워드별 플래그(sido_서울=1 등)를 함께 저장.
+    """
+    regions = [item.get("region_sido") or ""] + [str(r) for r in (item.get("applicable_regions") or [])]
+    metadata = {
+        "region_scope": item.get("region_scope") or "",
+        "region_sido": item.get("region_sido") or "",
+        "category": item.get("category") or "",
+        "policy_type": item.get("policy_type") or "",
+        "min_age": item["min_age"] if item.get("min_age") is not None else AGE_MIN_SENTINEL,
+        "max_age": item["max_age"] if item.get("max_age") is not None else AGE_MAX_SENTINEL,
+    }
+    for region in region_keywords_in(regions):
+        metadata[f"sido_{region}"] = 1
+    return metadata
+
+
+def sync_collection(
+    items: Sequence[Mapping],
+    matrix: np.ndarray,
+    version: str,
+    changed_ids: Optional[Set[int]] = None,
+    batch_size: int = 500,
+) -> Optional[Tuple[int, int]]:
+    """
+    정책 인덱스 항목과 같은 행 순서의 임베딩 행렬을 컬렉션에 반영하고 인덱스 버전 스탬프를 남긴다.
+    changed_ids가 있으면 그 정책만 upsert (None이면 전부), 인덱스에 없는 id는 삭제. (upserted, removed).
+    chromadb가 없으면 None.
+    """
+    collection = get_collection(create=True)
+    if collection is None:
+        return None
+    # 반영이 끝나기 전에는 워커가 이 컬렉션을 쓰지 않도록
+    clear_store_version()
+    rows = [row for row, item in enumerate(items) if changed_ids is None or item["id"] in changed_ids]
+    for start in range(0, len(rows), batch_size):
+        chunk = rows[start : start + batch_size]
+        collection.upsert(
+            ids=[str(items[row]["id"]) for row in chunk],
+            embeddings=[matrix[row].tolist() for row in chunk],
+            metadatas=[policy_metadata(items[row]) for row in chunk],
+        )
+    keep = {str(item["id"]) for item in items}
+    stale_ids = [pid for pid in collection.get(include=[])["ids"] if pid not in keep]
+    if stale_ids:
+        collection.delete(ids=stale_ids)
+    _write_store_version(version)
+    return len(rows), len(stale_ids)
+
+
+def _build_where(region_terms: Iterable[str] = (), age: Optional[int] = None) -> Optional[Dict]:
+    clauses: List[Dict] = []
+    regions = region_keywords_in(region_terms)
+    if regions:
+        clauses.append(
+            {"$or": [{"region_scope": "NATIONWIDE"}] + [{f"sido_{r}": 1} for r in sorted(regions)]}
+        )
+    if age is not None:
+        clauses.append({"min_age": {"$lte": age}})
+        clauses.append({"max_age": {"$gte": age}})
+    if not clauses:
+        return None
+    if len(clauses) == 1:
+        return clauses[0]
+    return {"$and": clauses}
+
+
+def query_similar(
+    query_vec: List[float],
+    k: int,
+    region_terms: Iterable[str] = (),
+    age: Optional[int] = None,
+    version: Optional[str] = None,
+) -> Optional[List[Tuple[int, float]]]:
+    """
+    ANN top-k [(정책 id, 코사인 유사도)]. 메타데이터(지역/연령)로 사전 필터.
+    벡터 스토어를 쓸 수 없거나, version(정책 인덱스 버전)이 컬렉션에 반영된 버전과 다르면 None.
+    """
+    if version is not None and store_version() != version:
+        return None
+    collection = get_collection()
+    if collection is None:
+        return None
+    try:
+        count = collection.count()
+        if not count:
+            return None
+        result = collection.query(
+            query_embeddings=[list(query_vec)],
+            n_results=min(k, count),
+            where=_build_where(region_terms, age),
+            include=["distances"],
+        )
+    except Exception:
+        return None
+    ids = result.get("ids", [[]])[0]
+    distances = result.get("distances", [[]])[0]
+    return [(int(pid), 1.0 - float(dist)) for pid, dist in zip(ids, distances)]
@@ -0,0 +1,39 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+# 스트리밍 추천 응답 이벤트 인코딩 (NDJSON 기본, Accept: text/event-stream이면 SSE)
+
+
+def _dumps(data) -> str:
+    return json.dumps(data, ensure_ascii=False)
+
+
+def encode_event(event: str, data: dict, fmt: str) -> str:
+    """
+    이벤트 한 건을 전송 포맷으로 인코딩.
+    - ndjson: {"event": ..., ...}\n
+    - sse: event: ...\ndata: {...}\n\n
+    """
+    if fmt == "sse":
+        return f"event: {event}\ndata: {_dumps(data)}\n\n"
+    return _dumps({"event": event, **data}) + "\n"
+
+
+class NDJSONRenderer(BaseRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # 스트림 시작 전 오류 응답(400 등)도 같은 포맷의 error 이벤트로
+        return encode_event("error", data or {}, self.format).encode(self.charset)
+
+
+class EventStreamRenderer(BaseRenderer):
+    media_type = "text/event-stream"
+    format = "sse"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return encode_event("error", data or {}, self.format).encode(self.charset)
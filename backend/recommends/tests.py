@@ -1,3 +1,919 @@
-from django.test import TestCase
+import asyncio
+import itertools
+import json
+import tempfile
+import threading
+import time
+from io import StringIO
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import httpx
+import requests
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from policies.models import Policy
+from policies.tests import build_snapshot, create_policies, isolate_data_dir
+from .services import concurrency, gms_client, policy_index, query_normalize_ai
+from .services.ai_client import achat_completion, chat_completion
+from .services.budget import BudgetExceededError, WorkBudget, remaining_budget, request_budget
+from .services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from .services.columnar_index import ColumnarIndex, columnar_path, encode_columnar
+from .services.embedding import embed_texts
+from .services.embedding_batcher import EmbeddingBatcher
+from .services.embedding_cache import EmbeddingCache
+from .services.gms_client import async_client_scope
+from .services.instrumentation import call_stats, reset_stats
+from .services.profile_candidates import get_profile_candidates
+from .services.vector_store import query_similar, store_version
+from .profile_engine import _build_results
+from .query_engine import _Eligibility, query_recommend, rank_query
+from .reason.profile_reason_ai import build_profile_reasons_ai
+from .reason import reason_cache
+from .reason.reason_json import parse_reasons, reasons_parser
+from .views import _aiter_events, recommend_detail_stream
+
+
+def _vector(text):
+    return [float(len(text))]
+
+
+class EmbeddingBatcherTests(SimpleTestCase):
+    def _run_concurrently(self, *calls):
+        """
+        calls: (batcher, texts, budget 초 또는 None). 각 호출의 (결과, 예외) 목록.
+        """
+        results = [None] * len(calls)
+        barrier = threading.Barrier(len(calls))
+
+        def run(i, batcher, texts, budget):
+            barrier.wait()
+            try:
+                if budget is None:
+                    results[i] = (batcher.embed(texts, "m"), None)
+                else:
+                    with request_budget(budget):
+                        results[i] = (batcher.embed(texts, "m"), None)
+            except Exception as exc:
+                results[i] = (None, exc)
+
+        threads = [threading.Thread(target=run, args=(i, *call)) for i, call in enumerate(calls)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+            self.assertFalse(thread.is_alive(), "embed() did not return")
+        return results
+
+    def test_returns_vectors_in_input_order(self):
+        batcher = EmbeddingBatcher(lambda texts, model: [_vector(t) for t in texts], max_batch=8, max_wait=0.01)
+        self.assertEqual(batcher.embed(["a", "bbb", "a"], "m"), [[1.0], [3.0], [1.0]])
+
+    def test_lone_request_is_sent_without_waiting(self):
+        batcher = EmbeddingBatcher(lambda texts, model: [_vector(t) for t in texts], max_batch=8, max_wait=2.0)
+        started = time.monotonic()
+        batcher.embed(["a"], "m")
+        self.assertLess(time.monotonic() - started, 1.0)
+
+    def test_concurrent_same_text_is_requested_once(self):
+        sent = []
+        release = threading.Event()
+
+        def request(texts, model):
+            sent.extend(texts)
+            release.wait(1)
+            return [_vector(t) for t in texts]
+
+        batcher = EmbeddingBatcher(request, max_batch=8, max_wait=0.01)
+        timer = threading.Timer(0.2, release.set)
+        timer.start()
+        results = self._run_concurrently(*[(batcher, ["same"], None)] * 4)
+        timer.cancel()
+        self.assertEqual([r for r, _ in results], [[[4.0]]] * 4)
+        self.assertEqual(sent, ["same"])
+
+    def test_upstream_error_is_delivered_to_every_waiter(self):
+        def request(texts, model):
+            time.sleep(0.1)
+            raise RuntimeError("upstream down")
+
+        batcher = EmbeddingBatcher(request, max_batch=8, max_wait=0.01)
+        results = self._run_concurrently((batcher, ["a"], None), (batcher, ["a", "b"], None))
+        for _, error in results:
+            self.assertIsInstance(error, RuntimeError)
+        self.assertEqual(batcher._inflight, {})
+
+    def test_short_response_fails_all_futures(self):
+        batcher = EmbeddingBatcher(lambda texts, model: [_vector(texts[0])], max_batch=8, max_wait=0.01)
+        with request_budget(2):
+            with self.assertRaisesRegex(RuntimeError, "count mismatch"):
+                batcher.embed(["a", "b", "c"], "m")
+        self.assertEqual(batcher._inflight, {})
+
+    def test_upstream_call_does_not_run_under_caller_budget(self):
+        seen = []
+
+        def request(texts, model):
+            seen.append(remaining_budget())
+            return [_vector(t) for t in texts]
+
+        batcher = EmbeddingBatcher(request, max_batch=8, max_wait=0.01)
+        with request_budget(5):
+            batcher.embed(["a"], "m")
+        self.assertEqual(seen, [None])
+
+    def test_caller_waits_only_for_its_own_budget(self):
+        def request(texts, model):
+            time.sleep(0.5)
+            return [_vector(t) for t in texts]
+
+        batcher = EmbeddingBatcher(request, max_batch=8, max_wait=0.01)
+        started = time.monotonic()
+        results = self._run_concurrently((batcher, ["a"], 0.1), (batcher, ["a"], None))
+        (short_result, short_error), (long_result, long_error) = results
+        self.assertIsInstance(short_error, BudgetExceededError)
+        self.assertIsNone(long_error)
+        self.assertEqual(long_result, [[1.0]])
+        self.assertLess(time.monotonic() - started, 2.0)
+
+    def test_exhausted_budget_is_rejected_before_enqueue(self):
+        calls = []
+        batcher = EmbeddingBatcher(lambda texts, model: calls.append(texts) or [], max_batch=8, max_wait=0.01)
+        with request_budget(0):
+            with self.assertRaises(BudgetExceededError):
+                batcher.embed(["a"], "m")
+        self.assertEqual(calls, [])
+
+
+COLUMNAR_ITEMS = [
+    {
+        "id": 7,
+        "title": "청년 월세 지원",
+        "search_summary": "무주택 청년 월세",
+        "summary": "",
+        "category": "주거",
+        "region_scope": "LOCAL",
+        "region_sido": "서울특별시",
+        "applicable_regions": ["서울특별시 강남구", "서울특별시"],
+        "min_age": 19,
+        "max_age": 34,
+        "policy_type": "YOUTH",
+        "employment": ["미취업자"],
+    },
+    {
+        "id": 3,
+        "title": "Job 카페",
+        "search_summary": "",
+        "summary": "취업 상담",
+        "category": "",
+        "region_scope": "NATIONWIDE",
+        "region_sido": "",
+        "applicable_regions": [],
+        "min_age": None,
+        "max_age": None,
+        "policy_type": "",
+        "employment": [],
+    },
+]
+
+
+class EmbeddingCacheTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache = EmbeddingCache(Path(tmp.name) / "embedding_cache.sqlite3", max_entries=3)
+        self.addCleanup(lambda: self.cache._conn and self.cache._conn.close())
+        # last_used가 호출마다 증가하도록
+        clock = itertools.count(1.0)
+        patcher = mock.patch(
+            "recommends.services.embedding_cache.time", SimpleNamespace(time=lambda: next(clock))
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _keys(self):
+        return set(self.cache.get_many("m", ["a", "b", "c", "d"]))
+
+    def test_evicts_least_recently_used(self):
+        self.cache.set_many("m", [("a", [1.0]), ("b", [2.0]), ("c", [3.0])])
+        self.cache.get_many("m", ["a"])
+        self.cache.set_many("m", [("d", [4.0])])
+        self.assertEqual(self._keys(), {"a", "c", "d"})
+
+    def test_model_is_part_of_key(self):
+        self.cache.set_many("m", [("a", [1.0])])
+        self.assertEqual(self.cache.get_many("other", ["a"]), {})
+        self.assertEqual(self.cache.get_many("m", ["a"]), {"a": [1.0]})
+
+    def test_hit_and_miss_counters(self):
+        self.cache.set_many("m", [("a", [1.0])])
+        self.cache.get_many("m", ["a", "b", "a"])
+        self.cache.get_many("m", ["c"])
+        self.assertEqual(self.cache.stats(), {"hits": 2, "misses": 2, "hit_rate": 0.5})
+
+    def test_embed_texts_keeps_input_order_with_mixed_hits(self):
+        self.cache.set_many("text-embedding-3-small", [("b", [2.0]), ("d", [4.0])])
+        fetch = mock.Mock(side_effect=lambda texts, model: [[float(ord(t))] for t in texts])
+        with mock.patch("recommends.services.embedding.get_embedding_cache", return_value=self.cache), mock.patch(
+            "recommends.services.embedding._fetch_embeddings", fetch
+        ), override_settings(AI_BACKEND="gms"):
+            vectors = embed_texts(["a", "b", "c", "a", "d"])
+        # 캐시 미스만 중복 없이 한 번 요청
+        fetch.assert_called_once_with(["a", "c"], "text-embedding-3-small")
+        self.assertEqual(vectors, [[97.0], [2.0], [99.0], [97.0], [4.0]])
+        self.assertEqual(self.cache.get_many("text-embedding-3-small", ["a", "c"]), {"a": [97.0], "c": [99.0]})
+
+
+class ColumnarIndexTests(SimpleTestCase):
+    def _open(self, items):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = columnar_path(Path(tmp.name) / "custom_index.json")
+        self.assertEqual(path.name, "custom_index.bin")
+        path.write_bytes(encode_columnar(items, "v1", "c1"))
+        return ColumnarIndex(path)
+
+    def test_round_trip_preserves_records(self):
+        index = self._open(COLUMNAR_ITEMS)
+        self.assertEqual((index.version, index.catalog, len(index)), ("v1", "c1", 2))
+        self.assertEqual([dict(record) for record in index], COLUMNAR_ITEMS)
+        self.assertEqual(index.ids.tolist(), [7, 3])
+
+    def test_persisted_keyword_postings_match_substring_scan(self):
+        index = self._open(COLUMNAR_ITEMS)
+        keywords = policy_index.KeywordIndex(index)
+        texts = [
+            " ".join(item[f] for f in ("title", "search_summary", "summary", "category")).lower()
+            for item in COLUMNAR_ITEMS
+        ]
+        for term in ["청년", "월세", "청", "job", "JOB", "취업 상담", "세 지", "없음", "주거"]:
+            with self.subTest(term=term):
+                expected = {pos for pos, text in enumerate(texts) if term.lower() in text}
+                self.assertEqual(keywords.match(term), expected)
+
+    def test_empty_index(self):
+        index = self._open([])
+        self.assertEqual(len(index), 0)
+        self.assertEqual(policy_index.KeywordIndex(index).match("청년"), set())
+        self.assertEqual(policy_index.FacetIndex(index).region(["서울"]).tolist(), [])
+
+
+class InstrumentationTests(SimpleTestCase):
+    def setUp(self):
+        reset_stats()
+        self.addCleanup(reset_stats)
+
+    def test_parse_outcome_is_recorded_with_the_call(self):
+        reply = {"choices": [{"message": {"content": "[]"}}], "usage": {"total_tokens": 7}}
+        with mock.patch.object(gms_client, "_post_json", return_value=reply):
+            self.assertEqual(chat_completion([], site="query_reasons", parse=json.loads), [])
+            with self.assertRaises(gms_client.ResponseParseError):
+                chat_completion([], site="query_reasons", parse=reasons_parser([1], 80))
+        with mock.patch.object(gms_client, "_apost_json", mock.AsyncMock(return_value={"choices": []})):
+            with self.assertRaises(gms_client.ResponseParseError):
+                asyncio.run(achat_completion([], site="query_reasons"))
+
+        stats = call_stats()["query_reasons"]
+        self.assertEqual(stats["calls"], 3)
+        self.assertEqual(stats["outcomes"], {"ok": 1, "parse_failure": 2})
+        # 해석에 실패한 호출도 토큰 사용량은 집계
+        self.assertEqual(stats["tokens"]["total"], 14)
+
+    def test_failed_reasons_fall_back_after_one_recorded_call(self):
+        reply = {"choices": [{"message": {"content": "이유를 만들 수 없습니다"}}]}
+        with mock.patch.object(gms_client, "_post_json", return_value=reply):
+            self.assertEqual(build_profile_reasons_ai([SimpleNamespace(id=1, title="정책")], None), {})
+        self.assertEqual(call_stats()["profile_reasons"]["outcomes"], {"parse_failure": 1})
+
+
+class ParseReasonsTests(SimpleTestCase):
+    def test_drops_unknown_duplicate_and_empty_entries(self):
+        text = json.dumps(
+            [
+                {"id": 1, "reason": "첫 번째"},
+                {"id": 99, "reason": "요청하지 않은 정책"},
+                {"id": "1", "reason": "중복"},
+                {"id": 2, "reason": "  "},
+                {"id": "x", "reason": "잘못된 id"},
+                "not an object",
+                {"id": 3, "reason": "아주 긴 이유입니다"},
+            ],
+            ensure_ascii=False,
+        )
+        self.assertEqual(parse_reasons(text, [1, 2, 3], max_len=5), {1: "첫 번째", 3: "아주 긴 "})
+
+    def test_extracts_list_from_surrounding_text(self):
+        text = '결과입니다:\n```json\n[{"id": 2, "reason": "이유"}]\n```'
+        self.assertEqual(parse_reasons(text, [2], max_len=80), {2: "이유"})
+        self.assertEqual(parse_reasons("이유를 만들 수 없습니다", [2], max_len=80), {})
+        self.assertEqual(parse_reasons('{"id": 2, "reason": "이유"}', [2], max_len=80), {})
+
+    def test_missing_policies_fall_back_to_rule_reason(self):
+        policies = [SimpleNamespace(id=pid, title=f"정책 {pid}", category="주거", summary="") for pid in (1, 2)]
+        text = json.dumps([{"id": 1, "reason": "AI 이유"}, {"id": 3, "reason": "다른 정책"}], ensure_ascii=False)
+        reply = {"choices": [{"message": {"content": text}}]}
+        with mock.patch.object(gms_client, "_post_json", return_value=reply):
+            ai_reasons = build_profile_reasons_ai(policies, SimpleNamespace(region="서울", interest="주거"))
+        self.assertEqual(ai_reasons, {1: "AI 이유"})
+
+        top = [(policy, 1.0, ["주거 관심사와 일치", f"규칙 {policy.id}"]) for policy in policies]
+        results = _build_results(top, ai_reasons, {})
+        self.assertEqual([r["reason"] for r in results], ["AI 이유", "주거 관심사와 일치 규칙 2"])
+
+
+class ReasonCacheTests(SimpleTestCase):
+    def setUp(self):
+        reason_cache._PROFILE_REASONS.clear()
+        self.addCleanup(reason_cache._PROFILE_REASONS.clear)
+        self.policy = SimpleNamespace(id=1, title="청년 월세 지원", summary="월세 지원", region_scope="LOCAL")
+        self.profile = SimpleNamespace(interest="주거", region="서울", age=25)
+
+    def _cached(self, policy, profile):
+        cached, missing = reason_cache.get_cached_profile_reasons([policy], profile)
+        self.assertEqual(bool(cached), not missing)
+        return cached.get(policy.id)
+
+    def test_same_content_and_signature_hits(self):
+        reason_cache.store_profile_reasons([self.policy], self.profile, {1: "이유"})
+        # 관심/지역만 같으면 다른 사용자와도 공유
+        other_user = SimpleNamespace(interest=" 주거 ", region="서울", age=40)
+        self.assertEqual(self._cached(SimpleNamespace(**vars(self.policy)), other_user), "이유")
+
+    def test_policy_content_change_misses(self):
+        reason_cache.store_profile_reasons([self.policy], self.profile, {1: "이유"})
+        for field, value in [("title", "청년 월세 특별 지원"), ("summary", "월세 최대 20만원")]:
+            with self.subTest(field=field):
+                changed = SimpleNamespace(**dict(vars(self.policy), **{field: value}))
+                self.assertIsNone(self._cached(changed, self.profile))
+
+    def test_interest_or_region_change_misses(self):
+        reason_cache.store_profile_reasons([self.policy], self.profile, {1: "이유"})
+        for profile in (
+            SimpleNamespace(interest="일자리", region="서울"),
+            SimpleNamespace(interest="주거", region="부산"),
+        ):
+            with self.subTest(profile=profile):
+                self.assertIsNone(self._cached(self.policy, profile))
+
+    def test_rule_fallback_is_not_stored(self):
+        reason_cache.store_profile_reasons([self.policy], self.profile, {})
+        self.assertIsNone(self._cached(self.policy, self.profile))
+
+
+class QueryNormalizeCacheTests(SimpleTestCase):
+    def setUp(self):
+        for cache in (query_normalize_ai._EXACT_CACHE, query_normalize_ai._NORMALIZED_CACHE):
+            cache.clear()
+            self.addCleanup(cache.clear)
+        self.llm = mock.Mock(return_value=({"intent": "월세 지원", "keywords": ["월세"]}, True))
+        patcher = mock.patch.object(query_normalize_ai, "_normalize_with_llm", self.llm)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _exact(self, query):
+        return query_normalize_ai._EXACT_CACHE.get(query)
+
+    def test_miss_fills_both_levels(self):
+        result = query_normalize_ai.normalize_query_llm("청년 월세 지원")
+        self.assertEqual(result, {"intent": "월세 지원", "keywords": ["월세"]})
+        self.assertEqual(self._exact("청년 월세 지원"), result)
+        self.assertEqual(query_normalize_ai._NORMALIZED_CACHE.get("청년 월세"), result)
+
+    def test_normalized_hit_fills_exact_level_without_llm(self):
+        query_normalize_ai.normalize_query_llm("청년 월세 지원")
+        self.assertIsNone(self._exact("청년  월세 지원!!"))
+        result = query_normalize_ai.normalize_query_llm("청년  월세 지원!!")
+        self.assertEqual(result["intent"], "월세 지원")
+        self.assertEqual(self.llm.call_count, 1)
+        self.assertIsNotNone(self._exact("청년  월세 지원!!"))
+
+        # 원문 캐시에 있으면 정규화 키를 계산하지 않는다
+        with mock.patch.object(query_normalize_ai, "normalize_query", side_effect=AssertionError("L2 lookup")):
+            self.assertEqual(query_normalize_ai.normalize_query_llm("청년  월세 지원!!"), result)
+
+    def test_cached_result_is_copied(self):
+        query_normalize_ai.normalize_query_llm("청년 월세 지원")["keywords"].append("변경")
+        self.assertEqual(query_normalize_ai.normalize_query_llm("청년 월세 지원")["keywords"], ["월세"])
+
+    def test_rule_fallback_is_not_cached(self):
+        self.llm.return_value = ({"intent": "청년 월세 지원", "keywords": []}, False)
+        query_normalize_ai.normalize_query_llm("청년 월세 지원")
+        query_normalize_ai.normalize_query_llm("청년 월세 지원")
+        self.assertEqual(self.llm.call_count, 2)
+        self.assertIsNone(self._exact("청년 월세 지원"))
+
+
+class AsyncClientScopeTests(SimpleTestCase):
+    def test_nested_scopes_share_one_client_and_close_it(self):
+        async def run():
+            async with async_client_scope() as outer:
+                tasks = [asyncio.ensure_future(_current_client()) for _ in range(2)]
+                async with async_client_scope() as inner:
+                    self.assertIs(inner, outer)
+                self.assertEqual(await asyncio.gather(*tasks), [outer, outer])
+                self.assertFalse(outer.is_closed)
+            return outer
+
+        self.assertTrue(asyncio.run(run()).is_closed)
+
+
+async def _current_client():
+    async with async_client_scope() as client:
+        return client
+
+
+class QueryNormalizePoolTests(SimpleTestCase):
+    def test_normalization_runs_while_reason_pool_is_saturated(self):
+        release = threading.Event()
+        blockers = [
+            concurrency.submit(release.wait, 5) for _ in range(concurrency.get_executor()._max_workers)
+        ]
+        threads = []
+        normalized = threading.Event()
+
+        def normalize(query):
+            threads.append(threading.current_thread().name)
+            normalized.set()
+            return {"intent": query, "keywords": []}
+
+        snapshot = SimpleNamespace(items=[])
+        try:
+            with mock.patch("recommends.query_engine.normalize_query_llm", side_effect=normalize), mock.patch(
+                "recommends.query_engine.load_snapshot", return_value=snapshot
+            ):
+                self.assertEqual(rank_query("월세"), [])
+            self.assertTrue(normalized.wait(1))
+        finally:
+            release.set()
+            for blocker in blockers:
+                blocker.result(5)
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads[0].startswith("query-normalize"))
+
+
+class WorkBudgetTests(SimpleTestCase):
+    def test_only_time_inside_steps_is_charged(self):
+        budget = WorkBudget(1.0)
+        with budget.step():
+            self.assertIsNotNone(remaining_budget())
+            time.sleep(0.05)
+        self.assertIsNone(remaining_budget())
+        time.sleep(0.2)
+        self.assertGreater(budget.remaining, 0.9)
+        self.assertLess(budget.remaining, 0.96)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker("chat", failure_threshold=3, slow_call=5.0, reset_timeout=30.0)
+        for target in ("recommends.services.circuit_breaker.time", "recommends.services.gms_client.time"):
+            patcher = mock.patch(target, self.clock)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch("recommends.services.gms_client.get_breaker", return_value=self.breaker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _call(self, exc=None, latency=0.1):
+        breaker = gms_client._acquire("chat")
+        started = self.clock.now
+        self.clock.now += latency
+        gms_client._settle(breaker, started, exc)
+
+    def _open(self):
+        for _ in range(3):
+            self._call(requests.ConnectionError())
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_opens_after_failure_threshold(self):
+        self._call(requests.ConnectionError())
+        self._call(requests.ConnectionError())
+        self.assertEqual((self.breaker.state, self.breaker.failures), (CLOSED, 2))
+        # 느린 성공도 실패로 센다
+        self._call(latency=5.0)
+        self.assertEqual(self.breaker.state, OPEN)
+        with self.assertRaises(CircuitOpenError):
+            gms_client._acquire("chat")
+        self.assertEqual(self.breaker.rejected, 1)
+
+    def test_success_resets_failure_count(self):
+        self._call(requests.ConnectionError())
+        self._call(requests.ConnectionError())
+        self._call()
+        self._call(requests.ConnectionError())
+        self.assertEqual((self.breaker.state, self.breaker.failures), (CLOSED, 1))
+
+    def test_cooldown_then_single_half_open_trial_closes(self):
+        self._open()
+        self.clock.now = self.breaker.opened_at + 29.9
+        self.assertFalse(self.breaker.available())
+        self.clock.now = self.breaker.opened_at + 30
+        self.assertTrue(self.breaker.available())
+
+        trial = gms_client._acquire("chat")
+        self.assertEqual(trial.state, HALF_OPEN)
+        self.assertFalse(self.breaker.available())
+        with self.assertRaises(CircuitOpenError):
+            gms_client._acquire("chat")
+        gms_client._settle(trial, self.clock.now)
+        self.assertEqual((self.breaker.state, self.breaker.failures), (CLOSED, 0))
+        gms_client._acquire("chat")
+
+    def test_failed_trial_reopens_for_another_cooldown(self):
+        self._open()
+        self.clock.now = self.breaker.opened_at + 30
+        self._call(requests.ConnectionError())
+        self.assertEqual(self.breaker.state, OPEN)
+        self.clock.now = self.breaker.opened_at + 29
+        with self.assertRaises(CircuitOpenError):
+            gms_client._acquire("chat")
+        self.clock.now = self.breaker.opened_at + 30
+        self._call()
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_trial_slot_returned_when_budget_ends_the_call(self):
+        self._open()
+        self.clock.now = self.breaker.opened_at + 30
+        self._call(BudgetExceededError("budget"))
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        # 업스트림 탓이 아니므로 다음 시험 호출이 가능하다
+        self._call()
+        self.assertEqual(self.breaker.state, CLOSED)
+
+
+def _response(status, body=None):
+    resp = requests.Response()
+    resp.status_code = status
+    resp._content = json.dumps(body or {}).encode("utf-8")
+    return resp
+
+
+class FakeSession:
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.timeouts = []
+
+    def post(self, url, timeout=None, **kwargs):
+        self.timeouts.append(timeout)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@override_settings(AI_BACKEND="gms", GMS_MAX_RETRIES=2, GMS_CONNECT_TIMEOUT=3.0, GMS_CHAT_TIMEOUT=30)
+class GmsClientRetryTests(SimpleTestCase):
+    def setUp(self):
+        reset_stats()
+        self.addCleanup(reset_stats)
+        self.breaker = CircuitBreaker("chat", failure_threshold=100, slow_call=60.0, reset_timeout=30.0)
+        for patcher in (
+            mock.patch.object(gms_client, "get_breaker", return_value=self.breaker),
+            mock.patch.object(gms_client, "_backoff", return_value=0),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _post(self, outcomes):
+        session = FakeSession(outcomes)
+        with mock.patch.object(gms_client, "get_session", return_value=session):
+            try:
+                return gms_client.post_json("chat", {"model": "m"}, api_key="k"), session
+            finally:
+                self.assertEqual(session.outcomes, [])
+
+    def _apost(self, outcomes):
+        timeouts = []
+        outcomes = list(outcomes)
+
+        def handler(request):
+            timeouts.append(request.extensions["timeout"])
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return httpx.Response(outcome, json={"status": outcome})
+
+        async def run():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+                token = gms_client._ASYNC_CLIENT.set(client)
+                try:
+                    return await gms_client.apost_json("chat", {"model": "m"}, api_key="k")
+                finally:
+                    gms_client._ASYNC_CLIENT.reset(token)
+
+        try:
+            return asyncio.run(run()), timeouts
+        finally:
+            self.assertEqual(outcomes, [])
+
+    def test_retries_rate_limit_server_error_and_connection_error(self):
+        data, session = self._post(
+            [_response(429), requests.ConnectionError("reset"), _response(200, {"ok": True})]
+        )
+        self.assertEqual(data, {"ok": True})
+        self.assertEqual(len(session.timeouts), 3)
+
+        data, timeouts = self._apost([503, httpx.ConnectError("reset"), 200])
+        self.assertEqual(data, {"status": 200})
+        self.assertEqual(len(timeouts), 3)
+
+    def test_gives_up_after_max_retries(self):
+        with self.assertRaises(requests.HTTPError) as ctx:
+            self._post([_response(500)] * 3)
+        self.assertEqual(ctx.exception.response.status_code, 500)
+        with self.assertRaises(requests.ConnectionError):
+            self._post([requests.ConnectionError("down")] * 3)
+
+        with self.assertRaises(httpx.HTTPStatusError):
+            self._apost([502] * 3)
+        with self.assertRaises(httpx.ConnectError):
+            self._apost([httpx.ConnectError("down")] * 3)
+        self.assertEqual(call_stats()["chat"]["outcomes"], {"http_error": 2, "connection_error": 2})
+
+    def test_other_client_errors_are_not_retried(self):
+        with self.assertRaises(requests.HTTPError):
+            self._post([_response(400)])
+        with self.assertRaises(httpx.HTTPStatusError):
+            self._apost([404])
+        # 업스트림은 정상 응답한 것으로 보고 서킷에 실패로 남기지 않는다
+        self.assertEqual(self.breaker.failures, 0)
+
+    def test_timeouts_are_trimmed_to_remaining_budget(self):
+        _, session = self._post([_response(200)])
+        self.assertEqual(session.timeouts, [(3.0, 30)])
+
+        with request_budget(2.0):
+            _, session = self._post([_response(200)])
+        connect, read = session.timeouts[0]
+        self.assertLessEqual(connect, 2.0)
+        self.assertLessEqual(read, 2.0)
+        self.assertGreater(read, 1.0)
+
+        # 비동기 호출도 같은 예산 컨텍스트를 이어받는다
+        with request_budget(2.0):
+            _, timeouts = self._apost([200])
+        self.assertLessEqual(timeouts[0]["read"], 2.0)
+        self.assertLessEqual(timeouts[0]["connect"], 2.0)
+
+    def test_exhausted_budget_skips_the_call(self):
+        with request_budget(0), self.assertRaises(BudgetExceededError):
+            self._post([])
+
+
+TOP_ITEMS = [
+    {"id": 1, "title": "청년 월세 지원", "category": "주거", "summary": "월세 지원"},
+    {"id": 2, "title": "청년 취업 지원", "category": "일자리", "summary": "취업 지원"},
+]
+
+
+@mock.patch("recommends.views.get_query_results", return_value=None)
+@mock.patch("recommends.views.set_query_results")
+class QueryStreamTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="stream", password="pw")
+
+    def _events(self):
+        request = APIRequestFactory().post("/bluebridge/recommend/detail/stream/", {"query": "월세"}, format="json")
+        force_authenticate(request, user=self.user)
+        response = recommend_detail_stream(request)
+        body = b"".join(response.streaming_content).decode("utf-8")
+        return [json.loads(line) for line in body.splitlines()]
+
+    @mock.patch("recommends.views.rank_query", return_value=TOP_ITEMS)
+    @mock.patch("recommends.query_engine.build_query_reason_ai", side_effect=AssertionError("per-policy call"))
+    @mock.patch("recommends.query_engine.build_query_reasons_ai", return_value={1: "배치 이유"})
+    def test_reasons_use_one_batched_call_by_default(self, batched, per_policy, rank, *_):
+        events = self._events()
+        self.assertEqual([e["event"] for e in events], ["results", "reason", "reason", "done"])
+        self.assertEqual(batched.call_count, 1)
+        self.assertEqual(events[1], {"event": "reason", "policy_id": 1, "reason": "배치 이유"})
+        # 배치 결과에 없는 정책은 규칙 기반 이유
+        self.assertTrue(events[2]["reason"])
+
+    @mock.patch("recommends.views.rank_query", side_effect=RuntimeError("index broken"))
+    def test_failure_after_stream_start_emits_error_event(self, *_):
+        with self.assertLogs("recommends.views", level="ERROR"):
+            events = self._events()
+        self.assertEqual([e["event"] for e in events], ["error"])
+
+    def test_async_iterator_wraps_sync_events(self, *_):
+        async def collect():
+            return [event async for event in _aiter_events(e for e in ["a", "b"])]
+
+        self.assertEqual(asyncio.run(collect()), ["a", "b"])
+
+
+class FakeCollection:
+    def __init__(self):
+        self.rows = {}
+        self.upserts = []
+
+    def upsert(self, ids, embeddings, metadatas):
+        self.upserts.append(list(ids))
+        self.rows.update(zip(ids, embeddings))
+
+    def get(self, include=None):
+        return {"ids": list(self.rows)}
+
+    def delete(self, ids):
+        for pid in ids:
+            self.rows.pop(pid, None)
+
+
+def _fake_embed(texts):
+    return [[float(len(text)), 1.0] for text in texts]
+
+
+class BuildPolicyIndexEmbeddingTests(TestCase):
+    def setUp(self):
+        data_dir = isolate_data_dir(self)
+        self.path = data_dir / "policy_index.json"
+        self.collection = FakeCollection()
+        (data_dir / "chroma").mkdir()
+        for target in (
+            "recommends.services.vector_store.get_collection",
+            "recommends.management.commands.build_policy_index.get_collection",
+        ):
+            patcher = mock.patch(target, return_value=self.collection)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.policies = [
+            Policy.objects.create(source="test", source_id=str(i), title=f"정책 {i}", summary=f"요약 {i}", raw={})
+            for i in range(3)
+        ]
+
+    def _build(self, embed=_fake_embed):
+        with mock.patch("recommends.management.commands.build_policy_index.embed_texts", side_effect=embed):
+            call_command("build_policy_index", "--output", str(self.path), stdout=StringIO())
+        items, version, _ = policy_index.read_index_file(self.path)
+        return items, version
+
+    def test_incremental_rebuild_syncs_only_changed_policies(self):
+        _, version = self._build()
+        self.assertEqual(store_version(), version)
+        self.assertEqual(sorted(self.collection.rows), sorted(str(p.id) for p in self.policies))
+
+        self.policies[0].summary = "바뀐 요약입니다"
+        self.policies[0].save()
+        self.policies[2].delete()
+        self.collection.upserts.clear()
+        items, version = self._build()
+        self.assertEqual(self.collection.upserts, [[str(self.policies[0].id)]])
+        self.assertEqual(sorted(self.collection.rows), sorted(str(p.id) for p in self.policies[:2]))
+        matrix = policy_index.read_index_embeddings(self.path, [i["id"] for i in items])
+        row = [i["id"] for i in items].index(self.policies[0].id)
+        self.assertEqual(self.collection.rows[str(self.policies[0].id)], matrix[row].tolist())
+        self.assertEqual(store_version(), version)
+
+    def test_failed_reembedding_drops_stale_vectors(self):
+        self._build()
+        self.policies[0].summary = "바뀐 요약입니다"
+        self.policies[0].save()
+        items, version = self._build(embed=mock.Mock(side_effect=RuntimeError("upstream down")))
+
+        self.assertEqual(next(i for i in items if i["id"] == self.policies[0].id)["summary"], "바뀐 요약입니다")
+        self.assertTrue(all(not path.exists() for path in policy_index.embedding_paths(self.path)))
+        self.assertIsNone(policy_index.read_index_embeddings(self.path, [i["id"] for i in items]))
+        self.assertIsNone(store_version())
+
+        # 다음 재생성에서 임베딩과 벡터 스토어가 모두 복구된다
+        items, version = self._build()
+        self.assertIsNotNone(policy_index.read_index_embeddings(self.path, [i["id"] for i in items]))
+        self.assertEqual(store_version(), version)
+
+
+# 질의 벡터 [1, 0]과의 코사인 유사도
+QUERY_SIMILARITY = [1.0, 0.95, 0.9, 0.89, 0.5]
+
+
+def _similarity_embed(texts):
+    vectors = []
+    for text in texts:
+        sim = next((s for i, s in enumerate(QUERY_SIMILARITY) if f"요약 {i}" in text), 1.0)
+        vectors.append([sim, (1 - sim**2) ** 0.5])
+    return vectors
+
+
+class QueryRecommendEmbeddingRankTests(TestCase):
+    def setUp(self):
+        path = isolate_data_dir(self) / "policy_index.json"
+        self.policies = [
+            Policy.objects.create(
+                source="test",
+                source_id=str(i),
+                title=f"정책 {i}",
+                summary=f"요약 {i}" + (" 월세 지원" if i == 3 else ""),
+                raw={},
+            )
+            for i in range(len(QUERY_SIMILARITY))
+        ]
+        with mock.patch("recommends.management.commands.build_policy_index.embed_texts", _similarity_embed):
+            call_command("build_policy_index", "--output", str(path), stdout=StringIO())
+        self.snapshot = policy_index._read_snapshot(path)
+        self.assertIsNotNone(self.snapshot.embeddings)
+
+    def test_ranks_by_matrix_similarity_with_keyword_bonus(self):
+        with mock.patch("recommends.query_engine.load_snapshot", return_value=self.snapshot), mock.patch(
+            "recommends.query_engine.normalize_query_llm", return_value={"intent": "월세", "keywords": []}
+        ), mock.patch("recommends.query_engine.embed_texts", return_value=[[2.0, 0.0]]), mock.patch(
+            "recommends.query_engine.build_query_reasons_ai", return_value={}
+        ):
+            results = query_recommend("월세")
+        # 정책 3은 유사도가 정책 2보다 낮지만 키워드 매칭 가산점으로 앞선다. 정책 4는 top4 밖
+        expected = [self.policies[i].id for i in (0, 1, 3, 2)]
+        self.assertEqual([r["policy_id"] for r in results], expected)
+        self.assertTrue(all(r["reason"] for r in results))
+
+
+class VectorStoreClientTests(TestCase):
+    def setUp(self):
+        self.data_dir = isolate_data_dir(self)
+        Policy.objects.create(source="test", source_id="1", title="정책 1", raw={})
+        patcher = mock.patch(
+            "recommends.services.vector_store._get_client", side_effect=AssertionError("chromadb client opened")
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_build_without_vectors_does_not_open_client(self):
+        path = self.data_dir / "policy_index.json"
+        failing = mock.Mock(side_effect=RuntimeError("upstream down"))
+        with mock.patch("recommends.management.commands.build_policy_index.embed_texts", failing):
+            call_command("build_policy_index", "--output", str(path), stdout=StringIO())
+        Policy.objects.create(source="test", source_id="2", title="정책 2", raw={})
+        call_command("build_policy_index", "--output", str(path), "--skip-embeddings", stdout=StringIO())
+        self.assertEqual(len(policy_index.read_index_file(path)[0]), 2)
+        self.assertFalse((self.data_dir / "chroma").exists())
+
+    def test_query_without_store_directory_skips_client(self):
+        self.assertIsNone(query_similar([1.0, 0.0], 5))
+        self.assertFalse((self.data_dir / "chroma").exists())
+
+
+class EligibilityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_policies()
+
+    def test_row_checks_match_full_mask_without_building_it(self):
+        snapshot = build_snapshot(self)
+        rows = list(range(0, len(snapshot.items), 7))[:20]
+        for age, region_terms in itertools.product([None, 20, 40], [set(), {"서울"}, {"수원", "부산"}]):
+            with self.subTest(age=age, region_terms=region_terms):
+                eligible = _Eligibility(snapshot, age, region_terms)
+                passed = eligible.check(rows)
+                self.assertIsNone(eligible._mask)
+                expected = _Eligibility(snapshot, age, region_terms).mask()[rows]
+                self.assertEqual(passed.tolist(), expected.tolist())
+
+
+class ProfileCandidateFacetParityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_policies()
+
+    def setUp(self):
+        self.snapshot = build_snapshot(self)
+
+    def _candidate_ids(self, profile, facets):
+        with mock.patch("recommends.services.profile_candidates.load_facets", return_value=facets), mock.patch(
+            "recommends.services.profile_candidates.MAX_ID_FILTER", 10_000
+        ):
+            return sorted(get_profile_candidates(profile).values_list("id", flat=True))
+
+    def test_facet_candidates_match_sql_filters(self):
+        profiles = itertools.product(
+            [None, "서울특별시", "서울", "경기도", "수원", "부산광역시"],
+            [None, 18, 30, 40],
+            [None, "미취업자", "재직", "학생"],
+        )
+        for region, age, employment_status in profiles:
+            profile = SimpleNamespace(region=region, age=age, employment_status=employment_status)
+            with self.subTest(region=region, age=age, employment_status=employment_status):
+                self.assertEqual(
+                    self._candidate_ids(profile, self.snapshot.facets), self._candidate_ids(profile, None)
+                )
+
+    @override_settings(POLICY_CATALOG_CHECK_INTERVAL=0)
+    def test_stale_index_falls_back_to_db(self):
+        with mock.patch.object(policy_index, "load_snapshot", return_value=self.snapshot):
+            self.assertIs(policy_index.load_facets(), self.snapshot.facets)
+            Policy.objects.create(source="test", source_id="new", title="새 정책", raw={})
+            self.assertIsNone(policy_index.load_facets())
+
+            new_id = Policy.objects.get(source_id="new").id
+            profile = SimpleNamespace(region=None, age=None, employment_status=None)
+            self.assertIn(new_id, get_profile_candidates(profile).values_list("id", flat=True))
@@ -5,4 +5,8 @@ from . import views
 urlpatterns = [
     path("", views.recommend_list, name="recommend-list"),
     path("detail/", views.recommend_detail, name="recommend-detail"),
+    path("detail/stream/", views.recommend_detail_stream, name="recommend-detail-stream"),
+    path("metrics/", views.recommend_metrics, name="recommend-metrics"),
+    path("async/", views.recommend_list_async, name="recommend-list-async"),
+    path("detail/async/", views.recommend_detail_async, name="recommend-detail-async"),
 ]
@@ -1,56 +1,64 @@
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import JWTAuthentication
 
 from profiles.models import Profile
 from .models import RecommendationLog
-from .profile_engine import profile_recommend
-from .query_engine import query_recommend
-
-QUERY_EXAMPLES = [
-    "분야:창업 | 대상:청년 | 혜택:장비 구입비 지원",
-    "분야:교육 | 대상:대학원생 | 혜택:등록금·장학금",
-    "분야:주거 | 대상:청년 | 혜택:전세/월세 대출·이자지원",
-    "분야:보건 | 대상:저소득 | 혜택:의료비/건강검진 바우처",
-    "분야:취업 | 대상:군 전역 예정자 | 혜택:직업훈련 바우처",
-]
-
-
-def _profile_snapshot(profile: Profile) -> dict:
-    """추천 로그에 남길 주요 프로필 스냅샷."""
-    if not profile:
-        return {}
-    return {
-        "age": profile.age,
-        "region": profile.region,
-        "gender": profile.gender,
-        "employment_status": profile.employment_status,
-        "education_level": profile.education_level,
-        "income_quintile": profile.income_quintile,
-        "major": profile.major,
-        "interest": profile.interest,
-        "special_targets": profile.special_targets,
-    }
+from .profile_engine import aprofile_recommend, profile_recommend
+from .query_engine import aquery_recommend, iter_query_reasons, query_cards, query_recommend, rank_query
+from .reason.reason_cache import profile_reason_cache_stats
+from .services.budget import WorkBudget
+from .services.circuit_breaker import breaker_stats
+from .services.embedding_batcher import embedding_batcher_stats
+from .services.embedding_cache import get_embedding_cache
+from .services.instrumentation import call_stats
+from .services.query_normalize_ai import QUERY_EXAMPLES, query_cache_stats
+from .services.result_cache import (
+    get_profile_results,
+    get_query_results,
+    profile_snapshot as _profile_snapshot,
+    set_profile_results,
+    set_query_results,
+)
+from .services.timing import stage, with_server_timing
+from .streaming import EventStreamRenderer, NDJSONRenderer, encode_event
 
+logger = logging.getLogger(__name__)
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@with_server_timing
 def recommend_list(request):
     """
     GET /bluebridge/recommend/
     프로필 기반 맞춤 추천 (DB + 점수 기반).
     """
-    profile, _ = Profile.objects.get_or_create(user=request.user)
-    recommended = profile_recommend(user=request.user)
+    with stage("cache"):
+        profile, _ = Profile.objects.get_or_create(user=request.user)
+        snapshot = _profile_snapshot(profile)
+        recommended = get_profile_results(snapshot)
+    if recommended is None:
+        recommended = profile_recommend(user=request.user)
+        set_profile_results(snapshot, recommended)
     recommended_ids = [item["policy_id"] for item in recommended]
 
-    RecommendationLog.objects.create(
-        user=request.user,
-        query=None,
-        profile_snapshot=_profile_snapshot(profile),
-        recommended_policy_ids=recommended_ids,
-        ux_scores={},
-    )
+    # 캐시 적중 시에도 로그는 남긴다
+    with stage("log"):
+        RecommendationLog.objects.create(
+            user=request.user,
+            query=None,
+            profile_snapshot=snapshot,
+            recommended_policy_ids=recommended_ids,
+            ux_scores={},
+        )
 
     return Response(
         {
@@ -62,6 +70,7 @@ def recommend_list(request):
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
+@with_server_timing
 def recommend_detail(request):
     """
     POST /bluebridge/recommend/detail
@@ -72,18 +81,241 @@ def recommend_detail(request):
     if not query:
         return Response({"detail": "query 필드가 비어있습니다"}, status=400)
 
-    results = query_recommend(query=query, user=request.user)
+    with stage("cache"):
+        snapshot = _profile_snapshot(getattr(request.user, "profile", None))
+        results = get_query_results(query, snapshot.get("age"))
+    if results is None:
+        results = query_recommend(query=query, user=request.user)
+        set_query_results(query, snapshot.get("age"), results)
     recommended_ids = [item["policy_id"] for item in results]
 
-    RecommendationLog.objects.create(
-        user=request.user,
-        query=query,
-        profile_snapshot=_profile_snapshot(getattr(request.user, "profile", None)),
-        recommended_policy_ids=recommended_ids,
-        ux_scores={},
+    # 캐시 적중 시에도 로그는 남긴다
+    with stage("log"):
+        RecommendationLog.objects.create(
+            user=request.user,
+            query=query,
+            profile_snapshot=snapshot,
+            recommended_policy_ids=recommended_ids,
+            ux_scores={},
+        )
+
+    return Response(
+        {
+            "type": "query",
+            "query": query,
+            "results": results,
+            "query_examples": QUERY_EXAMPLES,
+        }
     )
 
+
+def _stream_query(query: str, user, snapshot: dict, fmt: str):
+    """
+    results(이유 없는 카드) → reason(정책별) → done 이벤트를 차례로 생성.
+    요청 예산은 이벤트를 만드는 작업 시간에만 적용하고 (클라이언트가 읽는 속도와 무관),
+    스트림 시작 후 실패하면 응답을 그냥 끊지 않고 error 이벤트로 끝낸다.
+    """
+    budget = WorkBudget()
+    try:
+        with budget.step():
+            results = get_query_results(query, snapshot.get("age"))
+            top_items = None
+            if results is None:
+                top_items = rank_query(query, user)
+                results = query_cards(top_items)
+        yield encode_event("results", {"type": "query", "query": query, "results": results}, fmt)
+
+        if top_items is not None:
+            cards = {card["policy_id"]: card for card in results}
+            reasons = iter_query_reasons(top_items, query)
+            while True:
+                with budget.step():
+                    reason = next(reasons, None)
+                if reason is None:
+                    break
+                policy_id, text = reason
+                cards[policy_id]["reason"] = text
+                yield encode_event("reason", {"policy_id": policy_id, "reason": text}, fmt)
+            set_query_results(query, snapshot.get("age"), results)
+
+        with budget.step():
+            log = RecommendationLog.objects.create(
+                user=user,
+                query=query,
+                profile_snapshot=snapshot,
+                recommended_policy_ids=[item["policy_id"] for item in results],
+                ux_scores={},
+            )
+        yield encode_event("done", {"query_examples": QUERY_EXAMPLES, "log_id": log.id}, fmt)
+    except Exception:
+        logger.exception("query recommendation stream failed")
+        yield encode_event("error", {"detail": "추천 생성 중 오류가 발생했습니다"}, fmt)
+
+
+async def _aiter_events(events):
+    """
+    ASGI용: 동기 이벤트 생성기를 async iterator로 감싼다 (Django 4.2는 ASGI에서 동기 iterator 스트리밍 응답을
+    끝까지 모은 뒤 보낸다). 다음 이벤트 계산(랭킹/LLM/DB)은 sync 스레드에서 실행.
+    """
+    try:
+        while True:
+            event = await sync_to_async(next)(events, None)
+            if event is None:
+                return
+            yield event
+    finally:
+        await sync_to_async(events.close)()
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+@renderer_classes([NDJSONRenderer, EventStreamRenderer])
+def recommend_detail_stream(request):
+    """
+    POST /bluebridge/recommend/detail/stream/
+    질의 기반 추천 스트리밍 (기본 NDJSON, Accept: text/event-stream이면 SSE).
+    랭킹이 끝나면 카드를 먼저 보내고, 이유는 정책별로 완료되는 대로 보낸다.
+    body: { "query": "..." }
+    """
+    query = request.data.get("query")
+    if not query:
+        return Response({"detail": "query 필드가 비어있습니다"}, status=400)
+
+    renderer = request.accepted_renderer
+    snapshot = _profile_snapshot(getattr(request.user, "profile", None))
+    events = _stream_query(query, request.user, snapshot, renderer.format)
+    if isinstance(request._request, ASGIRequest):
+        events = _aiter_events(events)
+    response = StreamingHttpResponse(
+        events,
+        content_type=f"{renderer.media_type}; charset={renderer.charset}",
+    )
+    response["Cache-Control"] = "no-cache"
+    # 프록시(nginx) 버퍼링 비활성화
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def recommend_metrics(request):
+    """
+    GET /bluebridge/recommend/metrics/
+    운영자용: LLM 프록시 호출 위치별 지연 히스토그램/토큰/결과 집계, 서킷 상태, 캐시 통계.
+    """
     return Response(
+        {
+            "calls": call_stats(),
+            "breakers": breaker_stats(),
+            "caches": {
+                "query_normalize": query_cache_stats(),
+                "profile_reasons": profile_reason_cache_stats(),
+                "embeddings": get_embedding_cache().stats(),
+            },
+            "embedding_batcher": embedding_batcher_stats(),
+        }
+    )
+
+
+# === 비동기 뷰 (ASGI) ===
+# DRF 함수 뷰는 async를 지원하지 않으므로 JWT 인증/메서드 검사를 직접 처리한다.
+
+
+def _json(data, status=200) -> JsonResponse:
+    return JsonResponse(data, status=status, json_dumps_params={"ensure_ascii": False})
+
+
+async def _authenticate(request):
+    """
+    JWT 인증. (사용자, None) 또는 (None, 401 응답) 반환.
+    """
+    try:
+        result = await sync_to_async(JWTAuthentication().authenticate)(request)
+    except AuthenticationFailed as exc:
+        return None, _json({"detail": exc.detail}, status=401)
+    if result is None:
+        return None, _json({"detail": str(NotAuthenticated.default_detail)}, status=401)
+    return result[0], None
+
+
+@with_server_timing
+async def recommend_list_async(request):
+    """
+    GET /bluebridge/recommend/async/
+    recommend_list의 비동기 버전 (LLM 대기 중 워커 스레드를 점유하지 않음).
+    """
+    if request.method != "GET":
+        return _json({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+    user, error = await _authenticate(request)
+    if error:
+        return error
+
+    with stage("cache"):
+        profile, _ = await Profile.objects.aget_or_create(user=user)
+        snapshot = _profile_snapshot(profile)
+        recommended = get_profile_results(snapshot)
+    if recommended is None:
+        recommended = await aprofile_recommend(user=user)
+        set_profile_results(snapshot, recommended)
+    recommended_ids = [item["policy_id"] for item in recommended]
+
+    with stage("log"):
+        await RecommendationLog.objects.acreate(
+            user=user,
+            query=None,
+            profile_snapshot=snapshot,
+            recommended_policy_ids=recommended_ids,
+            ux_scores={},
+        )
+
+    return _json(
+        {
+            "type": "profile",
+            "results": recommended,
+        }
+    )
+
+
+@with_server_timing
+async def recommend_detail_async(request):
+    """
+    POST /bluebridge/recommend/detail/async/
+    recommend_detail의 비동기 버전.
+    body: { "query": "..." }
+    """
+    if request.method != "POST":
+        return _json({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+    user, error = await _authenticate(request)
+    if error:
+        return error
+
+    try:
+        body = json.loads(request.body or b"{}")
+    except ValueError:
+        return _json({"detail": "JSON 형식이 올바르지 않습니다"}, status=400)
+    query = body.get("query") if isinstance(body, dict) else None
+    if not query:
+        return _json({"detail": "query 필드가 비어있습니다"}, status=400)
+
+    with stage("cache"):
+        profile = await Profile.objects.filter(user=user).afirst()
+        snapshot = _profile_snapshot(profile)
+        results = get_query_results(query, snapshot.get("age"))
+    if results is None:
+        results = await aquery_recommend(query=query, user=user)
+        set_query_results(query, snapshot.get("age"), results)
+    recommended_ids = [item["policy_id"] for item in results]
+
+    with stage("log"):
+        await RecommendationLog.objects.acreate(
+            user=user,
+            query=query,
+            profile_snapshot=snapshot,
+            recommended_policy_ids=recommended_ids,
+            ux_scores={},
+        )
+
+    return _json(
         {
             "type": "query",
             "query": query,
@@ -91,3 +323,8 @@ def recommend_detail(request):
             "query_examples": QUERY_EXAMPLES,
         }
     )
+
+
+# Django 4.2의 csrf_exempt 데코레이터는 코루틴 함수를 감싸면 async 뷰로 인식되지 않으므로 속성으로 지정
+recommend_list_async.csrf_exempt = True
+recommend_detail_async.csrf_exempt = True